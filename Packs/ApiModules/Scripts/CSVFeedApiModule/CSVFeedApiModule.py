@@ -3,9 +3,13 @@ from CommonServerPython import *
 from CommonServerUserPython import *
 
 ''' IMPORTS '''
+import bz2
+import concurrent.futures
 import csv
 import gzip
+import io
 import urllib3
+import zipfile
 from dateutil.parser import parse
 from typing import Optional, Pattern, Dict, Any, Tuple, Union, List
 
@@ -13,6 +17,50 @@ from typing import Optional, Pattern, Dict, Any, Tuple, Union, List
 urllib3.disable_warnings()
 
 # Globals
+MAX_DOWNLOAD_WORKERS = 10
+READ_CHUNK_SIZE = 1024 * 64
+
+
+class ResponseStream(io.RawIOBase):
+    """A read-only file object over the content of a response, which reads the content in chunks as needed."""
+
+    def __init__(self, response: requests.Response):
+        self._chunks = response.iter_content(chunk_size=READ_CHUNK_SIZE)
+        self._chunk = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._chunk:
+            self._chunk = next(self._chunks, None)
+            if self._chunk is None:
+                self._chunk = b''
+                return 0
+        size = min(len(b), len(self._chunk))
+        b[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+def get_decompressed_stream(stream: io.BufferedReader):
+    """Wraps a compressed stream with an incremental decompressor, according to its magic number.
+    Gzip and bz2 streams are decompressed while they are read. A zip archive must be read to memory as its index is at
+    its end, but its first file is still decompressed while it is read. Defaults to gzip.
+
+    Args:
+        stream: The compressed stream.
+
+    Returns:
+        The decompressed stream.
+    """
+    magic = stream.peek(4)[:4]
+    if magic.startswith(b'BZh'):
+        return bz2.BZ2File(stream)
+    if magic == b'PK\x03\x04':
+        archive = zipfile.ZipFile(io.BytesIO(stream.read()))
+        return archive.open(archive.namelist()[0])
+    return gzip.GzipFile(fileobj=stream)
 
 
 class Client(BaseClient):
@@ -105,6 +153,10 @@ class Client(BaseClient):
             'quotechar': quotechar,
             'skipinitialspace': skipinitialspace
         }
+        # the validators of each URL from the last fetch, see get_feed_cache
+        self.feed_cache: Optional[Dict[str, dict]] = None
+        # whether any of the URLs was modified since the last fetch, see get_modified_responses
+        self.feed_modified = True
 
     def _build_request(self, url):
         r = requests.Request(
@@ -116,63 +168,28 @@ class Client(BaseClient):
         return r.prepare()
 
     def build_iterator(self, **kwargs):
-        results = []
+        """
+        For each URL, yields a csv reader of its content, in the order of the URLs.
+        Multiple URLs are downloaded concurrently, and their content is parsed in the order of the URLs.
+        When the feed cache is set, the requests are conditional and nothing is yielded if the feed was not modified.
+        """
         urls = self._base_url
         if not isinstance(urls, list):
             urls = [urls]
-        for url in urls:
-            _session = requests.Session()
-
-            prepreq = self._build_request(url)
-
-            # this is to honour the proxy environment variables
-            kwargs.update(_session.merge_environment_settings(
-                prepreq.url,
-                {}, None, None, None  # defaults
-            ))
-            kwargs['stream'] = True
-            kwargs['verify'] = self._verify
-            kwargs['timeout'] = self.polling_timeout
-
-            if self.headers:
-                if 'headers' in kwargs:
-                    kwargs['headers'].update(self.headers)
-                else:
-                    kwargs['headers'] = self.headers
+        responses = list(self.iter_url_responses(urls, **kwargs))
+        if self.feed_cache is not None:
+            responses = self.get_modified_responses(responses, **kwargs)
 
-            try:
-                r = _session.send(prepreq, **kwargs)
-            except requests.exceptions.ConnectTimeout as exception:
-                err_msg = 'Connection Timeout Error - potential reasons might be that the Server URL parameter' \
-                          ' is incorrect or that the Server is not accessible from your host.'
-                raise DemistoException(err_msg, exception)
-            except requests.exceptions.SSLError as exception:
-                # in case the "Trust any certificate" is already checked
-                if not self._verify:
-                    raise
-                err_msg = 'SSL Certificate Verification Failed - try selecting \'Trust any certificate\' checkbox in' \
-                          ' the integration configuration.'
-                raise DemistoException(err_msg, exception)
-            except requests.exceptions.ProxyError as exception:
-                err_msg = 'Proxy Error - if the \'Use system proxy\' checkbox in the integration configuration is' \
-                          ' selected, try clearing the checkbox.'
-                raise DemistoException(err_msg, exception)
-            except requests.exceptions.ConnectionError as exception:
-                # Get originating Exception in Exception chain
-                error_class = str(exception.__class__)
-                err_type = '<' + error_class[error_class.find('\'') + 1: error_class.rfind('\'')] + '>'
-                err_msg = 'Verify that the server URL parameter' \
-                          ' is correct and that you have access to the server from your host.' \
-                          '\nError Type: {}\nError Number: [{}]\nMessage: {}\n' \
-                    .format(err_type, exception.errno, exception.strerror)
-                raise DemistoException(err_msg, exception)
+        # all of the requests are checked before any of the feeds is parsed
+        for url, r in responses:
             try:
                 r.raise_for_status()
             except Exception:
                 return_error('Exception in request: {} {}'.format(r.status_code, r.content))
                 raise
 
-            response = self.get_feed_content_divided_to_lines(url, r)
+        for url, r in responses:
+            response = self.iter_feed_content_lines(url, r)
             if self.feed_url_to_config:
                 fieldnames = self.feed_url_to_config.get(url, {}).get('fieldnames', [])
                 skip_first_line = self.feed_url_to_config.get(url, {}).get('skip_first_line', False)
@@ -194,9 +211,126 @@ class Client(BaseClient):
             if skip_first_line:
                 next(csvreader)
 
-            results.append({url: csvreader})
+            yield {url: csvreader}
+
+    def get_modified_responses(self, responses: list, **kwargs) -> list:
+        """Checks the responses of a conditional fetch against the feed cache, and updates the cache.
+        If none of the URLs was modified since the last fetch, there is nothing to submit. Otherwise, all of the feed
+        indicators are submitted, so the URLs which were not modified (HTTP 304) are downloaded again.
+
+        Args:
+            responses: The (url, response) tuples of the conditional requests.
+            kwargs: Arguments to send to the HTTP API endpoint.
+
+        Returns:
+            List of (url, response) tuples to parse.
+        """
+        feed_cache: dict = self.feed_cache  # type: ignore[assignment]
+        modified = [is_response_modified(response, feed_cache.setdefault(url, {})) for url, response in responses]
+        self.feed_modified = any(modified)
+        if not self.feed_modified:
+            demisto.debug('The feed was not modified since the last fetch')
+            return []
+
+        not_modified_urls = [url for url, response in responses if response.status_code == 304]
+        if not not_modified_urls:
+            return responses
+        downloaded = dict(self.iter_url_responses(not_modified_urls, conditional=False, **kwargs))
+        return [(url, downloaded.get(url, response)) for url, response in responses]
+
+    def iter_url_responses(self, urls: List[str], conditional: bool = True, **kwargs):
+        """Sends the requests to the feed URLs and yields a (url, response) tuple for each of them, in the order of the
+        URLs. Multiple URLs are downloaded concurrently, each to a spooled file, and if any of the downloads failed,
+        its error is raised before anything is yielded. A single URL is streamed, unless its digest is needed for the
+        feed cache.
+
+        Args:
+            urls: The feed URLs.
+            conditional: Whether to send conditional requests when the feed cache is set.
+            kwargs: Arguments to send to the HTTP API endpoint.
+
+        Returns:
+            Generator of (url, response) tuples.
+        """
+        if len(urls) == 1 and self.feed_cache is None:
+            yield urls[0], self.get_url_response(urls[0], conditional, **kwargs)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(urls), MAX_DOWNLOAD_WORKERS)) as executor:
+            futures = [executor.submit(self.download_url, url, conditional, **kwargs) for url in urls]
+        yield from zip(urls, get_futures_results(futures))
 
-        return results
+    def download_url(self, url: str, conditional: bool = True, **kwargs) -> SpooledResponse:
+        """Sends the request to a single feed URL and downloads its content.
+
+        Args:
+            url: The feed URL.
+            conditional: Whether to send a conditional request when the feed cache is set.
+            kwargs: Arguments to send to the HTTP API endpoint.
+
+        Returns:
+            The spooled response.
+        """
+        return SpooledResponse(self.get_url_response(url, conditional, **kwargs))
+
+    def get_url_response(self, url: str, conditional: bool = True, **kwargs):
+        """Sends the request to a single feed URL.
+
+        Args:
+            url: The feed URL.
+            conditional: Whether to send a conditional request when the feed cache is set.
+            kwargs: Arguments to send to the HTTP API endpoint.
+
+        Returns:
+            The response.
+        """
+        kwargs = dict(kwargs)
+        _session = requests.Session()
+
+        prepreq = self._build_request(url)
+
+        # this is to honour the proxy environment variables
+        kwargs.update(_session.merge_environment_settings(
+            prepreq.url,
+            {}, None, None, None  # defaults
+        ))
+        kwargs['stream'] = True
+        kwargs['verify'] = self._verify
+        kwargs['timeout'] = self.polling_timeout
+
+        # the headers are sent with the prepared request, Session.send does not accept them
+        prepreq.headers.update(kwargs.pop('headers', None) or {})
+        if self.headers:
+            prepreq.headers.update(self.headers)
+        if conditional and self.feed_cache is not None:
+            prepreq.headers.update(get_conditional_headers(self.feed_cache.get(url, {})))
+
+        try:
+            return _session.send(prepreq, **kwargs)
+        except requests.exceptions.ConnectTimeout as exception:
+            err_msg = 'Connection Timeout Error - potential reasons might be that the Server URL parameter' \
+                      ' is incorrect or that the Server is not accessible from your host.'
+            raise DemistoException(err_msg, exception)
+        except requests.exceptions.SSLError as exception:
+            # in case the "Trust any certificate" is already checked
+            if not self._verify:
+                raise
+            err_msg = 'SSL Certificate Verification Failed - try selecting \'Trust any certificate\' checkbox in' \
+                      ' the integration configuration.'
+            raise DemistoException(err_msg, exception)
+        except requests.exceptions.ProxyError as exception:
+            err_msg = 'Proxy Error - if the \'Use system proxy\' checkbox in the integration configuration is' \
+                      ' selected, try clearing the checkbox.'
+            raise DemistoException(err_msg, exception)
+        except requests.exceptions.ConnectionError as exception:
+            # Get originating Exception in Exception chain
+            error_class = str(exception.__class__)
+            err_type = '<' + error_class[error_class.find('\'') + 1: error_class.rfind('\'')] + '>'
+            err_msg = 'Verify that the server URL parameter' \
+                      ' is correct and that you have access to the server from your host.' \
+                      '\nError Type: {}\nError Number: [{}]\nMessage: {}\n' \
+                .format(err_type, exception.errno, exception.strerror)
+            raise DemistoException(err_msg, exception)
 
     def get_feed_content_divided_to_lines(self, url, raw_response):
         """Fetch feed data and divides its content to lines
@@ -208,12 +342,26 @@ class Client(BaseClient):
         Returns:
             List. List of lines from the feed content.
         """
+        return list(self.iter_feed_content_lines(url, raw_response))
+
+    def iter_feed_content_lines(self, url, raw_response):
+        """Reads the feed content line by line, while it is decompressed and decoded.
+        A streamed response is read from the connection only as the lines are consumed.
+
+        Args:
+            url: Current feed's url.
+            raw_response: The raw response from the feed's url.
+
+        Returns:
+            Generator of the lines of the feed content.
+        """
+        stream = io.BufferedReader(ResponseStream(raw_response), buffer_size=READ_CHUNK_SIZE)
         if self.feed_url_to_config and self.feed_url_to_config.get(url).get('is_zipped_file'):  # type: ignore
-            response_content = gzip.decompress(raw_response.content)
-        else:
-            response_content = raw_response.content
+            stream = get_decompressed_stream(stream)
 
-        return response_content.decode(self.encoding).split('\n')
+        # the lines are split only on '\n', and keep a trailing '\r' if exists, to be read as csv lines
+        for line in io.TextIOWrapper(stream, encoding=self.encoding, newline='\n'):  # type: ignore[arg-type]
+            yield line[:-1] if line.endswith('\n') else line
 
 
 def determine_indicator_type(indicator_type, default_indicator_type, auto_detect, value):
@@ -235,7 +383,8 @@ def determine_indicator_type(indicator_type, default_indicator_type, auto_detect
 
 
 def module_test_command(client: Client, args):
-    client.build_iterator()
+    for _ in client.build_iterator():
+        pass
     return 'ok', {}, {}
 
 
@@ -376,6 +525,8 @@ def feed_main(feed_name, params=None, prefix=''):
     }
     try:
         if command == 'fetch-indicators':
+            client.feed_cache = get_feed_cache()
+            delta = IndicatorsDelta.load()
             indicators = fetch_indicators_command(
                 client,
                 params.get('indicator_type'),
@@ -383,9 +534,15 @@ def feed_main(feed_name, params=None, prefix=''):
                 params.get('limit'),
                 params.get('create_relationships')
             )
+            if delta is not None:
+                indicators = delta.filter(indicators)
             # we submit the indicators in batches
             for b in batch(indicators, batch_size=2000):
                 demisto.createIndicators(b)  # type: ignore
+            if client.feed_cache is not None:
+                set_feed_cache(client.feed_cache)
+            if delta is not None and client.feed_modified:
+                delta.save()
         else:
             args = demisto.args()
             args['feed_name'] = feed_name
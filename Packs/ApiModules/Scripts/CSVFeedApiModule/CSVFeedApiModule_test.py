@@ -1,6 +1,10 @@
 import requests_mock
 from CSVFeedApiModule import *
 import io
+import bz2
+import gzip
+import zipfile
+import pytest
 
 
 def test_get_indicators_1():
@@ -360,3 +364,220 @@ def test_get_indicators_without_relations():
         indicators = fetch_indicators_command(client, default_indicator_type=itype, auto_detect=False,
                                               limit=35, create_relationships=False)
         assert indicators == expected_res
+
+
+def test_fetch_indicators_multiple_urls(mocker):
+    """
+    Given:
+    - A feed with 3 URLs, the first one responds last.
+
+    When:
+    - Fetching indicators.
+
+    Then:
+    - Validate the indicators are returned in the order of the URLs.
+    """
+    urls = ['https://ipstack.com/1', 'https://ipstack.com/2', 'https://ipstack.com/3']
+    feed_url_to_config = {url: {'fieldnames': ['value'], 'indicator_type': 'IP'} for url in urls}
+    original_get_url_response = Client.get_url_response
+
+    def get_url_response(self, url, *args, **kwargs):
+        if url == urls[0]:
+            time.sleep(0.1)
+        return original_get_url_response(self, url, *args, **kwargs)
+
+    mocker.patch.object(Client, 'get_url_response', get_url_response)
+    with requests_mock.Mocker() as m:
+        m.get(urls[0], content=b'1.1.1.1\n1.1.1.2')
+        m.get(urls[1], content=b'2.2.2.2')
+        m.get(urls[2], content=b'3.3.3.3')
+        client = Client(url=urls, feed_url_to_config=feed_url_to_config)
+        indicators = fetch_indicators_command(client, default_indicator_type='IP', auto_detect=False)
+
+    assert [indicator['value'] for indicator in indicators] == ['1.1.1.1', '1.1.1.2', '2.2.2.2', '3.3.3.3']
+
+
+def test_build_iterator_multiple_urls_downloaded(mocker):
+    """
+    Given:
+    - A feed with 3 URLs.
+
+    When:
+    - Getting the csv reader of the first URL.
+
+    Then:
+    - Validate the content of all of the URLs was already downloaded, and their connections were closed.
+    """
+    urls = ['https://ipstack.com/1', 'https://ipstack.com/2', 'https://ipstack.com/3']
+    feed_url_to_config = {url: {'fieldnames': ['value'], 'indicator_type': 'IP'} for url in urls}
+    original_get_url_response = Client.get_url_response
+    responses = []
+
+    def get_url_response(self, url, *args, **kwargs):
+        response = original_get_url_response(self, url, *args, **kwargs)
+        responses.append(response)
+        return response
+
+    mocker.patch.object(Client, 'get_url_response', get_url_response)
+    with requests_mock.Mocker() as m:
+        for i, url in enumerate(urls, 1):
+            m.get(url, content=f'{i}.{i}.{i}.{i}'.encode())
+        client = Client(url=urls, feed_url_to_config=feed_url_to_config)
+        iterator = client.build_iterator()
+        first_rows = list(next(iterator)[urls[0]])
+
+    assert first_rows == [{'value': '1.1.1.1'}]
+    assert len(responses) == 3
+    assert all(response.raw.closed for response in responses)
+    assert [row['value'] for item in iterator for reader in item.values() for row in reader] == ['2.2.2.2', '3.3.3.3']
+
+
+def test_fetch_indicators_multiple_urls_one_failed(mocker):
+    """
+    Given:
+    - A feed with 3 URLs, one of them fails.
+
+    When:
+    - Fetching indicators.
+
+    Then:
+    - Validate the fetch fails, so the indicators of the failed URL are not expired.
+    """
+    return_error_mock = mocker.patch('CSVFeedApiModule.return_error')
+    urls = ['https://ipstack.com/1', 'https://ipstack.com/2', 'https://ipstack.com/3']
+
+    with requests_mock.Mocker() as m:
+        m.get(urls[0], content=b'1.1.1.1')
+        m.get(urls[1], status_code=500)
+        m.get(urls[2], content=b'3.3.3.3')
+        client = Client(url=urls)
+        with pytest.raises(requests.exceptions.HTTPError):
+            fetch_indicators_command(client, default_indicator_type='IP', auto_detect=False)
+
+    assert return_error_mock.call_count == 1
+    assert '500' in return_error_mock.call_args[0][0]
+
+
+@pytest.mark.parametrize('first_response, second_response', [
+    ({'content': b'1.1.1.1', 'headers': {'ETag': '"v1"'}}, {'status_code': 304}),
+    ({'content': b'1.1.1.1'}, {'content': b'1.1.1.1'}),
+])
+def test_feed_main_fetch_indicators_not_modified(mocker, first_response, second_response):
+    """
+    Given:
+    - A feed which was not modified since the first fetch, according to its ETag header or its content digest.
+
+    When:
+    - Fetching indicators twice.
+
+    Then:
+    - Validate the indicators are submitted only on the first fetch.
+    """
+    url = 'https://ipstack.com'
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'params', return_value={'url': url, 'fieldnames': 'value', 'indicator_type': 'IP',
+                                                         'feedExpirationPolicy': 'never'})
+    mocker.patch.object(demisto, 'command', return_value='fetch-indicators')
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    mocker.patch.object(demisto, 'createIndicators')
+
+    with requests_mock.Mocker() as m:
+        m.get(url, [first_response, second_response])
+        feed_main('CSV')
+        feed_main('CSV')
+
+    assert demisto.createIndicators.call_count == 1
+    assert demisto.createIndicators.call_args[0][0][0]['value'] == '1.1.1.1'
+    if 'ETag' in first_response.get('headers', {}):
+        assert m.request_history[1].headers['If-None-Match'] == '"v1"'
+
+
+@pytest.mark.parametrize('expiration_policy, expected_submissions', [
+    ('never', [['1.1.1.1', '2.2.2.2'], ['3.3.3.3']]),
+    ('indicatorType', [['1.1.1.1', '2.2.2.2'], ['2.2.2.2', '3.3.3.3']]),
+    ('suddenDeath', [['1.1.1.1', '2.2.2.2'], ['2.2.2.2', '3.3.3.3']]),
+])
+def test_feed_main_fetch_indicators_delta_mode(mocker, expiration_policy, expected_submissions):
+    """
+    Given:
+    - A feed in delta mode, where an indicator is added and another one is removed between the fetches.
+
+    When:
+    - Fetching indicators twice.
+
+    Then:
+    - Validate only the added indicator is submitted on the second fetch when the indicators never expire,
+      and all of the indicators with any other expiration policy, so that they do not expire.
+    """
+    url = 'https://ipstack.com'
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'params', return_value={'url': url, 'fieldnames': 'value', 'indicator_type': 'IP',
+                                                         'delta_mode': True,
+                                                         'feedExpirationPolicy': expiration_policy})
+    mocker.patch.object(demisto, 'command', return_value='fetch-indicators')
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    mocker.patch.object(demisto, 'createIndicators')
+
+    with requests_mock.Mocker() as m:
+        m.get(url, [{'content': b'1.1.1.1\n2.2.2.2'}, {'content': b'2.2.2.2\n3.3.3.3'}])
+        feed_main('CSV')
+        feed_main('CSV')
+
+    assert [[i['value'] for i in call[0][0]] for call in demisto.createIndicators.call_args_list] == expected_submissions
+
+
+def zip_content(content: bytes) -> bytes:
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('ip_ranges.txt', content)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('compress', [gzip.compress, bz2.compress, zip_content])
+def test_iter_feed_content_lines_compressed(compress):
+    """
+    Given:
+    - A feed file compressed with gzip, bz2 or zip, with CRLF line endings.
+
+    When:
+    - Reading the feed content lines.
+
+    Then:
+    - Validate the lines are the same as the lines of the decompressed content.
+    """
+    url = 'https://ipstack.com'
+    content = b'ip,name\r\n1.1.1.1,a\r\n2.2.2.2,b\r\n'
+    client = Client(url=url, feed_url_to_config={url: {'is_zipped_file': True}})
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=compress(content))
+        raw_response = requests.get(url, stream=True)
+        lines = list(client.iter_feed_content_lines(url, raw_response))
+
+    assert lines == content.decode('latin-1').split('\n')[:-1]
+
+
+def test_iter_feed_content_lines_streamed():
+    """
+    Given:
+    - A big streamed feed response.
+
+    When:
+    - Reading the first line of the feed content.
+
+    Then:
+    - Validate the response content is not read to memory.
+    """
+    url = 'https://ipstack.com'
+    client = Client(url=url)
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b'1.1.1.1\n' * 100000)
+        raw_response = requests.get(url, stream=True)
+        lines = client.iter_feed_content_lines(url, raw_response)
+
+        assert next(lines) == '1.1.1.1'
+        assert raw_response.raw.tell() < 2 * READ_CHUNK_SIZE
+        assert sum(1 for _ in lines) == 99999
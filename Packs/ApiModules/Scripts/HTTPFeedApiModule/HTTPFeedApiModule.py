@@ -3,9 +3,11 @@ from CommonServerPython import *
 from CommonServerUserPython import *
 
 ''' IMPORTS '''
+import concurrent.futures
 import urllib3
 import requests
-from typing import Optional, Pattern, List
+from itertools import islice
+from typing import Optional, Pattern, List, Dict
 
 # disable insecure warnings
 urllib3.disable_warnings()
@@ -14,6 +16,7 @@ urllib3.disable_warnings()
 TAGS = 'tags'
 TLP_COLOR = 'trafficlightprotocol'
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+MAX_DOWNLOAD_WORKERS = 10
 
 
 class Client(BaseClient):
@@ -138,6 +141,11 @@ class Client(BaseClient):
             custom_fields_mapping = {}
         self.custom_fields_mapping = custom_fields_mapping
 
+        # the validators of each URL from the last fetch, see get_feed_cache
+        self.feed_cache: Optional[Dict[str, dict]] = None
+        # whether any of the URLs was modified since the last fetch, see get_modified_responses
+        self.feed_modified = True
+
     def get_feed_config(self, fields_json: str = '', indicator_json: str = ''):
         """
         Get the feed configuration from the indicator and field JSON strings.
@@ -191,9 +199,11 @@ class Client(BaseClient):
 
     def build_iterator(self, **kwargs):
         """
-        For each URL (service), send an HTTP request to get indicators and return them after filtering by Regex
+        For each URL (service), send an HTTP request to get indicators and return them after filtering by Regex.
+        Multiple URLs are downloaded concurrently, and their content is parsed in the order of the URLs.
+        When the feed cache is set, the requests are conditional and nothing is yielded if the feed was not modified.
         :param kwargs: Arguments to send to the HTTP API endpoint
-        :return: List of indicators
+        :return: Generator of {url: lines} dictionaries
         """
         kwargs['stream'] = True
         kwargs['verify'] = self._verify
@@ -204,23 +214,108 @@ class Client(BaseClient):
 
         if self.username is not None and self.password is not None:
             kwargs['auth'] = (self.username, self.password)
-        try:
-            urls = self._base_url
-            url_to_response_list: List[dict] = []
-            if not isinstance(urls, list):
-                urls = [urls]
-            for url in urls:
-                r = requests.get(
-                    url,
-                    **kwargs
+
+        urls = self._base_url
+        if not isinstance(urls, list):
+            urls = [urls]
+
+        responses = self.iter_url_responses(urls, **kwargs)
+        if self.feed_cache is not None:
+            responses = self.get_modified_responses(list(responses), **kwargs)
+
+        for url, lines in responses:
+            result = lines.iter_lines()
+            if self.encoding is not None:
+                result = map(
+                    lambda x: x.decode(self.encoding).encode('utf_8'),
+                    result
                 )
-                try:
-                    r.raise_for_status()
-                except Exception:
-                    LOG(f'{self.feed_name!r} - exception in request:'
-                        f' {r.status_code!r} {r.content!r}')
-                    raise
-                url_to_response_list.append({url: r})
+            else:
+                result = map(
+                    lambda x: x.decode('utf_8'),
+                    result
+                )
+            if self.ignore_regex is not None:
+                result = filter(
+                    lambda x: self.ignore_regex.match(x) is None,  # type: ignore[union-attr]
+                    result
+                )
+            yield {url: result}
+
+    def get_modified_responses(self, responses: list, **kwargs) -> list:
+        """
+        Checks the responses of a conditional fetch against the feed cache, and updates the cache.
+        If none of the URLs was modified since the last fetch, there is nothing to submit. Otherwise, all of the feed
+        indicators are submitted, so the URLs which were not modified (HTTP 304) are downloaded again.
+        :param responses: The (url, response) tuples of the conditional requests.
+        :param kwargs: Arguments to send to the HTTP API endpoint
+        :return: The (url, response) tuples to parse
+        """
+        feed_cache: dict = self.feed_cache  # type: ignore[assignment]
+        modified = [is_response_modified(response, feed_cache.setdefault(url, {})) for url, response in responses]
+        self.feed_modified = any(modified)
+        if not self.feed_modified:
+            demisto.debug(f'{self.feed_name!r} - the feed was not modified since the last fetch')
+            return []
+
+        not_modified_urls = [url for url, response in responses if response.status_code == 304]
+        if not not_modified_urls:
+            return responses
+        downloaded = dict(self.iter_url_responses(not_modified_urls, conditional=False, **kwargs))
+        return [(url, downloaded.get(url, response)) for url, response in responses]
+
+    def iter_url_responses(self, urls: List[str], conditional: bool = True, **kwargs):
+        """
+        Sends the requests to the feed URLs and yields a (url, response) tuple for each of them, in the order of the
+        URLs. Multiple URLs are downloaded concurrently, each to a spooled file, and if any of the downloads failed,
+        its error is raised before anything is yielded. A single URL is streamed, unless its digest is needed for the
+        feed cache.
+        :param urls: The feed URLs.
+        :param conditional: Whether to send conditional requests when the feed cache is set.
+        :param kwargs: Arguments to send to the HTTP API endpoint
+        :return: Generator of (url, response) tuples
+        """
+        if len(urls) == 1 and self.feed_cache is None:
+            yield urls[0], self.get_url_response(urls[0], conditional, **kwargs)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(urls), MAX_DOWNLOAD_WORKERS)) as executor:
+            futures = [executor.submit(self.download_url, url, conditional, **kwargs) for url in urls]
+        yield from zip(urls, get_futures_results(futures))
+
+    def download_url(self, url: str, conditional: bool = True, **kwargs) -> SpooledResponse:
+        """
+        Sends the request to a single feed URL and downloads its content.
+        :param url: The feed URL.
+        :param conditional: Whether to send a conditional request when the feed cache is set.
+        :param kwargs: Arguments to send to the HTTP API endpoint
+        :return: The spooled response
+        """
+        return SpooledResponse(self.get_url_response(url, conditional, **kwargs))
+
+    def get_url_response(self, url: str, conditional: bool = True, **kwargs):
+        """
+        Sends the request to a single feed URL.
+        :param url: The feed URL.
+        :param conditional: Whether to send a conditional request when the feed cache is set.
+        :param kwargs: Arguments to send to the HTTP API endpoint
+        :return: The response
+        """
+        if conditional and self.feed_cache is not None:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}),
+                                 **get_conditional_headers(self.feed_cache.get(url, {}))}
+        try:
+            r = requests.get(
+                url,
+                **kwargs
+            )
+            try:
+                r.raise_for_status()
+            except Exception:
+                LOG(f'{self.feed_name!r} - exception in request:'
+                    f' {r.status_code!r} {r.content!r}')
+                raise
+            return r
         except requests.exceptions.ConnectTimeout as exception:
             err_msg = 'Connection Timeout Error - potential reasons might be that the Server URL parameter' \
                       ' is incorrect or that the Server is not accessible from your host.'
@@ -246,28 +341,6 @@ class Client(BaseClient):
                 .format(err_type, exception.errno, exception.strerror)
             raise DemistoException(err_msg, exception)
 
-        results = []
-        for url_to_response in url_to_response_list:
-            for url, lines in url_to_response.items():
-                result = lines.iter_lines()
-                if self.encoding is not None:
-                    result = map(
-                        lambda x: x.decode(self.encoding).encode('utf_8'),
-                        result
-                    )
-                else:
-                    result = map(
-                        lambda x: x.decode('utf_8'),
-                        result
-                    )
-                if self.ignore_regex is not None:
-                    result = filter(
-                        lambda x: self.ignore_regex.match(x) is None,  # type: ignore[union-attr]
-                        result
-                    )
-                results.append({url: result})
-        return results
-
     def custom_fields_creator(self, attributes: dict):
         created_custom_fields = {}
         for attribute in attributes.keys():
@@ -362,8 +435,15 @@ def get_indicator_fields(line, url, feed_tags: list, tlp_color: Optional[str], c
 
 
 def fetch_indicators_command(client, feed_tags, tlp_color, itype, auto_detect, create_relationships=False, **kwargs):
+    return list(iter_indicators(client, feed_tags, tlp_color, itype, auto_detect, create_relationships, **kwargs))
+
+
+def iter_indicators(client, feed_tags, tlp_color, itype, auto_detect, create_relationships=False, **kwargs):
+    """
+    Yields the feed indicators one by one, while the feed lines are still being read from the response stream.
+    Use it instead of fetch_indicators_command to process big feeds in bounded memory.
+    """
     iterators = client.build_iterator(**kwargs)
-    indicators = []
     for iterator in iterators:
         for url, lines in iterator.items():
             for line in lines:
@@ -397,8 +477,7 @@ def fetch_indicators_command(client, feed_tags, tlp_color, itype, auto_detect, c
                         custom_fields = client.custom_fields_creator(attributes)
                         indicator_data["fields"] = custom_fields
 
-                    indicators.append(indicator_data)
-    return indicators
+                    yield indicator_data
 
 
 def determine_indicator_type(indicator_type, default_indicator_type, auto_detect, value):
@@ -426,7 +505,8 @@ def get_indicators_command(client: Client, args):
     tlp_color = args.get('tlp_color')
     auto_detect = demisto.params().get('auto_detect_type')
     create_relationships = demisto.params().get('create_relationships')
-    indicators_list = fetch_indicators_command(client, feed_tags, tlp_color, itype, auto_detect, create_relationships)[:limit]
+    indicators_list = list(islice(iter_indicators(client, feed_tags, tlp_color, itype, auto_detect, create_relationships),
+                                  limit))
     entry_result = camelize(indicators_list)
     hr = tableToMarkdown('Indicators', entry_result, headers=['Value', 'Type', 'Rawjson'])
     return hr, {}, indicators_list
@@ -443,7 +523,8 @@ def test_module(client: Client, args):
             supported_values = ', '.join(indicator_types)
             raise ValueError(f'Indicator type of {indicator_type} is not supported. Supported values are:'
                              f' {supported_values}')
-    client.build_iterator()
+    for _ in client.build_iterator():
+        pass
     return 'ok', {}, {}
 
 
@@ -467,11 +548,19 @@ def feed_main(feed_name, params=None, prefix=''):
     }
     try:
         if command == 'fetch-indicators':
-            indicators = fetch_indicators_command(client, feed_tags, tlp_color, params.get('indicator_type'),
-                                                  params.get('auto_detect_type'), params.get('create_relationships'))
-            # we submit the indicators in batches
+            client.feed_cache = get_feed_cache()
+            delta = IndicatorsDelta.load()
+            indicators = iter_indicators(client, feed_tags, tlp_color, params.get('indicator_type'),
+                                         params.get('auto_detect_type'), params.get('create_relationships'))
+            if delta is not None:
+                indicators = delta.filter(indicators)
+            # we submit the indicators in batches, as soon as each batch is read from the feed
             for b in batch(indicators, batch_size=2000):
                 demisto.createIndicators(b)
+            if client.feed_cache is not None:
+                set_feed_cache(client.feed_cache)
+            if delta is not None and client.feed_modified:
+                delta.save()
         else:
             args = demisto.args()
             args['feed_name'] = feed_name
@@ -1,5 +1,10 @@
 from HTTPFeedApiModule import get_indicators_command, Client, datestring_to_server_format, feed_main,\
     fetch_indicators_command
+from CommonServerPython import DemistoException
+import HTTPFeedApiModule
+import pytest
+import requests
+import time
 import requests_mock
 import demistomock as demisto
 
@@ -246,6 +251,40 @@ def test_feed_main_fetch_indicators(mocker, requests_mock):
     } in indicators
 
 
+def test_feed_main_fetch_indicators_in_batches(mocker, requests_mock):
+    """
+    Given
+    - A feed with 4500 IP lines.
+
+    When
+    - Fetching indicators.
+
+    Then
+    - Ensure the indicators are submitted in batches of 2000, each one as soon as it is read from the feed.
+    """
+    feed_url = 'https://www.example.com/ips.txt'
+    mocker.patch.object(demisto, 'params', return_value={'url': feed_url, 'indicator_type': 'IP'})
+    mocker.patch.object(demisto, 'command', return_value='fetch-indicators')
+    submitted_batches = []
+    mocker.patch.object(demisto, 'createIndicators',
+                        side_effect=lambda indicators: submitted_batches.append(len(indicators)))
+    requests_mock.get(feed_url, content='\n'.join(f'1.1.{i // 256}.{i % 256}' for i in range(4500)).encode())
+    read_lines = []
+    original_iter_indicators = HTTPFeedApiModule.iter_indicators
+
+    def iter_indicators(*args, **kwargs):
+        for indicator in original_iter_indicators(*args, **kwargs):
+            read_lines.append(indicator['value'])
+            # the previous batch was already submitted
+            assert len(submitted_batches) == (len(read_lines) - 1) // 2000
+            yield indicator
+
+    mocker.patch.object(HTTPFeedApiModule, 'iter_indicators', side_effect=iter_indicators)
+    feed_main('great_feed_name')
+
+    assert submitted_batches == [2000, 2000, 500]
+
+
 def test_feed_main_test_module(mocker, requests_mock):
     """
     Given
@@ -441,3 +480,244 @@ def test_get_indicators_without_relations():
                                               create_relationships=False)
 
         assert indicators == expected_res
+
+
+def test_fetch_indicators_multiple_urls(mocker, requests_mock):
+    """
+    Given
+    - A feed with 3 URLs, the first one responds last.
+
+    When
+    - Fetching indicators.
+
+    Then
+    - Ensure the indicators are returned in the order of the URLs.
+    """
+    urls = ['https://www.example.com/1.txt', 'https://www.example.com/2.txt', 'https://www.example.com/3.txt']
+    requests_mock.get(urls[0], content=b'1.1.1.1\n1.1.1.2')
+    requests_mock.get(urls[1], content=b'2.2.2.2')
+    requests_mock.get(urls[2], content=b'3.3.3.3')
+    original_get_url_response = Client.get_url_response
+
+    def get_url_response(self, url, *args, **kwargs):
+        if url == urls[0]:
+            time.sleep(0.1)
+        return original_get_url_response(self, url, *args, **kwargs)
+
+    mocker.patch.object(Client, 'get_url_response', get_url_response)
+    client = Client(url=urls, feed_url_to_config={url: {'indicator_type': 'IP'} for url in urls})
+
+    indicators = fetch_indicators_command(client, [], None, 'IP', False)
+
+    assert [indicator['value'] for indicator in indicators] == ['1.1.1.1', '1.1.1.2', '2.2.2.2', '3.3.3.3']
+
+
+def test_build_iterator_multiple_urls_downloaded(mocker, requests_mock):
+    """
+    Given
+    - A feed with 3 URLs.
+
+    When
+    - Getting the lines of the first URL.
+
+    Then
+    - Ensure the content of all of the URLs was already downloaded, and their connections were closed.
+    """
+    urls = ['https://www.example.com/1.txt', 'https://www.example.com/2.txt', 'https://www.example.com/3.txt']
+    for i, url in enumerate(urls, 1):
+        requests_mock.get(url, content=f'{i}.{i}.{i}.{i}'.encode())
+    original_get_url_response = Client.get_url_response
+    responses = []
+
+    def get_url_response(self, url, *args, **kwargs):
+        response = original_get_url_response(self, url, *args, **kwargs)
+        responses.append(response)
+        return response
+
+    mocker.patch.object(Client, 'get_url_response', get_url_response)
+    client = Client(url=urls, feed_url_to_config={url: {'indicator_type': 'IP'} for url in urls})
+
+    iterator = client.build_iterator()
+    assert list(next(iterator)[urls[0]]) == ['1.1.1.1']
+    assert len(responses) == 3
+    assert all(response.raw.closed for response in responses)
+    assert [list(lines) for item in iterator for lines in item.values()] == [['2.2.2.2'], ['3.3.3.3']]
+
+
+def test_fetch_indicators_multiple_urls_one_failed(requests_mock):
+    """
+    Given
+    - A feed with 3 URLs, one of them fails to connect.
+
+    When
+    - Fetching indicators.
+
+    Then
+    - Ensure the fetch fails, so the indicators of the failed URL are not expired.
+    """
+    urls = ['https://www.example.com/1.txt', 'https://www.example.com/2.txt', 'https://www.example.com/3.txt']
+    requests_mock.get(urls[0], content=b'1.1.1.1')
+    requests_mock.get(urls[1], exc=requests.exceptions.ConnectionError)
+    requests_mock.get(urls[2], content=b'3.3.3.3')
+    client = Client(url=urls, feed_url_to_config={url: {'indicator_type': 'IP'} for url in urls})
+
+    with pytest.raises(DemistoException, match='Verify that the server URL parameter'):
+        fetch_indicators_command(client, [], None, 'IP', False)
+
+
+def mock_fetch(mocker, params):
+    """
+    Mocks the fetch-indicators command with the given params, and an empty integration context.
+    Returns the list of the submitted indicator values of each fetch.
+    """
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'params', return_value=params)
+    mocker.patch.object(demisto, 'command', return_value='fetch-indicators')
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    submitted: list = []
+    mocker.patch.object(demisto, 'createIndicators',
+                        side_effect=lambda indicators: submitted.extend(i['value'] for i in indicators))
+    return submitted
+
+
+def test_feed_main_fetch_indicators_not_modified(mocker, requests_mock):
+    """
+    Given
+    - A feed which sends an ETag header, and was not modified since the first fetch.
+
+    When
+    - Fetching indicators twice.
+
+    Then
+    - Ensure the second request is conditional, and no indicators are submitted on the 304 response.
+    """
+    feed_url = 'https://www.example.com/ips.txt'
+    submitted = mock_fetch(mocker, {'url': feed_url, 'indicator_type': 'IP', 'feedExpirationPolicy': 'never'})
+    requests_mock.get(feed_url, [{'content': b'1.1.1.1\n2.2.2.2', 'headers': {'ETag': '"v1"'}},
+                                 {'status_code': 304}])
+
+    feed_main('great_feed_name')
+    assert submitted == ['1.1.1.1', '2.2.2.2']
+    assert 'If-None-Match' not in requests_mock.request_history[0].headers
+
+    feed_main('great_feed_name')
+    assert submitted == ['1.1.1.1', '2.2.2.2']
+    assert requests_mock.request_history[1].headers['If-None-Match'] == '"v1"'
+
+
+def test_feed_main_fetch_indicators_same_content(mocker, requests_mock):
+    """
+    Given
+    - A feed which sends no ETag or Last-Modified headers.
+
+    When
+    - Fetching indicators 3 times, where the content changes only before the third fetch.
+
+    Then
+    - Ensure the indicators are not submitted again when the content digest is the same.
+    """
+    feed_url = 'https://www.example.com/ips.txt'
+    submitted = mock_fetch(mocker, {'url': feed_url, 'indicator_type': 'IP', 'feedExpirationPolicy': 'never'})
+    requests_mock.get(feed_url, [{'content': b'1.1.1.1'}, {'content': b'1.1.1.1'}, {'content': b'2.2.2.2'}])
+
+    for _ in range(3):
+        feed_main('great_feed_name')
+
+    assert submitted == ['1.1.1.1', '2.2.2.2']
+
+
+def test_feed_main_fetch_indicators_partially_modified(mocker, requests_mock):
+    """
+    Given
+    - A feed with 2 URLs, where only the second one was modified since the first fetch.
+
+    When
+    - Fetching indicators twice.
+
+    Then
+    - Ensure all of the indicators are submitted again, by downloading the first URL without a conditional request.
+    """
+    urls = ['https://www.example.com/1.txt', 'https://www.example.com/2.txt']
+    submitted = mock_fetch(mocker, {'url': urls, 'feed_url_to_config': {url: {'indicator_type': 'IP'} for url in urls},
+                                    'feedExpirationPolicy': 'never'})
+    requests_mock.get(urls[0], [{'content': b'1.1.1.1', 'headers': {'Last-Modified': 'Mon, 01 Mar 2021 00:00:00 GMT'}},
+                                {'status_code': 304},
+                                {'content': b'1.1.1.1', 'headers': {'Last-Modified': 'Mon, 01 Mar 2021 00:00:00 GMT'}}])
+    requests_mock.get(urls[1], [{'content': b'2.2.2.2'}, {'content': b'2.2.2.3'}])
+
+    feed_main('great_feed_name')
+    feed_main('great_feed_name')
+
+    assert sorted(submitted) == ['1.1.1.1', '1.1.1.1', '2.2.2.2', '2.2.2.3']
+
+
+@pytest.mark.parametrize('expiration_policy', ['interval', 'indicatorType', 'suddenDeath'])
+def test_feed_main_fetch_indicators_expiring_indicators(mocker, requests_mock, expiration_policy):
+    """
+    Given
+    - A feed whose indicators may expire, which was not modified since the first fetch.
+
+    When
+    - Fetching indicators twice.
+
+    Then
+    - Ensure the requests are not conditional, and the indicators are submitted on both fetches.
+    """
+    feed_url = 'https://www.example.com/ips.txt'
+    submitted = mock_fetch(mocker, {'url': feed_url, 'indicator_type': 'IP', 'feedExpirationPolicy': expiration_policy})
+    requests_mock.get(feed_url, content=b'1.1.1.1', headers={'ETag': '"v1"'})
+
+    feed_main('great_feed_name')
+    feed_main('great_feed_name')
+
+    assert submitted == ['1.1.1.1', '1.1.1.1']
+    assert 'If-None-Match' not in requests_mock.request_history[1].headers
+
+
+def test_feed_main_fetch_indicators_delta_mode(mocker, requests_mock):
+    """
+    Given
+    - A feed in delta mode, where an indicator is added and another one is removed between the fetches.
+
+    When
+    - Fetching indicators 3 times.
+
+    Then
+    - Ensure only the added indicators are submitted after the first fetch.
+    """
+    feed_url = 'https://www.example.com/ips.txt'
+    submitted = mock_fetch(mocker, {'url': feed_url, 'indicator_type': 'IP', 'delta_mode': True,
+                                    'feedExpirationPolicy': 'never'})
+    requests_mock.get(feed_url, [{'content': b'1.1.1.1\n2.2.2.2'}, {'content': b'2.2.2.2\n3.3.3.3\n1.1.1.1'},
+                                 {'content': b'3.3.3.3\n4.4.4.4'}])
+
+    feed_main('great_feed_name')
+    assert submitted == ['1.1.1.1', '2.2.2.2']
+    feed_main('great_feed_name')
+    assert submitted == ['1.1.1.1', '2.2.2.2', '3.3.3.3']
+    feed_main('great_feed_name')
+    assert submitted == ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4']
+
+
+@pytest.mark.parametrize('expiration_policy', ['interval', 'indicatorType', 'suddenDeath'])
+def test_feed_main_fetch_indicators_delta_mode_expiring_indicators(mocker, requests_mock, expiration_policy):
+    """
+    Given
+    - A feed in delta mode, whose indicators may expire.
+
+    When
+    - Fetching indicators twice, where an indicator is added between the fetches.
+
+    Then
+    - Ensure all of the indicators are submitted on every fetch, so that they do not expire.
+    """
+    feed_url = 'https://www.example.com/ips.txt'
+    submitted = mock_fetch(mocker, {'url': feed_url, 'indicator_type': 'IP', 'delta_mode': True,
+                                    'feedExpirationPolicy': expiration_policy})
+    requests_mock.get(feed_url, [{'content': b'1.1.1.1\n2.2.2.2'}, {'content': b'2.2.2.2\n1.1.1.1\n3.3.3.3'}])
+
+    feed_main('great_feed_name')
+    feed_main('great_feed_name')
+
+    assert submitted == ['1.1.1.1', '2.2.2.2', '2.2.2.2', '1.1.1.1', '3.3.3.3']
@@ -75,16 +75,59 @@ class Client:
         self.cert = (cert_file, key_file) if cert_file and key_file else None
         self.tlp_color = tlp_color
 
+        # the validators of each feed from the last fetch, see get_feed_cache
+        self.feed_cache: Optional[Dict[str, dict]] = None
+        # whether any of the feeds was modified since the last fetch, see build_modified_iterators
+        self.feed_modified = True
+
     def build_iterator(self, feed: dict, **kwargs) -> List:
-        r = requests.get(
+        r = self.get_feed_response(feed, **kwargs)
+        return self.parse_feed_response(feed, r)
+
+    def build_modified_iterators(self, **kwargs) -> Dict[str, List]:
+        """
+        Sends conditional requests for all of the feeds, according to the feed cache, and updates the cache.
+        If none of the feeds was modified since the last fetch, there is nothing to submit. Otherwise, all of the
+        indicators are submitted, so the feeds which were not modified (HTTP 304) are requested again.
+        :return: Dict of {feed_name: result}, empty if none of the feeds was modified
+        """
+        feed_cache: dict = self.feed_cache  # type: ignore[assignment]
+        responses = {}
+        for feed_name, feed in self.feed_name_to_config.items():
+            responses[feed_name] = self.get_feed_response(feed, get_conditional_headers(feed_cache.get(feed_name, {})),
+                                                          **kwargs)
+
+        # a failed response is counted as modified, so its error is raised by parse_feed_response
+        modified = [not response.ok or is_response_modified(response, feed_cache.setdefault(feed_name, {}))
+                    for feed_name, response in responses.items()]
+        self.feed_modified = any(modified)
+        if not self.feed_modified:
+            demisto.debug(f'{self.source_name} - the feed was not modified since the last fetch')
+            return {}
+
+        feeds_results = {}
+        for feed_name, response in responses.items():
+            feed = self.feed_name_to_config[feed_name]
+            if response.status_code == 304:
+                response = self.get_feed_response(feed, **kwargs)
+            feeds_results[feed_name] = self.parse_feed_response(feed, response)
+        return feeds_results
+
+    def get_feed_response(self, feed: dict, conditional_headers: Optional[dict] = None, **kwargs):
+        headers = self.headers
+        if conditional_headers:
+            headers = {**(headers or {}), **conditional_headers}
+        return requests.get(
             url=feed.get('url', self.url),
             verify=self.verify,
             auth=self.auth,
             cert=self.cert,
-            headers=self.headers,
+            headers=headers,
             **kwargs
         )
 
+    @staticmethod
+    def parse_feed_response(feed: dict, r: requests.Response) -> List:
         try:
             r.raise_for_status()
             data = r.json()
@@ -118,15 +161,18 @@ def fetch_indicators_command(client: Client, indicator_type: str, feedTags: list
     """
     indicators: List[dict] = []
     feeds_results = {}
-    for feed_name, feed in client.feed_name_to_config.items():
-        custom_build_iterator = feed.get('custom_build_iterator')
-        if custom_build_iterator:
-            indicators_from_feed = custom_build_iterator(client, feed, limit, **kwargs)
-            if not isinstance(indicators_from_feed, list):
-                raise Exception("Custom function to handle with pagination must return a list type")
-            feeds_results[feed_name] = indicators_from_feed
-        else:
-            feeds_results[feed_name] = client.build_iterator(feed, **kwargs)
+    if client.feed_cache is not None:
+        feeds_results = client.build_modified_iterators(**kwargs)
+    else:
+        for feed_name, feed in client.feed_name_to_config.items():
+            custom_build_iterator = feed.get('custom_build_iterator')
+            if custom_build_iterator:
+                indicators_from_feed = custom_build_iterator(client, feed, limit, **kwargs)
+                if not isinstance(indicators_from_feed, list):
+                    raise Exception("Custom function to handle with pagination must return a list type")
+                feeds_results[feed_name] = indicators_from_feed
+            else:
+                feeds_results[feed_name] = client.build_iterator(feed, **kwargs)
 
     for service_name, items in feeds_results.items():
         feed_config = client.feed_name_to_config.get(service_name, {})
@@ -281,12 +327,20 @@ def feed_main(params, feed_name, prefix):
             return_results(test_module(client, limit))
 
         elif command == 'fetch-indicators':
+            # the cache is disabled for feeds with a custom build iterator, which may send other requests
+            client.feed_cache = get_feed_cache(
+                'feeds', enabled=not any(feed.get('custom_build_iterator')
+                                         for feed in client.feed_name_to_config.values()))
             indicators = fetch_indicators_command(client, indicator_type, feedTags, auto_detect)
-            if not len(indicators):
-                demisto.createIndicators(indicators)
-            else:
-                for b in batch(indicators, batch_size=2000):
-                    demisto.createIndicators(b)
+            # nothing is submitted when none of the feeds was modified since the last fetch
+            if client.feed_modified:
+                if not len(indicators):
+                    demisto.createIndicators(indicators)
+                else:
+                    for b in batch(indicators, batch_size=2000):
+                        demisto.createIndicators(b)
+            if client.feed_cache is not None:
+                set_feed_cache(client.feed_cache, 'feeds')
 
         elif command == f'{prefix}get-indicators':
             # dummy command for testing
@@ -121,3 +121,73 @@ def test_list_of_indicators_with_no_json_object():
         assert indicators[0].get('value') == '1.1.1.1'
         assert indicators[0].get('type') == 'IP'
         assert indicators[1].get('rawJSON') == {'indicator': '2.2.2.2'}
+
+
+def test_feed_main_fetch_indicators_not_modified(mocker):
+    """
+    Given
+    - A feed with 2 services on the same URL, which sends an ETag header.
+
+    When
+    - Fetching indicators 3 times, where the feed was modified only before the third fetch.
+
+    Then
+    - Ensure the requests are conditional, and the indicators are submitted on the first and third fetches only.
+    """
+    from JSONFeedApiModule import feed_main
+    url = 'https://www.example.com/feed.json'
+    feed_name_to_config = {
+        'A': {'url': url, 'extractor': 'a', 'indicator': 'ip', 'indicator_type': 'IP'},
+        'B': {'url': url, 'extractor': 'b', 'indicator': 'ip', 'indicator_type': 'IP'},
+    }
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'params', return_value={'url': url, 'feedExpirationPolicy': 'never'})
+    mocker.patch.object(demisto, 'command', return_value='fetch-indicators')
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    mocker.patch.object(demisto, 'createIndicators')
+    v1 = {'json': {'a': [{'ip': '1.1.1.1'}], 'b': [{'ip': '2.2.2.2'}]}, 'headers': {'ETag': '"v1"'}}
+    v2 = {'json': {'a': [{'ip': '1.1.1.1'}], 'b': [{'ip': '3.3.3.3'}]}, 'headers': {'ETag': '"v2"'}}
+
+    with requests_mock.Mocker() as m:
+        m.get(url, [v1, v1, {'status_code': 304}, {'status_code': 304}, v2, v2])
+        for _ in range(3):
+            feed_main({'url': url, 'feed_name_to_config': feed_name_to_config}, 'JSON', 'json')
+
+    assert [r.headers.get('If-None-Match') for r in m.request_history] == [None, None, '"v1"', '"v1"', '"v1"', '"v1"']
+    assert demisto.createIndicators.call_count == 2
+    assert [i['value'] for i in demisto.createIndicators.call_args[0][0]] == ['1.1.1.1', '3.3.3.3']
+
+
+def test_feed_main_fetch_indicators_error(mocker):
+    """
+    Given
+    - A feed which fails with an error status on the second fetch.
+
+    When
+    - Fetching indicators twice.
+
+    Then
+    - Ensure the error is returned from the feed response parsing, and the feed cache is not updated.
+    """
+    from JSONFeedApiModule import feed_main
+    url = 'https://www.example.com/feed.json'
+    params = {'url': url, 'extractor': 'a', 'indicator': 'ip', 'feedExpirationPolicy': 'never'}
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'params', return_value=params)
+    mocker.patch.object(demisto, 'command', return_value='fetch-indicators')
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    mocker.patch.object(demisto, 'createIndicators')
+    return_error_mock = mocker.patch('JSONFeedApiModule.return_error')
+
+    with requests_mock.Mocker() as m:
+        m.get(url, [{'json': {'a': [{'ip': '1.1.1.1'}]}}, {'status_code': 500, 'text': 'error'}])
+        feed_main(params, 'JSON', 'json')
+        feed_cache = dict(integration_context)
+        feed_main(params, 'JSON', 'json')
+
+    assert demisto.createIndicators.call_count == 1
+    assert return_error_mock.call_count == 1
+    assert '500 Server Error' in return_error_mock.call_args[0][0]
+    assert integration_context == feed_cache
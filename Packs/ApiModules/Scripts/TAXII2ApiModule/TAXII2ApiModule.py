@@ -2,10 +2,12 @@ import demistomock as demisto
 from CommonServerPython import *
 from CommonServerUserPython import *
 
-from typing import Union, Optional, List, Dict, Tuple
+from typing import Union, Optional, List, Dict, Tuple, Iterator, Sequence, Callable
+from concurrent.futures import ThreadPoolExecutor
 from requests.sessions import merge_setting, CaseInsensitiveDict
 import re
 import copy
+import functools
 import types
 import urllib3
 from taxii2client import v20, v21
@@ -39,6 +41,20 @@ HASHES_EQUALS_VAL_PATTERN = INDICATOR_OPERATOR_VAL_FORMAT_PATTERN.format(
     value=r"hashes\..*?", operator="="
 )
 
+# Compiled pattern regexes
+INDICATOR_REGEXES = [
+    re.compile(INDICATOR_EQUALS_VAL_PATTERN),
+    re.compile(HASHES_EQUALS_VAL_PATTERN),
+]
+CIDR_REGEXES = [
+    re.compile(CIDR_ISSUBSET_VAL_PATTERN),
+    re.compile(CIDR_ISUPPERSET_VAL_PATTERN),
+]
+# Fast path for the common single comparison patterns, e.g. `[ipv4-addr:value='1.1.1.1']` (after trimming spaces)
+SINGLE_VALUE_COMPARISON_REGEX = re.compile(r"\[([\w-]+:value=)'([^']*)'\]")
+# Max amount of parsed patterns kept in memory
+STIX_PATTERN_CACHE_SIZE = 4096
+
 TAXII_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 TAXII_TIME_FORMAT_NO_MS = "%Y-%m-%dT%H:%M:%SZ"
 
@@ -60,6 +76,73 @@ STIX_2_TYPES_TO_CORTEX_CIDR_TYPES = {
 }
 
 
+def get_typed_values_from_indicator_groups(
+        indicator_groups: List[Tuple[str, str]], indicator_types: Dict[str, str]
+) -> List[Tuple[str, str]]:
+    """
+    Get the cortex type of each indicator regex group
+    :param indicator_groups: caught regex group in pattern of: [`type`, `indicator`]
+    :param indicator_types: supported indicator types -> cortex types
+    :return: list of (`cortex type`, `indicator`) tuples
+    """
+    typed_values = []
+    for term in indicator_groups:
+        for taxii_type, type_ in indicator_types.items():
+            # term should be list with 2 argument parsed with regex - [`type`, `indicator`]
+            if len(term) == 2 and taxii_type in term[0]:
+                typed_values.append((type_, term[1]))
+                break
+    return typed_values
+
+
+@functools.lru_cache(maxsize=STIX_PATTERN_CACHE_SIZE)
+def parse_stix_pattern(pattern: str) -> Tuple[Tuple[Tuple[str, str], ...], Tuple[Tuple[str, str], ...]]:
+    """
+    Parses a stix pattern into the indicators and CIDR indicators it compares to. Results are cached by pattern.
+    :param pattern: stix pattern
+    :return: (`cortex type`, `indicator`) tuples of the indicators, and of the CIDR indicators
+    """
+    # this is done in case the server doesn't properly space the operator,
+    # supported indicators have no spaces, so this action shouldn't affect extracted values
+    trimmed_pattern = pattern.replace(" ", "")
+
+    single_value_match = SINGLE_VALUE_COMPARISON_REGEX.fullmatch(trimmed_pattern)
+    if single_value_match:
+        indicator_groups = [single_value_match.groups()]
+        cidr_groups: List[Tuple[str, str]] = []
+    else:
+        indicator_groups = Taxii2FeedClient.extract_indicator_groups_from_pattern(trimmed_pattern, INDICATOR_REGEXES)
+        cidr_groups = Taxii2FeedClient.extract_indicator_groups_from_pattern(trimmed_pattern, CIDR_REGEXES)
+
+    return (
+        tuple(get_typed_values_from_indicator_groups(indicator_groups, STIX_2_TYPES_TO_CORTEX_TYPES)),
+        tuple(get_typed_values_from_indicator_groups(cidr_groups, STIX_2_TYPES_TO_CORTEX_CIDR_TYPES)),
+    )
+
+
+def prefetch_pages(pages: Iterator) -> Iterator:
+    """
+    Iterates over pages, fetching the next page in the background while the current one is consumed
+    :param pages: iterator of pages, each page fetch is a blocking request
+    :return: generator of the same pages
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    next_page = None
+    try:
+        next_page = executor.submit(next, pages, None)
+        while True:
+            page = next_page.result()
+            if page is None:
+                return
+            next_page = executor.submit(next, pages, None)
+            yield page
+    finally:
+        # when the consumer stops early, the fetch of the next page is cancelled, or waited for if it already started
+        if next_page is not None:
+            next_page.cancel()
+        executor.shutdown(wait=True)
+
+
 class Taxii2FeedClient:
     def __init__(
             self,
@@ -124,14 +207,8 @@ class Taxii2FeedClient:
         self.field_map = field_map if field_map else {}
         self.tags = tags if tags else []
         self.tlp_color = tlp_color
-        self.indicator_regexes = [
-            re.compile(INDICATOR_EQUALS_VAL_PATTERN),
-            re.compile(HASHES_EQUALS_VAL_PATTERN),
-        ]
-        self.cidr_regexes = [
-            re.compile(CIDR_ISSUBSET_VAL_PATTERN),
-            re.compile(CIDR_ISUPPERSET_VAL_PATTERN),
-        ]
+        self.indicator_regexes = INDICATOR_REGEXES
+        self.cidr_regexes = CIDR_REGEXES
 
     def init_server(self, version=TAXII_VER_2_0):
         """
@@ -221,6 +298,17 @@ class Taxii2FeedClient:
         :param limit: max amount of indicators to fetch
         :return: Cortex indicators list
         """
+        indicators: List[Dict[str, str]] = []
+        for page in self.iter_indicator_pages(limit, **kwargs):
+            indicators.extend(page)
+        return indicators
+
+    def iter_indicator_pages(self, limit: int = -1, **kwargs) -> Iterator[List[Dict[str, str]]]:
+        """
+        Polls the taxii server and yields the cortex indicators of each fetched page as soon as it is parsed
+        :param limit: max amount of indicators to fetch
+        :return: generator of Cortex indicators lists
+        """
         if not isinstance(self.collection_to_fetch, (v20.Collection, v21.Collection)):
             raise DemistoException(
                 "Could not find a collection to fetch from. "
@@ -231,10 +319,9 @@ class Taxii2FeedClient:
 
         page_size = self.get_page_size(limit, limit)
         if page_size <= 0:
-            return []
+            return
         envelope = self.poll_collection(page_size, **kwargs)
-        indicators = self.extract_indicators_from_envelope_and_parse(envelope, limit)
-        return indicators
+        yield from self.iter_indicators_from_envelope(envelope, limit)
 
     def extract_indicators_from_envelope_and_parse(
             self, envelope: Union[types.GeneratorType, Dict[str, str]], limit: int = -1
@@ -246,59 +333,91 @@ class Taxii2FeedClient:
         :param limit: max amount of indicators to fetch
         :return: Cortex indicators list
         """
-        indicators = []
+        indicators: List[Dict[str, str]] = []
+        for page in self.iter_indicators_from_envelope(envelope, limit):
+            indicators.extend(page)
+        return indicators
+
+    def iter_indicators_from_envelope(
+            self, envelope: Union[types.GeneratorType, Dict[str, str]], limit: int = -1
+    ) -> Iterator[List[Dict[str, str]]]:
+        """
+        Parses the pages of an 2.0 envelope generator, or of a 2.1 envelope and the pages following it,
+        and yields the cortex indicators of each page. The next page is fetched and parsed while the current one
+        is consumed.
+        :param envelope: envelope containing stix objects
+        :param limit: max amount of indicators to fetch
+        :return: generator of Cortex indicators lists
+        """
+        return prefetch_pages(self.parse_envelope_pages(envelope, limit))
+
+    def parse_envelope_pages(
+            self, envelope: Union[types.GeneratorType, Dict[str, str]], limit: int = -1
+    ) -> Iterator[List[Dict[str, str]]]:
+        """
+        Parses the pages of an 2.0 envelope generator, or of a 2.1 envelope and the pages following it,
+        and yields the cortex indicators of each page, until `limit` indicators were yielded
+        :param envelope: envelope containing stix objects
+        :param limit: max amount of indicators to fetch
+        :return: generator of Cortex indicators lists
+        """
+        ioc_cnt = 0
         obj_cnt = 0
-        # TAXII 2.0
         if isinstance(envelope, types.GeneratorType):
-            for sub_envelope in envelope:
-                stix_objects = sub_envelope.get("objects")
-                if not stix_objects:
-                    # no fetched objects
-                    break
-                obj_cnt += len(stix_objects)
-                indicators.extend(
-                    self.parse_indicators_list(
-                        self.extract_indicators_from_stix_objects(stix_objects)
-                    )
-                )
-                if 0 < limit <= len(indicators):
-                    break
-        # TAXII 2.1
+            pages = envelope
         elif isinstance(envelope, Dict):
-            cur_limit = limit
-            stix_objects = envelope.get("objects")
-            obj_cnt += len(stix_objects)
-            indicators_list = self.extract_indicators_from_stix_objects(stix_objects)
-            indicators = self.parse_indicators_list(indicators_list)
-            while envelope.get("more", False):
-                page_size = self.get_page_size(limit, cur_limit)
-                envelope = self.collection_to_fetch.get_objects(
-                    limit=page_size, next=envelope.get("next", "")
-                )
-                if isinstance(envelope, Dict):
-                    stix_objects = envelope.get("objects")
-                    obj_cnt += len(stix_objects)
-                    extracted_iocs = self.extract_indicators_from_stix_objects(
-                        stix_objects
-                    )
-                    parsed_iocs = self.parse_indicators_list(extracted_iocs)
-                    indicators.extend(parsed_iocs)
+            pages = self.iter_v21_envelopes(envelope, limit, lambda: ioc_cnt)
+        else:
+            return
 
-                    if limit > -1:
-                        cur_limit -= len(envelope)  # type: ignore
-                        if cur_limit < 0:
-                            break
-                else:
-                    raise DemistoException(
-                        "Error: TAXII 2 client received the following response while requesting "
-                        f"indicators: {str(envelope)}\n\nExpected output is json"
-                    )
+        for sub_envelope in pages:
+            stix_objects = sub_envelope.get("objects")
+            if not stix_objects:
+                if pages is envelope:
+                    # no more fetched 2.0 objects
+                    break
+                continue
+            obj_cnt += len(stix_objects)
+            indicators = self.parse_indicators_list(
+                self.extract_indicators_from_stix_objects(stix_objects)
+            )
+            if limit > -1:
+                indicators = indicators[:limit - ioc_cnt]
+            ioc_cnt += len(indicators)
+            if indicators:
+                yield indicators
+            if 0 <= limit <= ioc_cnt:
+                break
         demisto.debug(
-            f"TAXII 2 Feed has extracted {len(indicators)} indicators / {obj_cnt} stix objects"
+            f"TAXII 2 Feed has extracted {ioc_cnt} indicators / {obj_cnt} stix objects"
         )
-        if limit > -1:
-            return indicators[:limit]
-        return indicators
+
+    def iter_v21_envelopes(
+            self, envelope: Dict[str, str], limit: int = -1, get_ioc_cnt: Callable[[], int] = lambda: 0
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Yields a 2.1 envelope, and polls the envelopes following it using their `next` cursor
+        :param envelope: first envelope of the collection
+        :param limit: max amount of indicators to fetch
+        :param get_ioc_cnt: returns the amount of indicators which were parsed from the yielded envelopes
+        :return: generator of 2.1 envelopes
+        """
+        yield envelope
+        while envelope.get("more", False):
+            # the indicators which were parsed so far count towards the limit of the next page
+            cur_limit = limit - get_ioc_cnt()
+            if limit > -1 and cur_limit <= 0:
+                break
+            page_size = self.get_page_size(limit, cur_limit)
+            envelope = self.collection_to_fetch.get_objects(
+                limit=page_size, next=envelope.get("next", "")
+            )
+            if not isinstance(envelope, Dict):
+                raise DemistoException(
+                    "Error: TAXII 2 client received the following response while requesting "
+                    f"indicators: {str(envelope)}\n\nExpected output is json"
+                )
+            yield envelope
 
     def poll_collection(
             self, page_size: int, **kwargs
@@ -380,32 +499,12 @@ class Taxii2FeedClient:
         pattern = indicator_obj.get("pattern")
         indicators = []
         if pattern:
-            # this is done in case the server doesn't properly space the operator,
-            # supported indicators have no spaces, so this action shouldn't affect extracted values
-            trimmed_pattern = pattern.replace(" ", "")
-
-            indicator_groups = self.extract_indicator_groups_from_pattern(
-                trimmed_pattern, self.indicator_regexes
-            )
+            typed_values, cidr_typed_values = parse_stix_pattern(pattern)
             indicators.extend(
-                self.get_indicators_from_indicator_groups(
-                    indicator_groups,
-                    indicator_obj,
-                    STIX_2_TYPES_TO_CORTEX_TYPES,
-                    field_map,
-                )
-            )
-
-            cidr_groups = self.extract_indicator_groups_from_pattern(
-                trimmed_pattern, self.cidr_regexes
+                self.get_indicators_from_typed_values(typed_values, indicator_obj, field_map)
             )
             indicators.extend(
-                self.get_indicators_from_indicator_groups(
-                    cidr_groups,
-                    indicator_obj,
-                    STIX_2_TYPES_TO_CORTEX_CIDR_TYPES,
-                    field_map,
-                )
+                self.get_indicators_from_typed_values(cidr_typed_values, indicator_obj, field_map)
             )
 
         return indicators
@@ -425,23 +524,29 @@ class Taxii2FeedClient:
         :param field_map: map used to create fields entry ({field_name: field_value})
         :return: Indicators list
         """
-        indicators = []
-        if indicator_groups:
-            for term in indicator_groups:
-                for taxii_type in indicator_types.keys():
-                    # term should be list with 2 argument parsed with regex - [`type`, `indicator`]
-                    if len(term) == 2 and taxii_type in term[0]:
-                        type_ = indicator_types[taxii_type]
-                        value = term[1]
-                        indicator = self.create_indicator(
-                            indicator_obj, type_, value, field_map
-                        )
-                        indicators.append(indicator)
-                        break
-        if self.skip_complex_mode and len(indicators) > 1:
+        typed_values = get_typed_values_from_indicator_groups(indicator_groups or [], indicator_types)
+        return self.get_indicators_from_typed_values(typed_values, indicator_obj, field_map)
+
+    def get_indicators_from_typed_values(
+            self,
+            typed_values: Sequence[Tuple[str, str]],
+            indicator_obj: Dict[str, str],
+            field_map: Dict[str, str],
+    ) -> List[Dict[str, str]]:
+        """
+        Get indicators from the typed values parsed from a pattern
+        :param typed_values: (`cortex type`, `indicator`) tuples
+        :param indicator_obj: taxii indicator object
+        :param field_map: map used to create fields entry ({field_name: field_value})
+        :return: Indicators list
+        """
+        if self.skip_complex_mode and len(typed_values) > 1:
             # we managed to pull more than a single indicator - indicating complex relationship
             return []
-        return indicators
+        return [
+            self.create_indicator(indicator_obj, type_, value, field_map)
+            for type_, value in typed_values
+        ]
 
     def create_indicator(self, indicator_obj, type_, value, field_map):
         """
@@ -452,7 +557,8 @@ class Taxii2FeedClient:
         :param field_map: field map used for mapping fields ({field_name: field_value})
         :return: Cortex indicator
         """
-        ioc_obj_copy = copy.deepcopy(indicator_obj)
+        # only the top level keys of the copy are modified, so a shallow copy is enough
+        ioc_obj_copy = copy.copy(indicator_obj)
         ioc_obj_copy["value"] = value
         ioc_obj_copy["type"] = type_
         indicator = {
@@ -1,5 +1,5 @@
 from CommonServerPython import *
-from TAXII2ApiModule import Taxii2FeedClient, TAXII_VER_2_1, HEADER_USERNAME
+from TAXII2ApiModule import Taxii2FeedClient, TAXII_VER_2_1, HEADER_USERNAME, parse_stix_pattern, prefetch_pages
 from taxii2client import v20, v21
 import pytest
 import json
@@ -320,3 +320,126 @@ class TestExtractIndicatorsAndParse:
 
         assert len(actual) == 14
         assert actual == expected
+
+    @pytest.mark.parametrize('limit, expected_page_sizes, expected_request_limit', [
+        (-1, [17, 17], 100), (20, [17, 3], 3), (17, [17], None)])
+    def test_21_multi_page_limit(self, mocker, limit, expected_page_sizes, expected_request_limit):
+        """
+        Scenario: Test 21 envelope extract over several pages with a limit
+
+        Given:
+        - Envelope with 17 iocs, which has a following page with 17 more iocs
+        - Various limits
+
+        When:
+        - iter_indicators_from_envelope is called
+
+        Then:
+        - The parsed indicators are yielded page by page
+        - Exactly `limit` indicators are returned
+        - The following page is requested with the `next` cursor of the first envelope when it is needed,
+          and is limited to the indicators which were left to the limit, not to the stix objects
+        """
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch='', proxies=[], verify=False, tlp_color='GREEN')
+        mock_client.collection_to_fetch = mocker.MagicMock()
+        mock_client.collection_to_fetch.get_objects.return_value = STIX_ENVELOPE_17_IOCS_19_OBJS
+        envelope = dict(STIX_ENVELOPE_17_IOCS_19_OBJS, more=True, next='page-2')
+
+        pages = list(mock_client.iter_indicators_from_envelope(envelope, limit))
+
+        assert [len(page) for page in pages] == expected_page_sizes
+        assert pages[0] == CORTEX_17_IOCS_19_OBJS
+        if len(expected_page_sizes) > 1:
+            mock_client.collection_to_fetch.get_objects.assert_called_once()
+            assert mock_client.collection_to_fetch.get_objects.call_args[1]['next'] == 'page-2'
+            assert mock_client.collection_to_fetch.get_objects.call_args[1]['limit'] == expected_request_limit
+        assert len(mock_client.extract_indicators_from_envelope_and_parse(envelope, limit)) == sum(expected_page_sizes)
+
+
+def test_prefetch_pages_early_stop():
+    """
+    Given:
+    - Pages which are fetched in the background
+
+    When:
+    - The consumer stops after the first page
+
+    Then:
+    - The fetch of the next page is cancelled, or done by the time the iteration is closed,
+      and no other page is fetched
+    """
+    import time
+    fetched = []
+
+    def pages():
+        for i in range(3):
+            time.sleep(0.1)
+            fetched.append(i)
+            yield i
+
+    iterator = prefetch_pages(pages())
+    assert next(iterator) == 0
+    iterator.close()
+    fetched_on_close = list(fetched)
+
+    time.sleep(0.3)
+    assert fetched == fetched_on_close
+    assert fetched in ([0], [0, 1])
+
+
+class TestParseStixPattern:
+    """
+    Scenario: Parse stix patterns into typed indicator values
+    """
+    @pytest.mark.parametrize('pattern, expected', [
+        ("[ipv4-addr:value = '1.1.1.1']", ((('IP', '1.1.1.1'),), ())),
+        ("[domain-name:value='example.com']", ((('Domain', 'example.com'),), ())),
+        ("[url:value = 'https://example.com/a b']", ((('URL', 'https://example.com/ab'),), ())),
+        ("[file:hashes.'SHA-256' = 'abc']", ((('File', 'abc'),), ())),
+        ("[ipv4-addr:value = '1.1.1.1' OR ipv4-addr:value = '2.2.2.2']",
+         ((('IP', '1.1.1.1'), ('IP', '2.2.2.2')), ())),
+        ("[ipv4-addr:value ISSUBSET '1.1.1.0/24']", ((), (('CIDR', '1.1.1.0/24'),))),
+    ])
+    def test_parse_stix_pattern(self, pattern, expected):
+        """
+        Given:
+        - Single comparison patterns (fast path) and compound patterns
+
+        When:
+        - parse_stix_pattern is called
+
+        Then:
+        - Ensure the same typed values are extracted as with the pattern regexes
+        """
+        trimmed_pattern = pattern.replace(' ', '')
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch='', proxies=[], verify=False)
+        regex_groups = mock_client.extract_indicator_groups_from_pattern(trimmed_pattern, mock_client.indicator_regexes)
+        cidr_groups = mock_client.extract_indicator_groups_from_pattern(trimmed_pattern, mock_client.cidr_regexes)
+
+        assert parse_stix_pattern(pattern) == expected
+        assert [value for _, value in expected[0]] == [value for _, value in regex_groups]
+        assert [value for _, value in expected[1]] == [value for _, value in cidr_groups]
+
+    def test_parse_stix_pattern_cache(self):
+        """
+        Given:
+        - An indicator pattern which was already parsed
+
+        When:
+        - Parsing an indicator with the same pattern
+
+        Then:
+        - Ensure the cached parse result is used
+        """
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch='', proxies=[], verify=False)
+        indicator_obj = {'type': 'indicator', 'pattern': "[ipv4-addr:value = '8.8.8.8']",
+                         'modified': '2020-06-10T01:14:05.999Z'}
+        mock_client.parse_single_indicator(indicator_obj)
+        hits = parse_stix_pattern.cache_info().hits
+
+        indicators = mock_client.parse_single_indicator(indicator_obj)
+
+        assert parse_stix_pattern.cache_info().hits == hits + 1
+        assert indicators[0]['value'] == '8.8.8.8'
+        assert indicators[0]['rawJSON']['value'] == '8.8.8.8'
+        assert 'value' not in indicator_obj
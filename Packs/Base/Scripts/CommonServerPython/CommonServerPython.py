@@ -6,17 +6,26 @@ Note that adding code to CommonServerUserPython can override functions in Common
 from __future__ import print_function
 
 import base64
+import hashlib
+import importlib
 import json
 import logging
 import os
 import re
 import socket
+import struct
 import sys
+import tempfile
+import threading
 import time
 import traceback
+import zlib
+from array import array
+from bisect import bisect_left
 from random import randint
 import xml.etree.cElementTree as ET
 from collections import OrderedDict
+from itertools import islice
 from datetime import datetime, timedelta
 from abc import abstractmethod
 
@@ -48,6 +57,40 @@ _warnings_handler = WarningsHandler()
 # ignore warnings from logging as a result of not being setup
 logging.raiseExceptions = False
 
+
+class _LazyModule(object):
+    """
+    Stands in for a module which is slow to import and is used by few scripts, importing it on first use.
+    Attributes are read from and set on the imported module, so scripts use it like the module itself.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self):
+        module = object.__getattribute__(self, '_module')
+        if module is None:
+            module = importlib.import_module(object.__getattribute__(self, '_name'))
+            object.__setattr__(self, '_module', module)
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return '<lazy module {!r}>'.format(object.__getattribute__(self, '_name'))
+
+
 # imports something that can be missed from docker image
 try:
     import requests
@@ -55,7 +98,8 @@ try:
     from urllib3.util import Retry
     from typing import Optional, Dict, List, Any, Union, Set
 
-    import dateparser
+    # dateparser takes longer to import than the rest of the module, and is used only when parsing dates
+    dateparser = _LazyModule('dateparser')
     from datetime import timezone  # type: ignore
 except Exception:
     if sys.version_info[0] < 3:
@@ -401,66 +445,140 @@ def is_debug_mode():
     return hasattr(demisto, 'is_debug') and demisto.is_debug
 
 
-def auto_detect_indicator_type(indicator_value):
+class IndicatorTypeClassifier(object):
     """
-      Infer the type of the indicator.
+      Infers indicator types exactly like ``auto_detect_indicator_type`` does, but compiles the regexes and loads the
+      public suffix list once, and skips the regexes the value cannot match by cheap checks on its characters.
+      Use ``get_indicator_type_classifier`` to get the shared instance.
+    """
+    DIGITS = '0123456789'
+    HEX_DIGITS = '0123456789abcdefABCDEF'
+    URL_PREFIXES = ('http', 'hxxp', 'ftp', 'www')
 
-      :type indicator_value: ``str``
-      :param indicator_value: The indicator whose type we want to check. (required)
+    def __init__(self):
+        try:
+            import tldextract
+        except Exception:
+            raise Exception("Missing tldextract module, In order to use the auto detect function please use a docker"
+                            " image with it installed such as: demisto/jmespath")
 
-      :return: The type of the indicator.
-      :rtype: ``str``
-    """
-    try:
-        import tldextract
-    except Exception:
-        raise Exception("Missing tldextract module, In order to use the auto detect function please use a docker"
-                        " image with it installed such as: demisto/jmespath")
+        try:
+            self._tld_extract = tldextract.TLDExtract(cache_file=False, suffix_list_urls=None)
+        except Exception:
+            # like a failure to extract the suffix of a value, values are then not classified as domains
+            self._tld_extract = None
+        self._ipv4cidr = re.compile(ipv4cidrRegex)
+        self._ipv6cidr = re.compile(ipv6cidrRegex)
+        self._ipv4 = re.compile(ipv4Regex)
+        self._ipv6 = re.compile(ipv6Regex)
+        self._url = re.compile(urlRegex)
+        self._email = re.compile(emailRegex)
+        self._cve = re.compile(cveRegex)
+
+    def classify(self, indicator_value):
+        """
+          Infer the type of the indicator.
 
-    if re.match(ipv4cidrRegex, indicator_value):
-        return FeedIndicatorType.CIDR
+          :type indicator_value: ``str``
+          :param indicator_value: The indicator whose type we want to check. (required)
 
-    if re.match(ipv6cidrRegex, indicator_value):
-        return FeedIndicatorType.IPv6CIDR
+          :return: The type of the indicator.
+          :rtype: ``str``
+        """
+        first_char = indicator_value[:1]
+        # every regex is matched at the start of the value, and every check below is a necessary condition for it
+        # to match, so the regexes run in the same order and the first one that matches is the same
+        starts_with_digit = first_char != '' and first_char in self.DIGITS
+        starts_with_hex = first_char != '' and first_char in self.HEX_DIGITS
+        has_slash = '/' in indicator_value
+        has_colon = ':' in indicator_value
+        hex_prefix_len = len(indicator_value) - len(indicator_value.lstrip(self.HEX_DIGITS)) if starts_with_hex else 0
+
+        if starts_with_digit and has_slash and self._ipv4cidr.match(indicator_value):
+            return FeedIndicatorType.CIDR
 
-    if re.match(ipv4Regex, indicator_value):
-        return FeedIndicatorType.IP
+        if starts_with_hex and has_slash and has_colon and self._ipv6cidr.match(indicator_value):
+            return FeedIndicatorType.IPv6CIDR
 
-    if re.match(ipv6Regex, indicator_value):
-        return FeedIndicatorType.IPv6
+        if starts_with_digit and '.' in indicator_value and self._ipv4.match(indicator_value):
+            return FeedIndicatorType.IP
 
-    if re.match(sha256Regex, indicator_value):
-        return FeedIndicatorType.File
+        if starts_with_hex and has_colon and self._ipv6.match(indicator_value):
+            return FeedIndicatorType.IPv6
 
-    if re.match(urlRegex, indicator_value):
-        return FeedIndicatorType.URL
+        if hex_prefix_len == 64 and sha256Regex.match(indicator_value):
+            return FeedIndicatorType.File
 
-    if re.match(md5Regex, indicator_value):
-        return FeedIndicatorType.File
+        if indicator_value.startswith(self.URL_PREFIXES) and self._url.match(indicator_value):
+            return FeedIndicatorType.URL
 
-    if re.match(sha1Regex, indicator_value):
-        return FeedIndicatorType.File
+        if hex_prefix_len == 32 and md5Regex.match(indicator_value):
+            return FeedIndicatorType.File
 
-    if re.match(emailRegex, indicator_value):
-        return FeedIndicatorType.Email
+        if hex_prefix_len == 40 and sha1Regex.match(indicator_value):
+            return FeedIndicatorType.File
 
-    if re.match(cveRegex, indicator_value):
-        return FeedIndicatorType.CVE
+        if '@' in indicator_value and self._email.match(indicator_value):
+            return FeedIndicatorType.Email
 
-    if re.match(sha512Regex, indicator_value):
-        return FeedIndicatorType.File
+        if indicator_value[:4].lower() == 'cve-' and self._cve.match(indicator_value):
+            return FeedIndicatorType.CVE
 
-    try:
-        no_cache_extract = tldextract.TLDExtract(cache_file=False, suffix_list_urls=None)
-        if no_cache_extract(indicator_value).suffix:
-            if '*' in indicator_value:
-                return FeedIndicatorType.DomainGlob
-            return FeedIndicatorType.Domain
+        if hex_prefix_len == 128 and sha512Regex.match(indicator_value):
+            return FeedIndicatorType.File
+
+        try:
+            if self._tld_extract is not None and self._tld_extract(indicator_value).suffix:
+                if '*' in indicator_value:
+                    return FeedIndicatorType.DomainGlob
+                return FeedIndicatorType.Domain
+
+        except Exception:
+            pass
+
+        return None
+
+    def classify_many(self, indicator_values):
+        """
+          Infer the types of the indicators.
+
+          :type indicator_values: ``list``
+          :param indicator_values: The indicators whose types we want to check. (required)
+
+          :return: The types of the indicators, in the same order.
+          :rtype: ``list``
+        """
+        classify = self.classify
+        return [classify(indicator_value) for indicator_value in indicator_values]
 
-    except Exception:
-        pass
 
-    return None
+_indicator_type_classifier = None
+
+
+def get_indicator_type_classifier():
+    """
+      Returns the indicator type classifier shared by the whole process.
+
+      :return: The indicator type classifier.
+      :rtype: ``IndicatorTypeClassifier``
+    """
+    global _indicator_type_classifier
+    if _indicator_type_classifier is None:
+        _indicator_type_classifier = IndicatorTypeClassifier()
+    return _indicator_type_classifier
+
+
+def auto_detect_indicator_type(indicator_value):
+    """
+      Infer the type of the indicator.
+
+      :type indicator_value: ``str``
+      :param indicator_value: The indicator whose type we want to check. (required)
+
+      :return: The type of the indicator.
+      :rtype: ``str``
+    """
+    return get_indicator_type_classifier().classify(indicator_value)
 
 
 def handle_proxy(proxy_param_name='proxy', checkbox_default_value=False, handle_insecure=True,
@@ -1567,9 +1685,52 @@ def create_clickable_url(url):
     return '[{}]({})'.format(url, url)
 
 
-def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=False, metadata=None, url_keys=None):
+MD_TABLE_NULL_VALUES = ('', None, [], {})
+
+
+def _md_table_cell(value):
     """
-       Converts a demisto table in JSON form to a Markdown table
+       Formats and escapes a single markdown table cell
+
+       :type value: ``Any``
+       :param value: The raw cell value
+
+       :return: The escaped cell content
+       :rtype: ``str``
+    """
+    if value is None:
+        return ''
+    if type(value) is int:
+        return str(value)
+    if not isinstance(value, STRING_TYPES):
+        value = formatCell(value, False)
+    if '|' not in value and '\n' not in value and '\r' not in value:
+        return value
+    return stringEscapeMD(value, True, True)
+
+
+def _md_table_row(vals):
+    """
+       Joins already escaped cells into a single markdown table row
+
+       :type vals: ``list``
+       :param vals: The escaped cells of the row
+
+       :return: The markdown row, including the line break
+       :rtype: ``str``
+    """
+    try:
+        return '| ' + ' | '.join(vals) + ' |\n'
+    except UnicodeDecodeError:
+        return '| ' + ' | '.join([str(v) for v in vals]) + ' |\n'
+
+
+def iter_table_to_markdown(name, t, headers=None, headerTransform=None, removeNull=False, metadata=None,
+                           url_keys=None, max_rows=None, chunk_size=1000):
+    """
+       Converts a demisto table in JSON form to a Markdown table, yielding the result in chunks.
+       Useful for very large tables that should be written to a file rather than held in memory as one string,
+       e.g. ``fileResult('table.md', iter_table_to_markdown('Results', rows))``.
 
        :type name: ``str``
        :param name: The name of the table (required)
@@ -1593,23 +1754,30 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
        :type url_keys: ``list``
        :param url_keys: a list of keys in the given JSON table that should be turned in to clickable
 
-       :return: A string representation of the markdown table
-       :rtype: ``str``
+       :type max_rows: ``int``
+       :param max_rows: The maximal number of rows to render. If the table is truncated, a
+            "Showing N of M entries." footer is added. Default is to render all rows.
+
+       :type chunk_size: ``int``
+       :param chunk_size: The number of table rows in each yielded chunk. Default is 1000.
+
+       :return: A generator of strings which together form the markdown table
+       :rtype: ``Iterator[str]``
     """
     # Turning the urls in the table to clickable
     if url_keys:
         t = url_to_clickable_markdown(t, url_keys)
 
-    mdResult = ''
+    title = ''
     if name:
-        mdResult = '### ' + name + '\n'
+        title = '### ' + name + '\n'
 
     if metadata:
-        mdResult += metadata + '\n'
+        title += metadata + '\n'
 
     if not t or len(t) == 0:
-        mdResult += '**No entries.**\n'
-        return mdResult
+        yield title + '**No entries.**\n'
+        return
 
     if not isinstance(t, list):
         t = [t]
@@ -1617,12 +1785,11 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
     if headers and isinstance(headers, STRING_TYPES):
         headers = [headers]
 
-    if not isinstance(t[0], dict):
-        # the table contains only simple objects (strings, numbers)
-        # should be only one header
+    # the table contains only simple objects (strings, numbers) - every row is a single cell
+    simple_values = not isinstance(t[0], dict)
+    if simple_values:
         if headers and len(headers) > 0:
-            header = headers[0]
-            t = map(lambda item: dict((h, item) for h in [header]), t)
+            headers = headers[:1]
         else:
             raise Exception("Missing headers param for tableToMarkdown. Example: headers=['Some Header']")
 
@@ -1631,43 +1798,90 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
         headers = list(t[0].keys())
         headers.sort()
 
+    total = len(t)
+    shown = total if max_rows is None else max(min(total, max_rows), 0)
+
     if removeNull:
-        headers_aux = headers[:]
-        for header in headers:
-            if all(obj.get(header) in ('', None, [], {}) for obj in t):
-                headers_aux.remove(header)
-        headers = headers_aux
-
-    if t and len(headers) > 0:
-        newHeaders = []
-        if headerTransform is None:  # noqa
-            def headerTransform(s): return stringEscapeMD(s, True, True)  # noqa
-        for header in headers:
-            newHeaders.append(headerTransform(header))
-        mdResult += '|'
-        if len(newHeaders) == 1:
-            mdResult += newHeaders[0]
+        # a column is kept as soon as a single non empty value is found in it, so this scan usually stops early
+        non_null_columns = set()  # type: ignore
+        for entry in islice(t, shown):
+            for i, header in enumerate(headers):
+                if i not in non_null_columns and \
+                        (entry if simple_values else entry.get(header)) not in MD_TABLE_NULL_VALUES:
+                    non_null_columns.add(i)
+            if len(non_null_columns) == len(headers):
+                break
+        headers = [header for i, header in enumerate(headers) if i in non_null_columns]
+
+    if not headers:
+        yield title + '**No entries.**\n'
+        return
+
+    if headerTransform is None:  # noqa
+        def headerTransform(s): return stringEscapeMD(s, True, True)  # noqa
+
+    chunk = [
+        title,
+        '|' + '|'.join([headerTransform(header) for header in headers]) + '|\n',
+        '|' + '|'.join(['---'] * len(headers)) + '|\n',
+    ]
+    rows_in_chunk = 0
+    for entry in islice(t, shown):
+        if simple_values:
+            chunk.append(_md_table_row([_md_table_cell(entry)]))
         else:
-            mdResult += '|'.join(newHeaders)
-        mdResult += '|\n'
-        sep = '---'
-        mdResult += '|' + '|'.join([sep] * len(headers)) + '|\n'
-        for entry in t:
-            vals = [stringEscapeMD((formatCell(entry.get(h, ''), False) if entry.get(h) is not None else ''),
-                                   True, True) for h in headers]
-            # this pipe is optional
-            mdResult += '| '
-            try:
-                mdResult += ' | '.join(vals)
-            except UnicodeDecodeError:
-                vals = [str(v) for v in vals]
-                mdResult += ' | '.join(vals)
-            mdResult += ' |\n'
+            get = entry.get
+            chunk.append(_md_table_row([_md_table_cell(get(header)) for header in headers]))
+        rows_in_chunk += 1
+        if rows_in_chunk >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+            rows_in_chunk = 0
 
-    else:
-        mdResult += '**No entries.**\n'
+    if shown < total:
+        chunk.append('\n**Showing {} of {} entries.**\n'.format(shown, total))
 
-    return mdResult
+    if chunk:
+        yield ''.join(chunk)
+
+
+def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=False, metadata=None, url_keys=None,
+                    max_rows=None):
+    """
+       Converts a demisto table in JSON form to a Markdown table
+
+       :type name: ``str``
+       :param name: The name of the table (required)
+
+       :type t: ``dict`` or ``list``
+       :param t: The JSON table - List of dictionaries with the same keys or a single dictionary (required)
+
+       :type headers: ``list`` or ``string``
+       :keyword headers: A list of headers to be presented in the output table (by order). If string will be passed
+            then table will have single header. Default will include all available headers.
+
+       :type headerTransform: ``function``
+       :keyword headerTransform: A function that formats the original data headers (optional)
+
+       :type removeNull: ``bool``
+       :keyword removeNull: Remove empty columns from the table. Default is False
+
+       :type metadata: ``str``
+       :param metadata: Metadata about the table contents
+
+       :type url_keys: ``list``
+       :param url_keys: a list of keys in the given JSON table that should be turned in to clickable
+
+       :type max_rows: ``int``
+       :param max_rows: The maximal number of rows to render. If the table is truncated, a
+            "Showing N of M entries." footer is added. Default is to render all rows.
+
+       :return: A string representation of the markdown table
+       :rtype: ``str``
+    """
+    return ''.join(iter_table_to_markdown(name, t, headers=headers, headerTransform=headerTransform,
+                                          removeNull=removeNull, metadata=metadata, url_keys=url_keys,
+                                          max_rows=max_rows, chunk_size=sys.maxsize))
 
 
 tblToMd = tableToMarkdown
@@ -1764,8 +1978,8 @@ def fileResult(filename, data, file_type=None):
        :type filename: ``str``
        :param filename: The name of the file to be created (required)
 
-       :type data: ``str`` or ``bytes``
-       :param data: The file data (required)
+       :type data: ``str`` or ``bytes`` or ``Iterable[str]``
+       :param data: The file data, or an iterable of data chunks which will be written one by one (required)
 
        :type file_type: ``str``
        :param file_type: one of the entryTypes file or entryInfoFile (optional)
@@ -1776,12 +1990,14 @@ def fileResult(filename, data, file_type=None):
     if file_type is None:
         file_type = entryTypes['file']
     temp = demisto.uniqueFile()
-    # pylint: disable=undefined-variable
-    if (IS_PY3 and isinstance(data, str)) or (not IS_PY3 and isinstance(data, unicode)):  # type: ignore # noqa: F821
-        data = data.encode('utf-8')
-    # pylint: enable=undefined-variable
+    chunks = [data] if isinstance(data, STRING_TYPES + (bytearray,)) else data
     with open(demisto.investigation()['id'] + '_' + temp, 'wb') as f:
-        f.write(data)
+        for chunk in chunks:
+            # pylint: disable=undefined-variable
+            if (IS_PY3 and isinstance(chunk, str)) or (not IS_PY3 and isinstance(chunk, unicode)):  # type: ignore # noqa: F821
+                chunk = chunk.encode('utf-8')
+            # pylint: enable=undefined-variable
+            f.write(chunk)
     return {'Contents': '', 'ContentsFormat': formats['text'], 'Type': file_type, 'File': filename, 'FileID': temp}
 
 
@@ -5903,6 +6119,249 @@ H || val.SSDeep && val.SSDeep == obj.SSDeep)': {'Malicious': {'Vendor': 'Vendor'
                                .format(indicator_type, INDICATOR_TYPE_TO_CONTEXT_KEY.keys()))
 
 
+class RateLimiter(object):
+    """
+    A token bucket rate limiter with Retry-After handling and adaptive backoff, to be used with ``BaseClient``.
+    Requests take a token from the bucket, which is refilled at a constant rate. When the API answers with a throttling
+    status code (429/503 by default), new requests are held until the Retry-After time passes, or for an exponentially
+    growing backoff if the header is missing, and the throttled request is retried.
+    When used as a context manager, the limiter state is saved on exit, so the limits are kept for the next run.
+    Example:
+    >>> with RateLimiter(rate=5, burst=10, context_key='rate_limiter') as rate_limiter:
+    >>>     client = BaseClient(base_url, rate_limiter=rate_limiter)
+    >>>     ...
+
+    :type rate: ``float``
+    :param rate: The number of requests allowed per second. Must be positive.
+
+    :type burst: ``int``
+    :param burst: The maximal number of requests which can be sent at once (the bucket size). Default is ``rate``.
+
+    :type context_key: ``str``
+    :param context_key: The integration context key to load the limiter state from and save it to.
+        If not supplied, the state is kept in memory only.
+
+    :type max_retries: ``int``
+    :param max_retries: How many times a throttled request is retried before its response is returned.
+
+    :type max_backoff: ``float``
+    :param max_backoff: The maximal time (in seconds) to hold requests after a throttling response.
+
+    :type throttle_codes: ``tuple``
+    :param throttle_codes: The status codes which indicate the client is throttled.
+
+    :return: No data returned
+    :rtype: ``None``
+    """
+
+    def __init__(self, rate, burst=None, context_key=None, max_retries=3, max_backoff=60, throttle_codes=(429, 503)):
+        try:
+            self.rate = float(rate)
+        except (TypeError, ValueError):
+            self.rate = 0.0
+        if self.rate <= 0:
+            raise ValueError('The rate limit must be a positive number of requests per second, got: {}'.format(rate))
+        try:
+            self.capacity = float(burst) if burst else max(self.rate, 1.0)
+        except (TypeError, ValueError):
+            self.capacity = 0.0
+        if self.capacity <= 0:
+            raise ValueError('The burst must be a positive number of requests, got: {}'.format(burst))
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.throttle_codes = throttle_codes
+        self._context_key = context_key
+        self._lock = threading.Lock()
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.blocked_until = 0.0
+        self.backoff = 0.0
+        self.counters = {'sent': 0, 'throttled': 0, 'retried': 0}
+        if context_key:
+            self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+    def to_dict(self):
+        """
+        :return: The limiter state.
+        :rtype: ``dict``
+        """
+        return {
+            'tokens': self.tokens,
+            'updated': self.updated,
+            'blocked_until': self.blocked_until,
+            'backoff': self.backoff,
+            'counters': dict(self.counters)
+        }
+
+    def load(self):
+        """
+        Loads the limiter state from the integration context.
+        """
+        state = get_integration_context().get(self._context_key) or {}
+        self.tokens = min(float(state.get('tokens', self.tokens)), self.capacity)
+        self.updated = float(state.get('updated', self.updated))
+        self.blocked_until = float(state.get('blocked_until', self.blocked_until))
+        self.backoff = float(state.get('backoff', self.backoff))
+        self.counters.update(state.get('counters', {}))
+
+    def save(self):
+        """
+        Saves the limiter state to the integration context, so the limits are kept between runs.
+        """
+        if not self._context_key:
+            return
+        with self._lock:
+            state = self.to_dict()
+        integration_context = get_integration_context()
+        integration_context[self._context_key] = state
+        set_integration_context(integration_context)
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def acquire(self):
+        """
+        Blocks until a request is allowed to be sent, and takes a token for it.
+
+        :return: The time (in seconds) the request was held.
+        :rtype: ``float``
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.time()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.counters['sent'] += 1
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    @staticmethod
+    def parse_retry_after(retry_after):
+        """
+        Parses the value of a Retry-After header.
+
+        :type retry_after: ``str``
+        :param retry_after: The header value, either a number of seconds or an HTTP date.
+
+        :return: The number of seconds to wait, or None if the value could not be parsed.
+        :rtype: ``float``
+        """
+        if not retry_after:
+            return None
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            from email.utils import parsedate_tz, mktime_tz
+            parsed_date = parsedate_tz(retry_after)
+            if not parsed_date:
+                return None
+            return max(mktime_tz(parsed_date) - time.time(), 0.0)
+
+    def update(self, status_code, retry_after=None):
+        """
+        Updates the limiter with the status of a response.
+
+        :type status_code: ``int``
+        :param status_code: The response status code.
+
+        :type retry_after: ``str``
+        :param retry_after: The Retry-After header of the response, if any.
+
+        :return: Whether the response is a throttling response.
+        :rtype: ``bool``
+        """
+        with self._lock:
+            if status_code not in self.throttle_codes:
+                # recover gradually from previous throttling
+                self.backoff = self.backoff / 2 if self.backoff >= 2 else 0.0
+                return False
+
+            self.counters['throttled'] += 1
+            wait = self.parse_retry_after(retry_after)
+            if wait is None:
+                self.backoff = min(max(self.backoff * 2, 1.0), self.max_backoff)
+                wait = self.backoff
+            wait = min(wait, self.max_backoff)
+            self.blocked_until = max(self.blocked_until, time.time() + wait)
+            self.tokens = min(self.tokens, 0.0)
+        demisto.debug('Throttled with status code {}, holding requests for {} seconds'.format(status_code, wait))
+        return True
+
+    @staticmethod
+    def get_body_positions(data=None, files=None):
+        """
+        Gets the positions of the file-like request bodies, so they can be rewound before a request is retried.
+
+        :type data: ``Any``
+        :param data: The ``data`` argument of the request.
+
+        :type files: ``Any``
+        :param files: The ``files`` argument of the request.
+
+        :return: List of (file, position) tuples, or None if a body is a stream which cannot be rewound.
+        :rtype: ``list``
+        """
+        bodies = [data]
+        if files:
+            for value in (files.values() if isinstance(files, dict) else [item[1] for item in files]):
+                bodies.append(value[1] if isinstance(value, (tuple, list)) and len(value) > 1 else value)
+
+        positions = []
+        for body in bodies:
+            if body is None or isinstance(body, STRING_TYPES + (bytearray, dict, list, tuple)):
+                # sent again as is
+                continue
+            try:
+                positions.append((body, body.tell()))
+            except Exception:
+                return None
+        return positions
+
+    def send(self, send_func, *args, **kwargs):
+        """
+        Sends a request under the rate limit, retrying it if it is throttled.
+        File-like bodies are rewound before a retry. A request with a body which cannot be rewound,
+        such as a generator, is not retried.
+
+        :type send_func: ``callable``
+        :param send_func: The function which sends the request, e.g. ``requests.Session.request``.
+            Should return a response object with the ``status_code`` and ``headers`` attributes.
+
+        :return: The response returned by ``send_func``.
+        :rtype: ``requests.Response``
+        """
+        body_positions = self.get_body_positions(kwargs.get('data'), kwargs.get('files'))
+        attempt = 0
+        while True:
+            self.acquire()
+            res = send_func(*args, **kwargs)
+            is_throttled = self.update(res.status_code, res.headers.get('Retry-After'))
+            if not is_throttled or attempt >= self.max_retries:
+                return res
+            if body_positions is None:
+                demisto.debug('The throttled request has a streamed body, so it is not retried')
+                return res
+            for body, position in body_positions:
+                body.seek(position)
+            attempt += 1
+            with self._lock:
+                self.counters['retried'] += 1
+
+
 # Will add only if 'requests' module imported
 if 'requests' in sys.modules:
     class BaseClient(object):
@@ -5931,17 +6390,34 @@ if 'requests' in sys.modules:
             The request authorization, for example: (username, password).
             Can be None.
 
+        :type pool_size: ``int``
+        :param pool_size:
+            The maximal number of keep-alive connections kept open per host, which is also the default amount
+            of concurrent requests sent by ``_http_request_many``. Default is the requests default (10).
+
+        :type rate_limiter: ``RateLimiter``
+        :param rate_limiter:
+            A rate limiter to send the requests through, to stay in the API quota and handle throttling responses.
+            Can be None.
+
         :return: No data returned
         :rtype: ``None``
         """
 
-        def __init__(self, base_url, verify=True, proxy=False, ok_codes=tuple(), headers=None, auth=None):
+        def __init__(self, base_url, verify=True, proxy=False, ok_codes=tuple(), headers=None, auth=None,
+                     pool_size=None, rate_limiter=None):
             self._base_url = base_url
             self._verify = verify
             self._ok_codes = ok_codes
             self._headers = headers
             self._auth = auth
+            self._pool_size = pool_size or requests.adapters.DEFAULT_POOLSIZE
+            self.rate_limiter = rate_limiter
             self._session = requests.Session()
+            self._adapters = {}  # type: Dict[tuple, HTTPAdapter]
+            self._adapters_lock = threading.Lock()
+            if pool_size:
+                self._mount_adapter(HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
             if not proxy:
                 skip_proxy()
 
@@ -5991,23 +6467,43 @@ if 'requests' in sys.modules:
                 been exhausted.
             """
             try:
-                retry = Retry(
-                    total=retries,
-                    read=retries,
-                    connect=retries,
-                    backoff_factor=backoff_factor,
-                    status=retries,
-                    status_forcelist=status_list_to_retry,
-                    method_whitelist=frozenset(['GET', 'POST', 'PUT']),
-                    raise_on_status=raise_on_status,
-                    raise_on_redirect=raise_on_redirect
-                )
-                adapter = HTTPAdapter(max_retries=retry)
-                self._session.mount('http://', adapter)
-                self._session.mount('https://', adapter)
+                # adapters are kept per retry configuration, so the connection pool of an adapter is reused
+                # by all the requests which share its configuration
+                adapter_key = (retries, tuple(status_list_to_retry or ()), backoff_factor, raise_on_redirect,
+                               raise_on_status)
+                with self._adapters_lock:
+                    adapter = self._adapters.get(adapter_key)
+                    if adapter is None:
+                        retry = Retry(
+                            total=retries,
+                            read=retries,
+                            connect=retries,
+                            backoff_factor=backoff_factor,
+                            status=retries,
+                            status_forcelist=status_list_to_retry,
+                            method_whitelist=frozenset(['GET', 'POST', 'PUT']),
+                            raise_on_status=raise_on_status,
+                            raise_on_redirect=raise_on_redirect
+                        )
+                        adapter = HTTPAdapter(max_retries=retry, pool_connections=self._pool_size,
+                                              pool_maxsize=self._pool_size)
+                        self._adapters[adapter_key] = adapter
+                if self._session.adapters.get('https://') is not adapter:
+                    self._mount_adapter(adapter)
             except NameError:
                 pass
 
+        def _mount_adapter(self, adapter):
+            """
+            Mounts the given adapter on the session for both http and https.
+
+            :type adapter: ``HTTPAdapter``
+            :param adapter: The adapter to mount.
+            """
+            with self._adapters_lock:
+                self._session.mount('http://', adapter)
+                self._session.mount('https://', adapter)
+
         def _http_request(self, method, url_suffix='', full_url=None, headers=None, auth=None, json_data=None,
                           params=None, data=None, files=None, timeout=10, resp_type='json', ok_codes=None,
                           return_empty_response=False, retries=0, status_list_to_retry=None,
@@ -6117,7 +6613,7 @@ if 'requests' in sys.modules:
                 if retries:
                     self._implement_retry(retries, status_list_to_retry, backoff_factor, raise_on_redirect, raise_on_status)
                 # Execute
-                res = self._session.request(
+                res = self._send_request(
                     method,
                     address,
                     verify=self._verify,
@@ -6198,6 +6694,74 @@ if 'requests' in sys.modules:
                 err_msg = 'Max Retries Error- Request attempts with {} retries failed. \n{}'.format(retries, reason)
                 raise DemistoException(err_msg, exception)
 
+        def _http_request_many(self, requests_kwargs, max_workers=None, **kwargs):
+            """Sends multiple requests concurrently over the client session, using a bounded pool of threads.
+
+            :type requests_kwargs: ``list``
+            :param requests_kwargs:
+                A list of dictionaries, each holds the ``_http_request`` arguments of a single request,
+                for example: [{'method': 'GET', 'url_suffix': 'files/1'}, {'method': 'GET', 'url_suffix': 'files/2'}].
+
+            :type max_workers: ``int``
+            :param max_workers:
+                The maximal number of requests sent at the same time. Use it to respect the concurrency limits of
+                the API vendor. Default is the client pool size.
+
+            :type kwargs: ``dict``
+            :param kwargs:
+                ``_http_request`` arguments which are common to all requests, for example: resp_type='text'.
+                Arguments in ``requests_kwargs`` take precedence. Retry arguments should be passed here, as the
+                retry mechanism is shared by the whole session.
+
+            :return:
+                The results of the requests, in the same order as ``requests_kwargs``. A request which failed
+                has the raised exception in its place.
+            :rtype: ``list``
+            """
+            if not requests_kwargs:
+                return []
+
+            if kwargs.get('retries'):
+                self._implement_retry(kwargs['retries'], kwargs.get('status_list_to_retry'),
+                                      kwargs.get('backoff_factor', 5), kwargs.get('raise_on_redirect', False),
+                                      kwargs.get('raise_on_status', False))
+
+            def send_request(request_kwargs):
+                try:
+                    request_args = dict(kwargs)
+                    request_args.update(request_kwargs)
+                    return self._http_request(**request_args)
+                except Exception as exception:
+                    return exception
+
+            workers = min(max_workers or self._pool_size, len(requests_kwargs))
+            if workers <= 1:
+                return [send_request(request_kwargs) for request_kwargs in requests_kwargs]
+
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(workers)
+            try:
+                return pool.map(send_request, requests_kwargs)
+            finally:
+                pool.close()
+                pool.join()
+
+        def _send_request(self, method, address, **kwargs):
+            """Sends a request over the client session, through the rate limiter if one is configured.
+
+            :type method: ``str``
+            :param method: The HTTP method, for example: GET, POST, and so on.
+
+            :type address: ``str``
+            :param address: The full request URL.
+
+            :return: The response of the request.
+            :rtype: ``requests.Response``
+            """
+            if self.rate_limiter:
+                return self.rate_limiter.send(self._session.request, method, address, **kwargs)
+            return self._session.request(method, address, **kwargs)
+
         def _is_status_code_valid(self, response, ok_codes=None):
             """If the status code is OK, return 'True'.
 
@@ -6221,6 +6785,7 @@ if 'requests' in sys.modules:
 
 def batch(iterable, batch_size=1):
     """Gets an iterable and yields slices of it.
+    Iterables which can't be sliced (e.g. generators) are consumed lazily, and their slices are lists.
 
     :type iterable: ``list``
     :param iterable: list or other iterable object.
@@ -6231,12 +6796,16 @@ def batch(iterable, batch_size=1):
     :rtype: ``list``
     :return:: Iterable slices of given
     """
-    current_batch = iterable[:batch_size]
-    not_batched = iterable[batch_size:]
-    while current_batch:
-        yield current_batch
-        current_batch = not_batched[:batch_size]
-        not_batched = not_batched[batch_size:]
+    if not hasattr(iterable, '__getitem__'):
+        iterator = iter(iterable)
+        current_batch = list(islice(iterator, batch_size))
+        while current_batch:
+            yield current_batch
+            current_batch = list(islice(iterator, batch_size))
+        return
+
+    for start in range(0, len(iterable), batch_size):
+        yield iterable[start:start + batch_size]
 
 
 def dict_safe_get(dict_object, keys, default_return_value=None, return_type=None, raise_return_type=True):
@@ -6288,6 +6857,8 @@ def dict_safe_get(dict_object, keys, default_return_value=None, return_type=None
 
 CONTEXT_UPDATE_RETRY_TIMES = 3
 MIN_VERSION_FOR_VERSIONED_CONTEXT = '6.0.0'
+# Maps an integration context key to its last seen JSON value and the value decoded from it
+_DECODED_INTEGRATION_CONTEXT = {}  # type: dict
 
 
 def merge_lists(original_list, updated_list, key):
@@ -6407,32 +6978,10 @@ def set_to_integration_context_with_retries(context, object_keys=None, sync=True
     :rtype: ``None``
     :return: None
     """
-    attempt = 0
-
-    # do while...
-    while True:
-        if attempt == max_retry_times:
-            raise Exception('Failed updating integration context. Max retry attempts exceeded.')
-
-        # Update the latest context and get the new version
-        integration_context, version = update_integration_context(context, object_keys, sync)
-
-        demisto.debug('Attempting to update the integration context with version {}.'.format(version))
-
-        # Attempt to update integration context with a version.
-        # If we get a ValueError (DB Version), then the version was not updated and we need to try again.
-        attempt += 1
-        try:
-            set_integration_context(integration_context, sync, version)
-            demisto.debug('Successfully updated integration context with version {}.'
-                          ''.format(version))
-            break
-        except ValueError as ve:
-            demisto.debug('Failed updating integration context with version {}: {} Attempts left - {}'
-                          ''.format(version, str(ve), CONTEXT_UPDATE_RETRY_TIMES - attempt))
-            # Sleep for a random time
-            time_to_sleep = randint(1, 100) / 1000
-            time.sleep(time_to_sleep)
+    store = IntegrationContextStore(object_keys, sync, max_retry_times)
+    store.update(context)
+    store.flush()
+    demisto.debug('Integration context write metrics: {}'.format(store.get_metrics()))
 
 
 def get_integration_context_with_version(sync=True):
@@ -6480,17 +7029,498 @@ def update_integration_context(context, object_keys=None, sync=True):
         object_keys = {}
 
     for key, _ in context.items():
-        latest_object = json.loads(integration_context.get(key, '[]'))
         updated_object = context[key]
         if key in object_keys:
+            latest_object = _decode_integration_context_value(key, integration_context.get(key, '[]'))
+            # Round trip only the updated objects, so the merged list matches its JSON and can be cached
+            updated_object = json.loads(json.dumps(updated_object))
             merged_list = merge_lists(latest_object, updated_object, object_keys[key])
             integration_context[key] = json.dumps(merged_list)
+            _DECODED_INTEGRATION_CONTEXT[key] = (integration_context[key], merged_list)
         else:
             integration_context[key] = json.dumps(updated_object)
 
     return integration_context, version
 
 
+def _decode_integration_context_value(key, value):
+    """
+    Decodes a JSON integration context value, reusing the last decoded value of the key if it did not change.
+    The decoded value is shared between calls, so it must not be modified.
+
+    :type key: ``str``
+    :param key: The integration context key.
+
+    :type value: ``str``
+    :param value: The JSON value of the key.
+
+    :rtype: ``Any``
+    :return: The decoded value.
+    """
+    cached = _DECODED_INTEGRATION_CONTEXT.get(key)
+    if cached and cached[0] == value:
+        return cached[1]
+    decoded = json.loads(value)
+    _DECODED_INTEGRATION_CONTEXT[key] = (value, decoded)
+    return decoded
+
+
+class IntegrationContextStore(object):
+    """
+    Collects updates to the integration context and writes them together with a single versioned write.
+    Updates to keys in object_keys are merged by their unique ID, so a later update of an object replaces
+    an earlier one. Only the updated keys are merged and serialized, and they are decoded only when they
+    changed since this process last read or wrote them.
+
+    >>> with IntegrationContextStore({'mirrors': 'investigation_id'}) as store:
+    >>>     store.update({'mirrors': [mirror]})
+    >>>     store.update({'bot_id': bot_id})
+
+    :type object_keys: ``dict``
+    :param object_keys: A dictionary to map between context keys and their unique ID for merging them.
+
+    :type sync: ``bool``
+    :param sync: Whether to save the context directly to the DB.
+
+    :type max_retry_times: ``int``
+    :param max_retry_times: The maximum number of attempts to write on version conflicts.
+
+    :return: The integration context store
+    :rtype: ``IntegrationContextStore``
+    """
+
+    def __init__(self, object_keys=None, sync=True, max_retry_times=CONTEXT_UPDATE_RETRY_TIMES):
+        self.object_keys = object_keys or {}
+        self.sync = sync
+        self.max_retry_times = max_retry_times
+        self._updates = {}  # type: dict
+        self.writes = 0
+        self.conflicts = 0
+        self.last_write_seconds = 0.0
+        self.total_write_seconds = 0.0
+        self.context_size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None and self._updates:
+            self.flush()
+
+    def update(self, context):
+        """
+        Adds updates to write with the next flush.
+
+        :type context: ``dict``
+        :param context: A dictionary of keys and values to set.
+
+        :rtype: ``None``
+        :return: None
+        """
+        for key, value in context.items():
+            if key in self.object_keys:
+                object_key = self.object_keys[key]
+                updated_objects = self._updates.setdefault(key, OrderedDict())
+                for element in value:
+                    updated_objects[element[object_key]] = element
+            else:
+                self._updates[key] = value
+
+    def flush(self):
+        """
+        Writes the updates to the integration context after merging them with the latest integration context.
+        If the version is too old by the time the context is set,
+        another attempt will be made until the limit after a random sleep.
+
+        :rtype: ``None``
+        :return: None
+        """
+        context = {}
+        for key, value in self._updates.items():
+            context[key] = list(value.values()) if key in self.object_keys else value
+        attempt = 0
+
+        # do while...
+        while True:
+            if attempt == self.max_retry_times:
+                raise Exception('Failed updating integration context. Max retry attempts exceeded.')
+
+            # Update the latest context and get the new version
+            integration_context, version = update_integration_context(context, self.object_keys, self.sync)
+
+            demisto.debug('Attempting to update the integration context with version {}.'.format(version))
+
+            # Attempt to update integration context with a version.
+            # If we get a ValueError (DB Version), then the version was not updated and we need to try again.
+            attempt += 1
+            start_time = time.time()
+            try:
+                set_integration_context(integration_context, self.sync, version)
+                demisto.debug('Successfully updated integration context with version {}.'
+                              ''.format(version))
+                break
+            except ValueError as ve:
+                self.conflicts += 1
+                demisto.debug('Failed updating integration context with version {}: {} Attempts left - {}'
+                              ''.format(version, str(ve), self.max_retry_times - attempt))
+                # Sleep for a random time
+                time_to_sleep = randint(1, 100) / 1000
+                time.sleep(time_to_sleep)
+            finally:
+                self.last_write_seconds = time.time() - start_time
+                self.total_write_seconds += self.last_write_seconds
+
+        self.writes += 1
+        self.context_size = sum(len(value) for value in integration_context.values()
+                                if isinstance(value, STRING_TYPES))
+        self._updates = {}
+
+    def get_metrics(self):
+        """
+        Gets the write metrics of the store.
+
+        :rtype: ``dict``
+        :return: The number of writes and version conflicts, the write latency in seconds and the size of the
+            serialized context values in characters after the last write.
+        """
+        return {
+            'writes': self.writes,
+            'conflicts': self.conflicts,
+            'last_write_seconds': round(self.last_write_seconds, 3),
+            'total_write_seconds': round(self.total_write_seconds, 3),
+            'context_size': self.context_size
+        }
+
+
+FEED_CACHE_KEY = 'feed_cache'
+INDICATORS_DELTA_KEY = 'delta_fingerprints'
+FEED_DOWNLOAD_CHUNK_SIZE = 1024 * 64
+# the size of the downloaded content of a feed response which is kept in memory, before moving it to a file
+FEED_MAX_SPOOL_SIZE = 1024 * 1024 * 8
+
+
+def get_params_digest(params):
+    """
+    Gets a digest of the instance parameters, to tell whether the instance configuration changed.
+
+    :type params: ``dict``
+    :param params: The instance parameters.
+
+    :rtype: ``str``
+    :return: The hex digest of the parameters.
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def is_feed_cache_enabled(params):
+    """
+    The feed cache skips submitting the indicators of feeds which were not modified since the last fetch, so it can
+    be used only by feeds whose indicators never expire. Indicators of any other expiration policy (including the
+    per indicator type policy, which may be an interval) would expire if they were not submitted on every fetch.
+
+    :type params: ``dict``
+    :param params: The instance parameters.
+
+    :rtype: ``bool``
+    :return: True if the feed cache can be used.
+    """
+    return params.get('feedExpirationPolicy') == 'never'
+
+
+def get_feed_cache(key='urls', enabled=True):
+    """
+    Gets the validators (ETag and Last-Modified headers, or a digest of the content) of each feed
+    from the last fetch, which are kept in the integration context.
+    The cache is emptied when the instance configuration changes.
+
+    :type key: ``str``
+    :param key: The key of the feeds validators in the cache, e.g. urls.
+
+    :type enabled: ``bool``
+    :param enabled: Whether the feed supports the cache, see ``is_feed_cache_enabled`` for the other conditions.
+
+    :rtype: ``dict``
+    :return: Dict of {feed: validators}, or None if the cache is disabled.
+    """
+    params = demisto.params()
+    if not enabled or not is_feed_cache_enabled(params):
+        return None
+    feed_cache = get_integration_context().get(FEED_CACHE_KEY) or {}
+    if feed_cache.get('params_digest') != get_params_digest(params):
+        return {}
+    return feed_cache.get(key, {})
+
+
+def set_feed_cache(feed_to_validators, key='urls'):
+    """
+    Saves the validators of each feed to the integration context.
+    Should be called only after all of the indicators were submitted.
+
+    :type feed_to_validators: ``dict``
+    :param feed_to_validators: Dict of {feed: validators}.
+
+    :type key: ``str``
+    :param key: The key of the feeds validators in the cache, e.g. urls.
+
+    :return: No data returned
+    :rtype: ``None``
+    """
+    integration_context = get_integration_context()
+    integration_context[FEED_CACHE_KEY] = {
+        'params_digest': get_params_digest(demisto.params()),
+        key: feed_to_validators,
+    }
+    set_integration_context(integration_context)
+
+
+def get_conditional_headers(validators):
+    """
+    Gets the headers of a conditional request, according to the validators of the feed from the last fetch.
+
+    :type validators: ``dict``
+    :param validators: The validators of the feed.
+
+    :rtype: ``dict``
+    :return: The conditional request headers.
+    """
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+class SpooledResponse(object):
+    """
+    A response whose content was downloaded to a spooled temporary file (which is kept in memory up to
+    FEED_MAX_SPOOL_SIZE), and hashed chunk by chunk while it was downloaded.
+    The content is downloaded when the response is created, so the connection is closed right after it, and the
+    content can be read later on like the content of the response.
+
+    :type response: ``requests.Response``
+    :param response: The (streamed) response.
+
+    :return: The spooled response
+    :rtype: ``SpooledResponse``
+    """
+
+    def __init__(self, response):
+        self.url = response.url
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = response.headers
+        self.ok = response.ok
+        self._response = response
+        self._file = tempfile.SpooledTemporaryFile(max_size=FEED_MAX_SPOOL_SIZE)
+        digest = hashlib.sha256()
+        try:
+            for chunk in response.iter_content(FEED_DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                self._file.write(chunk)
+        except Exception:
+            self._file.close()
+            raise
+        finally:
+            response.close()
+        self._file.seek(0)
+        self.digest = digest.hexdigest()
+
+    @property
+    def content(self):
+        self._file.seek(0)
+        return self._file.read()
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    def iter_content(self, chunk_size=FEED_DOWNLOAD_CHUNK_SIZE):
+        self._file.seek(0)
+        for chunk in iter(lambda: self._file.read(chunk_size), b''):
+            yield chunk
+
+    def iter_lines(self, chunk_size=FEED_DOWNLOAD_CHUNK_SIZE):
+        """
+        Iterates over the lines of the content, like ``requests.Response.iter_lines``.
+        """
+        pending = None
+        for chunk in self.iter_content(chunk_size):
+            if pending is not None:
+                chunk = pending + chunk
+            lines = chunk.splitlines()
+            if lines and lines[-1] and lines[-1][-1] == chunk[-1]:
+                pending = lines.pop()
+            else:
+                pending = None
+            for line in lines:
+                yield line
+        if pending is not None:
+            yield pending
+
+    def close(self):
+        self._file.close()
+
+
+def get_futures_results(futures):
+    """
+    Gets the results of completed futures. If any of them failed, the responses of the others are closed and the
+    first error is raised.
+
+    :type futures: ``list``
+    :param futures: The completed futures of the requests.
+
+    :rtype: ``list``
+    :return: List of the responses, in the order of the futures.
+    """
+    errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        for future in futures:
+            if not future.exception():
+                future.result().close()
+        raise errors[0]
+    return [future.result() for future in futures]
+
+
+def get_content_digest(response):
+    """
+    Gets the digest of the response content. A spooled response was already hashed while it was downloaded.
+
+    :type response: ``requests.Response``
+    :param response: The response.
+
+    :rtype: ``str``
+    :return: The hex digest of the content.
+    """
+    if isinstance(response, SpooledResponse):
+        return response.digest
+    return hashlib.sha256(response.content).hexdigest()
+
+
+def is_response_modified(response, validators):
+    """
+    Checks whether the feed content was modified since the last fetch, and updates the validators in place.
+    When the server sends no ETag or Last-Modified headers, a digest of the content is compared instead.
+
+    :type response: ``requests.Response``
+    :param response: The response of the (conditional) request.
+
+    :type validators: ``dict``
+    :param validators: The validators of the feed from the last fetch.
+
+    :rtype: ``bool``
+    :return: True if the content was modified.
+    """
+    if response.status_code == 304:
+        return False
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        new_validators = {'etag': etag, 'last_modified': last_modified}
+    else:
+        new_validators = {'digest': get_content_digest(response)}
+    modified = new_validators != validators
+    validators.clear()
+    validators.update(new_validators)
+    return modified
+
+
+class IndicatorsDelta(object):
+    """
+    Delta mode - keeps a fingerprint (a 64 bit hash of the value) of each indicator of the last fetch in the
+    integration context, as a compressed sorted array, in order to submit only the indicators which were added since.
+    As the indicators which were not changed are not submitted again, the delta mode can be used only by feeds whose
+    indicators never expire, like the feed cache. Indicators which were removed from the feed are not expired, as
+    only the fingerprints of their values are kept.
+
+    :type previous: ``array``
+    :param previous: The sorted fingerprints of the last fetch.
+
+    :return: The indicators delta
+    :rtype: ``IndicatorsDelta``
+    """
+    # 'L' is 64 bit on the python 2 docker images, which do not support 'Q'
+    TYPECODE = 'Q' if IS_PY3 else 'L'
+
+    def __init__(self, previous):
+        self.previous = previous
+        self.current = array(self.TYPECODE)
+
+    @classmethod
+    def load(cls):
+        """
+        Loads the fingerprints of the last fetch, if the delta mode is enabled.
+        The fingerprints are dropped when the instance configuration changes.
+
+        :rtype: ``IndicatorsDelta``
+        :return: The indicators delta, or None if the delta mode is disabled.
+        """
+        params = demisto.params()
+        if not argToBoolean(params.get('delta_mode') or False):
+            return None
+        if not is_feed_cache_enabled(params):
+            demisto.info('The delta mode is supported only with the Never expiration policy, fetching all of the '
+                         'indicators. Select the Never expiration policy or clear the delta mode parameter.')
+            return None
+        previous = array(cls.TYPECODE)
+        delta = get_integration_context().get(INDICATORS_DELTA_KEY) or {}
+        if delta.get('params_digest') == get_params_digest(params):
+            fingerprints = zlib.decompress(base64.b64decode(delta.get('fingerprints', '')))
+            if IS_PY3:
+                previous.frombytes(fingerprints)
+            else:
+                previous.fromstring(fingerprints)
+        return cls(previous)
+
+    def save(self):
+        """
+        Saves the fingerprints of the current fetch to the integration context.
+        Should be called only after all of the indicators were submitted.
+
+        :return: No data returned
+        :rtype: ``None``
+        """
+        current = self.get_current()
+        fingerprints = current.tobytes() if IS_PY3 else current.tostring()
+        integration_context = get_integration_context()
+        integration_context[INDICATORS_DELTA_KEY] = {
+            'params_digest': get_params_digest(demisto.params()),
+            'fingerprints': base64.b64encode(zlib.compress(fingerprints)).decode(),
+        }
+        set_integration_context(integration_context)
+
+    @staticmethod
+    def fingerprint(value):
+        return struct.unpack('>Q', hashlib.sha1(value.encode('utf-8')).digest()[:8])[0]
+
+    def is_new(self, value):
+        """
+        Records the indicator value in the current fetch, and checks whether it was not in the last fetch.
+        """
+        fingerprint = self.fingerprint(value)
+        self.current.append(fingerprint)
+        i = bisect_left(self.previous, fingerprint)
+        return i == len(self.previous) or self.previous[i] != fingerprint
+
+    def get_current(self):
+        """
+        :rtype: ``array``
+        :return: The sorted unique fingerprints of the current fetch.
+        """
+        return array(self.TYPECODE, sorted(set(self.current)))
+
+    def filter(self, indicators):
+        """
+        Filters the indicators to submit in delta mode, one by one.
+
+        :type indicators: ``Iterable``
+        :param indicators: The indicators.
+
+        :rtype: ``Iterator``
+        :return: Generator of the indicators to submit.
+        """
+        return (indicator for indicator in indicators if self.is_new(indicator['value']))
+
+
 class DemistoException(Exception):
     def __init__(self, message, exception=None, res=None, *args):
         self.res = res
@@ -6899,19 +7929,90 @@ class TableOrListWidget(BaseWidget):
 
 
 class IndicatorsSearcher:
-    """Used in order to search indicators by the paging or serachAfter param
-     :type page: ``int``
+    """Used in order to search indicators by the paging or serachAfter param.
+    Iterating over the searcher returns the search results page by page.
+
+    :type page: ``int``
     :param page: the number of page from which we start search indicators from.
 
+    :type query: ``str``
+    :param query: indicator search query, used when iterating over the searcher.
+
+    :type size: ``int``
+    :param size: the number of indicators to fetch in each page, used when iterating over the searcher.
+
+    :type limit: ``int``
+    :param limit: the maximal number of indicators to return when iterating over the searcher. None for no limit.
+
+    :type from_date: ``str``
+    :param from_date: the start date to search from, used when iterating over the searcher.
+
+    :type to_date: ``str``
+    :param to_date: the end date to search until to, used when iterating over the searcher.
+
+    :type value: ``str``
+    :param value: the indicator value to search, used when iterating over the searcher.
+
+    :type filter_fields: ``list``
+    :param filter_fields: the fields to keep in each of the returned indicators (e.g. ['value', 'indicator_type']).
+        None to keep all the fields. The fields are filtered after each page is searched.
+
     :return: No data returned
     :rtype: ``None``
     """
-    def __init__(self, page=0):
+    def __init__(self, page=0, query='', size=100, limit=None, from_date=None, to_date=None, value='',
+                 filter_fields=None):
         # searchAfter is available in searchIndicators from version 6.1.0
         self._can_use_search_after = is_demisto_version_ge('6.1.0')
         self._search_after_title = 'searchAfter'
         self._search_after_param = None
         self._page = page
+        self._query = query
+        self._size = size
+        self._limit = limit
+        self._from_date = from_date
+        self._to_date = to_date
+        self._value = value
+        self._filter_fields = filter_fields
+        self._total_fetched = 0
+        # the number of seconds each of the searches took
+        self._page_times = []  # type: List[float]
+
+    def __iter__(self):
+        if self._limit is not None and self._limit <= 0:
+            return
+        is_last_page = False
+        while not is_last_page:
+            size = self._size
+            if self._limit is not None:
+                size = min(size, self._limit - self._total_fetched)
+            res, is_advanced = self._search_page(size)
+            iocs = res.get('iocs') or []
+            # a short page is the last one, as is a page which did not advance the searchAfter param
+            is_last_page = len(iocs) < self._size or not is_advanced
+            if self._limit is not None:
+                iocs = iocs[:self._limit - self._total_fetched]
+                is_last_page = is_last_page or self._total_fetched + len(iocs) >= self._limit
+            self._total_fetched += len(iocs)
+
+            if self._filter_fields:
+                iocs = [{field: ioc[field] for field in self._filter_fields if field in ioc} for ioc in iocs]
+            res['iocs'] = iocs
+            yield res
+
+    def _search_page(self, size):
+        """Searches the next page of indicators.
+
+        :type size: ``int``
+        :param size: the number of indicators to fetch.
+
+        :return: the search results, and whether the search advanced the searchAfter param
+        :rtype: ``tuple``
+        """
+        search_after_param = self._search_after_param
+        res = self.search_indicators_by_version(from_date=self._from_date, query=self._query, size=size,
+                                                to_date=self._to_date, value=self._value)
+        return res, not self._can_use_search_after or self._search_after_param != search_after_param
 
     def search_indicators_by_version(self, from_date=None, query='', size=100, to_date=None, value=''):
         """There are 2 cases depends on the sever version:
@@ -6936,6 +8037,7 @@ class IndicatorsSearcher:
         :return: object contains the search results
         :rtype: ``dict``
         """
+        start_time = time.time()
         if self._can_use_search_after:
             res = demisto.searchIndicators(fromDate=from_date, toDate=to_date, query=query, size=size, value=value,
                                            searchAfter=self._search_after_param)
@@ -6949,12 +8051,23 @@ class IndicatorsSearcher:
                                            value=value)
             self._page += 1
 
+        self._page_times.append(time.time() - start_time)
         return res
 
     @property
     def page(self):
         return self._page
 
+    @property
+    def total_fetched(self):
+        """The number of indicators which were returned while iterating over the searcher"""
+        return self._total_fetched
+
+    @property
+    def page_times(self):
+        """The number of seconds each of the searches took"""
+        return self._page_times
+
 
 class AutoFocusKeyRetriever:
     """AutoFocus API Key management class
@@ -17,7 +17,8 @@ from CommonServerPython import xml2json, json2xml, entryTypes, formats, tableToM
     argToBoolean, ipv4Regex, ipv4cidrRegex, ipv6cidrRegex, ipv6Regex, batch, FeedIndicatorType, \
     encode_string_results, safe_load_json, remove_empty_elements, aws_table_to_markdown, is_demisto_version_ge, \
     appendContext, auto_detect_indicator_type, handle_proxy, get_demisto_version_as_str, get_x_content_info_headers, \
-    url_to_clickable_markdown, WarningsHandler, DemistoException
+    url_to_clickable_markdown, WarningsHandler, DemistoException, get_indicator_type_classifier, urlRegex, emailRegex, \
+    cveRegex, md5Regex, sha1Regex, sha256Regex, sha512Regex
 
 try:
     from StringIO import StringIO
@@ -479,6 +480,53 @@ def test_tbl_keep_headers_list():
     assert headers == ['header_1', 'header_2']
 
 
+def test_tbl_to_md_max_rows():
+    """
+    Given:
+        - A table with 3 rows.
+    When:
+        - Rendering it with max_rows=2.
+    Then:
+        - Only the first 2 rows are rendered, followed by a footer with the total amount of rows.
+    """
+    table = tableToMarkdown('tableToMarkdown test', DATA, max_rows=2)
+    expected_table = '''### tableToMarkdown test
+|header_1|header_2|header_3|
+|---|---|---|
+| a1 | b1 | c1 |
+| a2 | b2 | c2 |
+
+**Showing 2 of 3 entries.**
+'''
+    assert table == expected_table
+    assert tableToMarkdown('tableToMarkdown test', DATA, max_rows=3) == TABLE_TO_MARKDOWN_ONLY_DATA_PACK[0][1]
+
+
+def test_tbl_to_md_remove_null_simple_values():
+    table = tableToMarkdown('tableToMarkdown test', ['', None], headers='value', removeNull=True)
+    assert table == '### tableToMarkdown test\n**No entries.**\n'
+    table = tableToMarkdown('tableToMarkdown test', ['', 'a|b'], headers='value', removeNull=True)
+    assert table == '### tableToMarkdown test\n|value|\n|---|\n|  |\n| a\\|b |\n'
+
+
+def test_iter_table_to_markdown():
+    """
+    Given:
+        - A table with 3 rows, one of its columns is empty.
+    When:
+        - Rendering it in chunks of 2 rows.
+    Then:
+        - The chunks are split by rows, and joined together are equal to the tableToMarkdown result.
+    """
+    from CommonServerPython import iter_table_to_markdown
+    data = [dict(row, header_4=None) for row in DATA]
+    chunks = list(iter_table_to_markdown('tableToMarkdown test', data, removeNull=True, chunk_size=2))
+    assert len(chunks) == 2
+    assert chunks[1] == '| a3 | b3 | c3 |\n'
+    assert ''.join(chunks) == tableToMarkdown('tableToMarkdown test', data, removeNull=True)
+    assert ''.join(chunks) == TABLE_TO_MARKDOWN_ONLY_DATA_PACK[0][1]
+
+
 @pytest.mark.parametrize('data, expected_data', COMPLEX_DATA_WITH_URLS)
 def test_url_to_clickable_markdown(data, expected_data):
     table = url_to_clickable_markdown(data, url_keys=['url', 'links'])
@@ -746,6 +794,7 @@ def test_get_error_need_raise_error_on_non_error_input():
     ("this is a test", b"this is a test"),
     (u"עברית", u"עברית".encode('utf-8')),
     (b"binary data\x15\x00", b"binary data\x15\x00"),
+    ((chunk for chunk in [u"first ", b"second"]), b"first second"),
 ])  # noqa: E124
 def test_fileResult(mocker, request, data, data_expected):
     mocker.patch.object(demisto, 'uniqueFile', return_value="test_file_result")
@@ -2269,6 +2318,55 @@ class TestBaseClient:
             assert e.res.status_code == 400
             assert resp_json.get('error') == 'additional text'
 
+    def test_http_request_many(self, requests_mock):
+        """
+            Given
+            - A base client
+
+            When
+            - Sending several requests concurrently, one of them fails
+
+            Then
+            - Ensure the results are returned in the order of the requests, with the error in place of the failed one
+        """
+        from CommonServerPython import DemistoException
+        for i in range(5):
+            requests_mock.get('http://example.com/api/v2/event/{}'.format(i), json={'id': i})
+        requests_mock.get('http://example.com/api/v2/event/3', status_code=500)
+        results = self.client._http_request_many([{'url_suffix': 'event/{}'.format(i)} for i in range(5)],
+                                                 max_workers=3, method='GET')
+        assert [res.get('id') for res in results if isinstance(res, dict)] == [0, 1, 2, 4]
+        assert isinstance(results[3], DemistoException)
+        assert requests_mock.call_count == 5
+
+    def test_pool_size(self):
+        from CommonServerPython import BaseClient
+        client = BaseClient('http://example.com/api/v2/', pool_size=32)
+        assert client._session.get_adapter('https://example.com')._pool_maxsize == 32
+
+    def test_implement_retry_reuses_adapters(self, mocker):
+        """
+            Given
+            - A base client
+
+            When
+            - Implementing the same retry configuration several times
+
+            Then
+            - Ensure a single adapter is created for the configuration and is kept mounted
+        """
+        from CommonServerPython import BaseClient
+        import CommonServerPython
+        mocker.patch.object(CommonServerPython, 'Retry')
+        client = BaseClient('http://example.com/api/v2/')
+        client._implement_retry(retries=3, status_list_to_retry=[429])
+        adapter = client._session.get_adapter('https://example.com')
+        client._implement_retry(retries=3, status_list_to_retry=[429])
+        assert client._session.get_adapter('https://example.com') is adapter
+        client._implement_retry(retries=2)
+        assert client._session.get_adapter('https://example.com') is not adapter
+        assert len(client._adapters) == 2
+
     def test_is_valid_ok_codes_empty(self):
         from requests import Response
         from CommonServerPython import BaseClient
@@ -2383,6 +2481,200 @@ def test_http_client_debug_int_logger_sensitive_query_params(mocker):
             assert 'apikey=<XX_REPLACED>' in arg[0][0]
 
 
+class TestRateLimiter:
+    class FakeTime(object):
+        """Replaces the time module of CommonServerPython, so sleeping only advances the clock"""
+
+        def __init__(self):
+            self.now = 1000.0
+            self.sleeps = []
+
+        def time(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+    def test_token_bucket(self, mocker):
+        """
+            Given
+            - A rate limiter which allows 2 requests per second, with a bucket of 2
+
+            When
+            - Acquiring 3 tokens at once
+
+            Then
+            - Ensure only the third request is held, for half a second
+        """
+        from CommonServerPython import RateLimiter
+        import CommonServerPython
+        fake_time = self.FakeTime()
+        mocker.patch.object(CommonServerPython, 'time', fake_time)
+        limiter = RateLimiter(rate=2, burst=2)
+        assert [limiter.acquire() for _ in range(3)] == [0, 0, 0.5]
+        assert fake_time.sleeps == [0.5]
+        assert limiter.counters['sent'] == 3
+
+    @pytest.mark.parametrize('retry_after, expected', [('7', 7.0), ('-1', 0.0), ('not a date', None), (None, None),
+                                                       ('Wed, 21 Oct 2015 07:28:00 GMT', 0.0)])
+    def test_parse_retry_after(self, retry_after, expected):
+        from CommonServerPython import RateLimiter
+        assert RateLimiter.parse_retry_after(retry_after) == expected
+
+    def test_http_request_throttled(self, mocker, requests_mock):
+        """
+            Given
+            - A base client with a rate limiter
+
+            When
+            - The API answers with 429 twice, first with a Retry-After header and then without it
+
+            Then
+            - Ensure the request is retried until it succeeds
+            - Ensure requests are held according to the Retry-After header, and then according to the backoff
+            - Ensure the counters are updated
+        """
+        from CommonServerPython import BaseClient, RateLimiter
+        import CommonServerPython
+        fake_time = self.FakeTime()
+        mocker.patch.object(CommonServerPython, 'time', fake_time)
+        requests_mock.get('http://example.com/api/v2/event', [
+            {'status_code': 429, 'headers': {'Retry-After': '3'}},
+            {'status_code': 429},
+            {'json': {'status': 'ok'}},
+        ])
+        limiter = RateLimiter(rate=100)
+        client = BaseClient('http://example.com/api/v2/', rate_limiter=limiter)
+
+        assert client._http_request('get', 'event') == {'status': 'ok'}
+        assert fake_time.sleeps == [3.0, 1.0]
+        assert limiter.counters == {'sent': 3, 'throttled': 2, 'retried': 2}
+        assert limiter.backoff == 0
+
+    def test_http_request_throttled_max_retries(self, mocker, requests_mock):
+        from CommonServerPython import BaseClient, RateLimiter, DemistoException
+        import CommonServerPython
+        mocker.patch.object(CommonServerPython, 'time', self.FakeTime())
+        requests_mock.get('http://example.com/api/v2/event', status_code=429)
+        limiter = RateLimiter(rate=100, max_retries=2, max_backoff=10)
+        client = BaseClient('http://example.com/api/v2/', rate_limiter=limiter)
+
+        with raises(DemistoException, match='429'):
+            client._http_request('get', 'event')
+        assert limiter.counters == {'sent': 3, 'throttled': 3, 'retried': 2}
+        assert limiter.backoff == 4.0
+
+    def test_save_and_load(self, mocker):
+        from CommonServerPython import RateLimiter
+        import CommonServerPython
+        integration_context = {'other': 'value'}
+        mocker.patch.object(CommonServerPython, 'get_integration_context', return_value=integration_context)
+        set_context = mocker.patch.object(CommonServerPython, 'set_integration_context')
+        limiter = RateLimiter(rate=1, context_key='rate_limiter')
+        limiter.update(503)
+        limiter.save()
+        saved_context = set_context.call_args[0][0]
+        assert saved_context['other'] == 'value'
+        assert saved_context['rate_limiter']['counters']['throttled'] == 1
+
+        new_limiter = RateLimiter(rate=1, context_key='rate_limiter')
+        assert new_limiter.backoff == 1.0
+        assert new_limiter.blocked_until == limiter.blocked_until
+        assert new_limiter.counters == limiter.counters
+
+    @pytest.mark.parametrize('rate', [0, -1, None, 'fast'])
+    def test_invalid_rate(self, rate):
+        from CommonServerPython import RateLimiter
+        with raises(ValueError, match='positive'):
+            RateLimiter(rate=rate)
+
+    @pytest.mark.parametrize('rate, burst, expected_rate, expected_capacity', [
+        ('5', None, 5.0, 5.0),
+        ('0.5', '', 0.5, 1.0),
+        ('2', '10', 2.0, 10.0),
+    ])
+    def test_string_arguments(self, rate, burst, expected_rate, expected_capacity):
+        """
+            Given
+            - Rate limit arguments as strings, like integration parameters
+
+            When
+            - Creating a rate limiter
+
+            Then
+            - Ensure the rate and the bucket size are parsed, and the bucket size defaults to the rate
+        """
+        from CommonServerPython import RateLimiter
+        limiter = RateLimiter(rate=rate, burst=burst)
+        assert limiter.rate == expected_rate
+        assert limiter.capacity == expected_capacity
+        assert limiter.tokens == expected_capacity
+
+    @pytest.mark.parametrize('burst', ['-1', 'many'])
+    def test_invalid_burst(self, burst):
+        from CommonServerPython import RateLimiter
+        with raises(ValueError, match='positive'):
+            RateLimiter(rate='5', burst=burst)
+
+    def test_context_manager_saves(self, mocker):
+        """
+            Given
+            - A rate limiter with a context key, used as a context manager
+
+            When
+            - A request is throttled inside the block
+
+            Then
+            - Ensure the limiter state is saved when the block exits
+        """
+        from CommonServerPython import RateLimiter
+        import CommonServerPython
+        mocker.patch.object(CommonServerPython, 'get_integration_context', return_value={})
+        set_context = mocker.patch.object(CommonServerPython, 'set_integration_context')
+        with RateLimiter(rate=1, context_key='rate_limiter') as limiter:
+            limiter.update(429)
+        assert set_context.call_args[0][0]['rate_limiter']['counters']['throttled'] == 1
+
+    def test_retry_rewinds_file_body(self, mocker):
+        """
+            Given
+            - A request with a file body and a file to upload
+
+            When
+            - The request is throttled once
+
+            Then
+            - Ensure the retry sends the whole bodies again
+        """
+        from CommonServerPython import RateLimiter
+        import CommonServerPython
+        import io
+        mocker.patch.object(CommonServerPython, 'time', self.FakeTime())
+        responses = [mocker.Mock(status_code=429, headers={}), mocker.Mock(status_code=200, headers={})]
+        sent = []
+
+        def send_func(data=None, files=None):
+            sent.append((data.read(), files['file'][1].read()))
+            return responses.pop(0)
+
+        limiter = RateLimiter(rate=100)
+        res = limiter.send(send_func, data=io.BytesIO(b'body'), files={'file': ('a.txt', io.BytesIO(b'file'))})
+        assert res.status_code == 200
+        assert sent == [(b'body', b'file'), (b'body', b'file')]
+
+    def test_streamed_body_not_retried(self, mocker):
+        from CommonServerPython import RateLimiter
+        import CommonServerPython
+        mocker.patch.object(CommonServerPython, 'time', self.FakeTime())
+        send_func = mocker.Mock(return_value=mocker.Mock(status_code=429, headers={}))
+
+        limiter = RateLimiter(rate=100)
+        res = limiter.send(send_func, data=(chunk for chunk in [b'a', b'b']))
+        assert res.status_code == 429
+        assert send_func.call_count == 1
+
+
 class TestParseDateRange:
     @staticmethod
     def test_utc_time_sanity():
@@ -2597,7 +2889,10 @@ batch_params = [
     ([1, 2, 3], 5, [[1, 2, 3]]),
     # out of index in end with batches
     ([1, 2, 3, 4, 5], 2, [[1, 2], [3, 4], [5]]),
-    ([1] * 100, 2, [[1, 1]] * 50)
+    ([1] * 100, 2, [[1, 1]] * 50),
+    # generator case
+    ((i for i in range(1, 6)), 2, [[1, 2], [3, 4], [5]]),
+    (iter([]), 2, [])
 ]
 
 
@@ -2607,6 +2902,19 @@ def test_batch(iterable, sz, expected):
         assert expected[i] == item
 
 
+def test_batch_generator_is_consumed_lazily():
+    consumed = []
+
+    def generator():
+        for i in range(5):
+            consumed.append(i)
+            yield i
+
+    batches = batch(generator(), 2)
+    assert next(batches) == [0, 1]
+    assert consumed == [0, 1]
+
+
 regexes_test = [
     (ipv4Regex, '192.168.1.1', True),
     (ipv4Regex, '192.168.1.1/24', False),
@@ -2836,6 +3144,101 @@ def test_auto_detect_indicator_type(indicator_value, indicatory_type):
                              " use a docker image with it installed such as: demisto/jmespath"
 
 
+def build_indicator_types_corpus(size=20000):
+    import random
+    rand = random.Random(1)
+    seeds = [value for value, _ in INDICATOR_VALUE_AND_TYPE] + [
+        '1.1.1.1/33', '1.1.1[.]1/24', '256.1.1.1', '1.1.1.1/', '2001:db8::/32', '::1', '::ffff:1.2.3.4',
+        'hxxps://test[.]com/path?q=1', 'www[.]test.com', 'ftp.test.com', 'CVE-2020-12345', 'cve-2020-0001',
+        'cve-2020-01', 'test.co.uk', '*.test.com', 'localhost', 'com', 'a_b@c.d', 'fe80::1%eth0', '',
+    ]
+    suffixes = ['', '', '/', '/24', ':', ':8080', '.', '.com', '@test.com', 'a', 'g', '_', ' ', '-', '*', '\u05d0']
+    alphabet = '0123456789abcdefABCDEFxyz.:/@-_*[] '
+    corpus = []
+    while len(corpus) < size:
+        seed = rand.choice(seeds)
+        mutation = rand.randint(0, 4)
+        if mutation == 0:
+            value = seed[:rand.randint(0, len(seed))]
+        elif mutation == 1:
+            value = rand.choice(suffixes) + seed
+        elif mutation == 2:
+            value = ''.join(rand.choice(alphabet) for _ in range(rand.choice([4, 16, 32, 40, 64, 128, 129])))
+        elif mutation == 3:
+            value = seed.upper() if rand.randint(0, 1) else seed.lower()
+        else:
+            value = seed
+        corpus.append(value + rand.choice(suffixes))
+    return corpus
+
+
+def reference_auto_detect_indicator_type(indicator_value, no_cache_extract):
+    for regex, indicator_type in [(ipv4cidrRegex, FeedIndicatorType.CIDR), (ipv6cidrRegex, FeedIndicatorType.IPv6CIDR),
+                                  (ipv4Regex, FeedIndicatorType.IP), (ipv6Regex, FeedIndicatorType.IPv6),
+                                  (sha256Regex, FeedIndicatorType.File), (urlRegex, FeedIndicatorType.URL),
+                                  (md5Regex, FeedIndicatorType.File), (sha1Regex, FeedIndicatorType.File),
+                                  (emailRegex, FeedIndicatorType.Email), (cveRegex, FeedIndicatorType.CVE),
+                                  (sha512Regex, FeedIndicatorType.File)]:
+        if re.match(regex, indicator_value):
+            return indicator_type
+    try:
+        if no_cache_extract(indicator_value).suffix:
+            if '*' in indicator_value:
+                return FeedIndicatorType.DomainGlob
+            return FeedIndicatorType.Domain
+    except Exception:
+        pass
+    return None
+
+
+@pytest.mark.skipif(not IS_PY3, reason='tldextract is installed only in the python 3 test environment')
+def test_indicator_type_classifier_corpus():
+    """
+        Given
+            - A large corpus of indicators, mutations of them and random values.
+
+        When
+            - Classifying them with the indicator type classifier.
+
+        Then
+            - Validate each type is the same as the one of the regex chain auto detection used to return.
+    """
+    import tldextract
+    no_cache_extract = tldextract.TLDExtract(cache_file=False, suffix_list_urls=None)
+    corpus = build_indicator_types_corpus()
+
+    types = get_indicator_type_classifier().classify_many(corpus)
+
+    assert len(types) == len(corpus)
+    for value, indicator_type in zip(corpus, types):
+        assert indicator_type == reference_auto_detect_indicator_type(value, no_cache_extract), value
+    assert set(types) == {FeedIndicatorType.CIDR, FeedIndicatorType.IPv6CIDR, FeedIndicatorType.IP, FeedIndicatorType.IPv6,
+                          FeedIndicatorType.File, FeedIndicatorType.URL, FeedIndicatorType.Email, FeedIndicatorType.CVE,
+                          FeedIndicatorType.Domain, FeedIndicatorType.DomainGlob, None}
+
+
+@pytest.mark.skipif(not IS_PY3, reason='tldextract is installed only in the python 3 test environment')
+def test_indicator_type_classifier_tld_extract_failure(mocker):
+    """
+        Given
+            - The public suffix list fails to load.
+
+        When
+            - Creating an indicator type classifier and classifying values.
+
+        Then
+            - Validate the values are classified without the domain types, like the regex chain auto detection.
+    """
+    import tldextract
+    from CommonServerPython import IndicatorTypeClassifier
+    mocker.patch.object(tldextract, 'TLDExtract', side_effect=Exception('failed to load the suffix list'))
+
+    classifier = IndicatorTypeClassifier()
+
+    assert classifier.classify('1.1.1.1') == FeedIndicatorType.IP
+    assert classifier.classify('example.com') is None
+
+
 def test_handle_proxy(mocker):
     os.environ['REQUESTS_CA_BUNDLE'] = '/test1.pem'
     mocker.patch.object(demisto, 'params', return_value={'insecure': True})
@@ -3187,6 +3590,7 @@ def test_set_latest_integration_context_es(mocker):
                         side_effect=[({}, es_inv_context_version_first),
                                      ({}, es_inv_context_version_second)])
     mocker.patch.object(CommonServerPython, 'set_integration_context', side_effect=[ValueError, {}])
+    mocker.patch.object(demisto, 'debug')
 
     # Arrange
     CommonServerPython.set_to_integration_context_with_retries({})
@@ -3198,6 +3602,10 @@ def test_set_latest_integration_context_es(mocker):
     assert int_context_calls == 2
     assert int_context_args_1[1:] == (True, es_inv_context_version_first)
     assert int_context_args_2[1:] == (True, es_inv_context_version_second)
+    metrics_logs = [call[0][0] for call in demisto.debug.call_args_list
+                    if call[0][0].startswith('Integration context write metrics')]
+    assert len(metrics_logs) == 1
+    assert "'conflicts': 1" in metrics_logs[0]
 
 
 def test_set_latest_integration_context_fail(mocker):
@@ -3227,6 +3635,72 @@ def test_set_latest_integration_context_fail(mocker):
     assert int_context_calls == CommonServerPython.CONTEXT_UPDATE_RETRY_TIMES
 
 
+def test_integration_context_store_batches_updates(mocker):
+    import CommonServerPython
+
+    # Set
+    set_integration_context_versioned({
+        'mirrors': MIRRORS,
+        'conversations': CONVERSATIONS
+    })
+
+    mocker.patch.object(demisto, 'getIntegrationContextVersioned', side_effect=get_integration_context_versioned)
+    mocker.patch.object(demisto, 'setIntegrationContextVersioned',
+                        side_effect=lambda context, version, sync: set_integration_context_versioned(context))
+    mocker.patch.object(CommonServerPython, 'is_versioned_context_available', return_value=True)
+    mirrors = json.loads(MIRRORS)
+    first_mirror = dict(mirrors[0], mirrored=False)
+    second_mirror = dict(mirrors[1], remove=True)
+
+    # Arrange
+    with CommonServerPython.IntegrationContextStore(OBJECTS_TO_KEYS) as store:
+        store.update({'mirrors': [first_mirror, mirrors[1]]})
+        store.update({'mirrors': [second_mirror], 'bot_id': 'W12345678'})
+        first_mirror['mirrored'] = True
+
+    context = get_integration_context_versioned()['context']
+
+    # Assert
+    assert demisto.setIntegrationContextVersioned.call_count == 1
+    new_mirrors = json.loads(context['mirrors'])
+    assert len(new_mirrors) == len(mirrors) - 1
+    for mirror in [first_mirror] + mirrors[2:]:
+        assert mirror in new_mirrors
+    assert context['bot_id'] == '"W12345678"'
+    assert context['conversations'] == CONVERSATIONS
+    assert store.get_metrics()['writes'] == 1
+    assert store.get_metrics()['context_size'] == sum(len(value) for value in context.values())
+
+
+def test_update_context_reuses_decoded_value(mocker):
+    import CommonServerPython
+
+    # Set
+    set_integration_context_versioned({
+        'mirrors': MIRRORS,
+        'conversations': CONVERSATIONS
+    })
+
+    mocker.patch.object(demisto, 'getIntegrationContextVersioned', side_effect=get_integration_context_versioned)
+    mocker.patch.object(CommonServerPython, 'is_versioned_context_available', return_value=True)
+    new_mirror = {'investigation_id': '999', 'mirrored': False}
+
+    # Arrange
+    context, _ = CommonServerPython.update_integration_context({'mirrors': [new_mirror]}, OBJECTS_TO_KEYS, True)
+    set_integration_context_versioned(context)
+    loads = mocker.spy(json, 'loads')
+    context, _ = CommonServerPython.update_integration_context({'mirrors': [dict(new_mirror, mirrored=True)]},
+                                                               OBJECTS_TO_KEYS, True)
+
+    # Assert
+    # Only the updated objects are decoded, the latest mirrors are the ones written by the first update
+    assert loads.call_count == 1
+    new_mirrors = json.loads(context['mirrors'])
+    assert len(new_mirrors) == len(json.loads(MIRRORS)) + 1
+    for mirror in json.loads(MIRRORS) + [dict(new_mirror, mirrored=True)]:
+        assert mirror in new_mirrors
+
+
 def test_get_x_content_info_headers(mocker):
     test_license = 'TEST_LICENSE_ID'
     test_brand = 'TEST_BRAND'
@@ -3510,6 +3984,68 @@ def test_arg_to_timestamp_invalid_inputs():
         assert '"2010-32-01" is not a valid date' in str(e)
 
 
+def test_dateparser_imported_on_first_use():
+    """
+    Given
+        a new python process
+
+    When
+        importing CommonServerPython and then parsing a date with arg_to_datetime
+
+    Then
+        ensure dateparser is imported only by the date parsing
+    """
+    if sys.version_info.major == 2:
+        # skip for python 2 - date
+        assert True
+        return
+
+    import subprocess
+
+    code = '\n'.join([
+        'import sys',
+        'import CommonServerPython',
+        'print("dateparser" in sys.modules)',
+        'CommonServerPython.arg_to_datetime("3 days")',
+        'print("dateparser" in sys.modules)',
+    ])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env).decode('utf-8')
+
+    assert output.split() == ['False', 'True']
+
+
+def test_lazy_module_patch(mocker):
+    """
+    Given
+        the lazily imported dateparser module
+
+    When
+        patching a function of it, and then stopping the patch
+
+    Then
+        ensure the patched function is used, and that the original function is restored
+    """
+    if sys.version_info.major == 2:
+        # skip for python 2 - date
+        assert True
+        return
+
+    import dateparser
+    import CommonServerPython
+
+    original_parse = dateparser.parse
+    mocker.patch.object(CommonServerPython.dateparser, 'parse', return_value='parsed')
+
+    assert CommonServerPython.dateparser.parse('3 days') == 'parsed'
+    assert dateparser.parse('3 days') == 'parsed'
+
+    mocker.stopall()
+
+    assert CommonServerPython.dateparser.parse is original_parse
+    assert dateparser.parse is original_parse
+
+
 def test_warnings_handler(mocker):
     mocker.patch.object(demisto, 'info')
     # need to initialize WarningsHandler as pytest over-rides the handler
@@ -4152,6 +4688,245 @@ class TestIndicatorsSearcher:
         assert search_indicators_obj_search_after._search_after_param == 5
         assert search_indicators_obj_search_after._page == 0
 
+    def test_iterate_search_indicators(self, mocker):
+        """
+        Given:
+          - A searcher with a page size of 2, a limit of 5 and filter fields
+        When:
+          - Iterating over the searcher, while there are 7 indicators
+        Then:
+          - Ensure 5 indicators are returned in 3 pages, with only the filter fields
+          - Ensure the last page requested only the indicators which were left to the limit
+        """
+        from CommonServerPython import IndicatorsSearcher
+        indicators = [{'value': str(i), 'indicator_type': 'IP', 'score': 1} for i in range(7)]
+
+        def search_indicators(size, page, **kwargs):
+            return {'iocs': indicators[page * 2:page * 2 + size], 'total': len(indicators)}
+
+        mocker.patch.object(demisto, 'searchIndicators', side_effect=search_indicators)
+        search_indicators_obj = IndicatorsSearcher(size=2, limit=5, filter_fields=['value', 'indicator_type'])
+        search_indicators_obj._can_use_search_after = False
+
+        pages = [res['iocs'] for res in search_indicators_obj]
+
+        assert pages == [[{'value': '0', 'indicator_type': 'IP'}, {'value': '1', 'indicator_type': 'IP'}],
+                         [{'value': '2', 'indicator_type': 'IP'}, {'value': '3', 'indicator_type': 'IP'}],
+                         [{'value': '4', 'indicator_type': 'IP'}]]
+        assert demisto.searchIndicators.call_args_list[-1][1]['size'] == 1
+        assert search_indicators_obj.total_fetched == 5
+        assert len(search_indicators_obj.page_times) == 3
+
+    def test_iterate_search_indicators_stops(self, mocker):
+        """
+        Given:
+          - Searching indicators using the searchAfter parameter
+        When:
+          - Iterating over the searcher, while the last page is short, or while searchAfter does not advance
+        Then:
+          - Ensure the iteration stops
+        """
+        from CommonServerPython import IndicatorsSearcher
+        mocker.patch.object(demisto, 'searchIndicators', side_effect=[
+            {'iocs': [{'value': '1'}, {'value': '2'}], 'searchAfter': [1]},
+            {'iocs': [{'value': '3'}], 'searchAfter': [2]},
+        ])
+        search_indicators_obj = IndicatorsSearcher(size=2)
+        search_indicators_obj._can_use_search_after = True
+        assert [len(res['iocs']) for res in search_indicators_obj] == [2, 1]
+
+        mocker.patch.object(demisto, 'searchIndicators', return_value={'iocs': [{'value': '1'}, {'value': '2'}]})
+        search_indicators_obj = IndicatorsSearcher(size=2)
+        search_indicators_obj._can_use_search_after = True
+        assert [len(res['iocs']) for res in search_indicators_obj] == [2]
+
+    def test_iterate_search_indicators_error(self, mocker):
+        """
+        Given:
+          - A search which fails in the background
+        When:
+          - Iterating over the searcher
+        Then:
+          - Ensure the error is raised to the iterating code
+        """
+        from CommonServerPython import IndicatorsSearcher
+        mocker.patch.object(demisto, 'searchIndicators', side_effect=ValueError('failed'))
+        search_indicators_obj = IndicatorsSearcher()
+        with pytest.raises(ValueError, match='failed'):
+            list(search_indicators_obj)
+
+
+class TestFeedCache:
+    @pytest.mark.parametrize('expiration_policy, expected_cache', [
+        ('never', {'https://www.example.com': {'etag': '"v1"'}}),
+        ('interval', None),
+        ('indicatorType', None),
+        ('suddenDeath', None),
+    ])
+    def test_get_feed_cache(self, mocker, expiration_policy, expected_cache):
+        """
+        Given
+        - A feed cache saved by the last fetch, and a feed expiration policy.
+
+        When
+        - Getting the feed cache.
+
+        Then
+        - Ensure the cache is enabled only for the never expiration policy.
+        """
+        from CommonServerPython import get_feed_cache, set_feed_cache
+        integration_context = {}
+        mocker.patch.object(demisto, 'params', return_value={'feedExpirationPolicy': expiration_policy})
+        mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+        mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+
+        set_feed_cache({'https://www.example.com': {'etag': '"v1"'}})
+
+        assert get_feed_cache() == expected_cache
+
+    def test_get_feed_cache_params_changed(self, mocker):
+        """
+        Given
+        - A feed cache saved by the last fetch, after which the instance configuration changed.
+
+        When
+        - Getting the feed cache.
+
+        Then
+        - Ensure the cache is empty.
+        """
+        from CommonServerPython import get_feed_cache, set_feed_cache
+        integration_context = {}
+        mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+        mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+        mocker.patch.object(demisto, 'params', return_value={'feedExpirationPolicy': 'never', 'url': 'https://a.com'})
+        set_feed_cache({'https://a.com': {'etag': '"v1"'}})
+
+        mocker.patch.object(demisto, 'params', return_value={'feedExpirationPolicy': 'never', 'url': 'https://b.com'})
+
+        assert get_feed_cache() == {}
+
+    def test_spooled_response(self, mocker, requests_mock):
+        """
+        Given
+        - A streamed response with content bigger than the spool memory size.
+
+        When
+        - Spooling the response.
+
+        Then
+        - Ensure the digest is of the whole content, the connection is closed and the content can still be read.
+        """
+        import hashlib
+        import CommonServerPython
+        from CommonServerPython import SpooledResponse, get_content_digest
+        mocker.patch.object(CommonServerPython, 'FEED_MAX_SPOOL_SIZE', 1024)
+        mocker.patch.object(CommonServerPython, 'FEED_DOWNLOAD_CHUNK_SIZE', 100)
+        url = 'https://www.example.com'
+        content = b'1.1.1.1\n' * 1000
+        requests_mock.get(url, content=content)
+        response = requests.get(url, stream=True)
+
+        spooled_response = SpooledResponse(response)
+
+        assert response.raw.closed
+        assert get_content_digest(spooled_response) == hashlib.sha256(content).hexdigest()
+        assert b''.join(spooled_response.iter_content(100)) == content
+        assert list(spooled_response.iter_lines(chunk_size=7)) == [b'1.1.1.1'] * 1000
+        assert spooled_response.content == content
+
+    @pytest.mark.parametrize('headers, validators, expected_modified', [
+        ({'ETag': '"v1"'}, {'etag': '"v1"', 'last_modified': None}, False),
+        ({'ETag': '"v2"'}, {'etag': '"v1"', 'last_modified': None}, True),
+        ({}, {'digest': 'the digest of the last fetch'}, True),
+        ({}, {}, True),
+    ])
+    def test_is_response_modified(self, requests_mock, headers, validators, expected_modified):
+        """
+        Given
+        - A response and the validators of the last fetch.
+
+        When
+        - Checking whether the feed was modified.
+
+        Then
+        - Ensure the ETag header is compared, or the content digest when there are no validator headers.
+        """
+        from CommonServerPython import SpooledResponse, is_response_modified
+        url = 'https://www.example.com'
+        requests_mock.get(url, content=b'1.1.1.1', headers=headers)
+        response = SpooledResponse(requests.get(url, stream=True))
+
+        assert is_response_modified(response, validators) == expected_modified
+        assert response.content == b'1.1.1.1'
+
+    def test_is_response_modified_same_digest(self, requests_mock):
+        """
+        Given
+        - A response without validator headers, with the same content as in the last fetch.
+
+        When
+        - Checking whether the feed was modified.
+
+        Then
+        - Ensure the feed is not modified.
+        """
+        import hashlib
+        from CommonServerPython import is_response_modified
+        url = 'https://www.example.com'
+        requests_mock.get(url, content=b'1.1.1.1')
+
+        assert not is_response_modified(requests.get(url), {'digest': hashlib.sha256(b'1.1.1.1').hexdigest()})
+
+    def test_indicators_delta(self, mocker):
+        """
+        Given
+        - Indicators delta of a feed whose indicators never expire, and two fetches of indicators.
+
+        When
+        - Filtering the indicators of each fetch.
+
+        Then
+        - Ensure only the indicators which were not in the previous fetch are returned.
+        """
+        from CommonServerPython import IndicatorsDelta
+        integration_context = {}
+        mocker.patch.object(demisto, 'params', return_value={'feedExpirationPolicy': 'never', 'delta_mode': 'true'})
+        mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+        mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+
+        delta = IndicatorsDelta.load()
+        assert [i['value'] for i in delta.filter([{'value': '1.1.1.1'}, {'value': '2.2.2.2'}])] == ['1.1.1.1',
+                                                                                                   '2.2.2.2']
+        delta.save()
+
+        delta = IndicatorsDelta.load()
+        assert [i['value'] for i in delta.filter([{'value': '2.2.2.2'}, {'value': '3.3.3.3'}])] == ['3.3.3.3']
+
+    @pytest.mark.parametrize('params', [
+        {'feedExpirationPolicy': 'never'},
+        {'feedExpirationPolicy': 'indicatorType', 'delta_mode': 'true'},
+        {'feedExpirationPolicy': 'suddenDeath', 'delta_mode': 'true'},
+    ])
+    def test_indicators_delta_disabled(self, mocker, params):
+        """
+        Given
+        - A feed without the delta mode, or whose indicators may expire.
+
+        When
+        - Loading the indicators delta.
+
+        Then
+        - Ensure the delta mode is disabled.
+        """
+        from CommonServerPython import IndicatorsDelta
+        mocker.patch.object(demisto, 'params', return_value=params)
+        mocker.patch.object(demisto, 'info')
+
+        assert IndicatorsDelta.load() is None
+        # a warning is logged only when the delta mode was selected
+        assert demisto.info.call_count == int('delta_mode' in params)
+
 
 class TestAutoFocusKeyRetriever:
     def test_instantiate_class_with_param_key(self, mocker, clear_version_cache):
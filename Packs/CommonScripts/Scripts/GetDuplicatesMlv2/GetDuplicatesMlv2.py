@@ -1,6 +1,8 @@
 import demistomock as demisto
 from CommonServerPython import *
+import base64
 import collections
+import hashlib
 import re
 import dateutil.parser
 import pickle
@@ -10,7 +12,9 @@ import editdistance
 import zlib
 from rfc822 import parseaddr  # type:ignore
 from urlparse import urlparse
+import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.ensemble import RandomForestClassifier
 from datetime import datetime, timedelta
 from sklearn.preprocessing import Imputer
@@ -250,6 +254,11 @@ INSTANCE_LABEL = 'Instance'
 CANDIDATES_FEATURES_NA_RATIO = 0.2
 TIME_FIELD = 'created'
 
+MODEL_NAME_PREFIX = 'GetDuplicatesMlv2'
+ML_MODEL_PARAMS = {'max_depth': 10, 'n_estimators': 100, 'random_state': 1}
+MINHASH_PERMUTATIONS = 64
+MINHASH_PRIME = np.uint64(4294967311)  # smallest prime above 2^32
+
 LABELS_BLACKLIST = [BRAND_LABEL, INSTANCE_LABEL, EMAIL_SENDER_ADDRESS_LABEL, EMAIL_SENDER_NAME_LABEL,
                     EMAIL_SUBJECT_LABEL, EMAIL_RECEIVED_LABEL, EMAIL_ATTACHMENT_LABEL, EMAIL_DATE_LABEL,
                     EMAIL_TEXT_LABEL, EMAIL_HTML_LABEL]
@@ -258,6 +267,7 @@ EMAIL_LABELS_FEATURES = []  # type: list
 EMAIL_LABELS_MAP = {}  # type: dict
 FEATURES = []  # type: list
 INDICATORS_FOR_JACCARD = []  # type: list
+CANDIDATES_PREFILTER_THRESHOLD = 0.0
 
 #############################################################################################
 
@@ -266,11 +276,15 @@ class Utils():
     email_pattern = re.compile(
         r"""[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*""")  # noqa: E501
 
+    tld_extract = None
+
     @staticmethod
     def extract_domain_from_url(url):
-        extract = tldextract.TLDExtract(cache_file='/tmp/.tld_set')
-        domain = extract(url).domain.lower()
-        suffix = extract(url).suffix.lower()
+        if Utils.tld_extract is None:
+            Utils.tld_extract = tldextract.TLDExtract(cache_file='/tmp/.tld_set')
+        extract_result = Utils.tld_extract(url)
+        domain = extract_result.domain.lower()
+        suffix = extract_result.suffix.lower()
         if len(domain) > 0 and len(suffix) > 0:
             return ".".join([domain, suffix])
 
@@ -315,6 +329,31 @@ class Utils():
         except Exception:
             return None
 
+    @staticmethod
+    def parse_time(date):
+        try:
+            if 'datetime' in str(type(date)):
+                return date
+            return dateutil.parser.parse(date)
+        except Exception:
+            return None
+
+    @staticmethod
+    def batch_time_diff_seconds(date, dates):
+        diffs = np.full(len(dates), np.nan)
+        date = Utils.parse_time(date)
+        if date is None:
+            return diffs
+        for i, other_date in enumerate(dates):
+            other_date = Utils.parse_time(other_date)
+            if other_date is None:
+                continue
+            try:
+                diffs[i] = abs(date - other_date).total_seconds()
+            except Exception:
+                pass
+        return diffs
+
     @staticmethod
     def complete_email_missing_labels(labels):
         found_subject = EMAIL_SUBJECT_LABEL in labels
@@ -363,6 +402,19 @@ class Utils():
 
         return domains
 
+    @staticmethod
+    def get_incident_indicators(incident, labels_map):
+        indicators = incident['indicators']
+        domains = Utils.get_unique_list(indicators.get('Domain', []) + Utils.get_domains(indicators, labels_map))
+        if len(domains) > 0:
+            indicators['Domain'] = domains
+
+        if IP_MASK_BITS_FOR_COMPARISON < 32 and IP_MASK_BITS_FOR_COMPARISON > 0:
+            if 'IP' in indicators:
+                indicators['IP'] = map(lambda ip: Utils.canonize_ip_to_netrok(
+                    ip, IP_MASK_BITS_FOR_COMPARISON), indicators['IP'])
+        return indicators
+
     @staticmethod
     def get_unique_list(lst):
         return list(set(lst))
@@ -415,6 +467,37 @@ class Utils():
         union_cardinality = len(Utils.union_set(x, y))
         return intersection_cardinality / float(union_cardinality)
 
+    @staticmethod
+    def get_hashable_set(x):
+        if type(x) is dict:
+            x = Utils.get_hashable_from_dict(x)
+        return set(v for v in x if isinstance(v, collections.Hashable))
+
+    @staticmethod
+    def batch_jaccard_similarity(x, ys):
+        """
+        Same as jaccard_similarity, computed between x and each of ys at once.
+        """
+        similarities = np.zeros(len(ys))
+        if x is None:
+            return similarities
+        x = Utils.get_hashable_set(x)
+        if len(x) == 0:
+            return similarities
+
+        intersection_cardinalities = np.zeros(len(ys))
+        cardinalities = np.zeros(len(ys))
+        for i, y in enumerate(ys):
+            if y is not None:
+                y = Utils.get_hashable_set(y)
+                cardinalities[i] = len(y)
+                intersection_cardinalities[i] = len(x.intersection(y))
+
+        non_empty = cardinalities > 0
+        union_cardinalities = cardinalities + len(x) - intersection_cardinalities
+        similarities[non_empty] = intersection_cardinalities[non_empty] / union_cardinalities[non_empty]
+        return similarities
+
     @staticmethod
     def canonize_ip_to_netrok(ip_address, mast_bits):
         try:
@@ -429,29 +512,11 @@ class IncidentFeatures:
         self.incident1 = incident1
         self.incident2 = incident2
 
-        self.indicators1 = incident1['indicators']
-        self.indicators2 = incident2['indicators']
-
         self.labels_map1 = Utils.get_incident_labels_map(self.incident1['labels'])
         self.labels_map2 = Utils.get_incident_labels_map(self.incident2['labels'])
 
-        domains1 = Utils.get_unique_list(
-            self.indicators1.get('Domain', []) + Utils.get_domains(self.indicators1, self.labels_map2))
-        domains2 = Utils.get_unique_list(
-            self.indicators2.get('Domain', []) + Utils.get_domains(self.indicators2, self.labels_map2))
-
-        if len(domains1) > 0:
-            self.indicators1['Domain'] = domains1
-        if len(domains2) > 0:
-            self.indicators2['Domain'] = domains2
-
-        if IP_MASK_BITS_FOR_COMPARISON < 32 and IP_MASK_BITS_FOR_COMPARISON > 0:
-            if 'IP' in self.indicators1:
-                self.indicators1['IP'] = map(lambda ip: Utils.canonize_ip_to_netrok(
-                    ip, IP_MASK_BITS_FOR_COMPARISON), self.indicators1['IP'])
-            if 'IP' in self.indicators2:
-                self.indicators2['IP'] = map(lambda ip: Utils.canonize_ip_to_netrok(
-                    ip, IP_MASK_BITS_FOR_COMPARISON), self.indicators2['IP'])
+        self.indicators1 = Utils.get_incident_indicators(self.incident1, self.labels_map1)
+        self.indicators2 = Utils.get_incident_indicators(self.incident2, self.labels_map2)
 
     def get_email_labels_features(self):
         def add_label_ld_feature(label_name):
@@ -521,6 +586,110 @@ class IncidentFeatures:
         return features
 
 
+class CandidatesFeatures:
+    """
+    Calculates the IncidentFeatures of an incident against all of its candidates at once.
+    """
+    def __init__(self, incident, candidates):
+        self.incident = incident
+        self.candidates = candidates
+
+        self.labels_map = Utils.get_incident_labels_map(self.incident['labels'])
+        self.indicators = Utils.get_incident_indicators(self.incident, self.labels_map)
+
+        self.candidates_labels_maps = [Utils.get_incident_labels_map(c['labels']) for c in self.candidates]
+        self.candidates_indicators = [Utils.get_incident_indicators(c, labels_map)
+                                      for c, labels_map in zip(self.candidates, self.candidates_labels_maps)]
+
+    def get_candidates_labels(self, label_name):
+        return [labels_map.get(label_name) for labels_map in self.candidates_labels_maps]
+
+    def get_labels_mask(self, label_name):
+        return np.array([label_name in labels_map for labels_map in self.candidates_labels_maps], dtype=bool)
+
+    def get_email_labels_features(self):
+        def add_label_ld_feature(label_name):
+            if label_name in labels:
+                features[label_name] = np.array([
+                    editdistance.eval(labels[label_name], value) if value is not None else np.nan
+                    for value in self.get_candidates_labels(label_name)])
+
+        def add_label_text_feature(label_name):
+            if label_name in labels:
+                values = self.get_candidates_labels(label_name)
+                similarities = Utils.batch_jaccard_similarity(
+                    labels[label_name].split(), [value.split() if value is not None else None for value in values])
+                similarities[~self.get_labels_mask(label_name)] = np.nan
+                features[label_name] = similarities
+
+        features = {}
+        labels = self.labels_map
+
+        if EMAIL_SENDER_ADDRESS_LABEL in labels:
+            sender = Utils.get_email_address(labels[EMAIL_SENDER_ADDRESS_LABEL])
+            if sender:
+                senders = [Utils.get_email_address(value) if value is not None else None
+                           for value in self.get_candidates_labels(EMAIL_SENDER_ADDRESS_LABEL)]
+                features[EMAIL_SENDER_ADDRESS_LABEL] = np.array([
+                    editdistance.eval(sender, other_sender) if other_sender else np.nan for other_sender in senders])
+
+        if EMAIL_DATE_LABEL in labels:
+            time_diffs = Utils.batch_time_diff_seconds(labels[EMAIL_DATE_LABEL],
+                                                       self.get_candidates_labels(EMAIL_DATE_LABEL))
+            time_diffs[~self.get_labels_mask(EMAIL_DATE_LABEL)] = np.nan
+            features[EMAIL_DATE_LABEL] = time_diffs
+
+        add_label_ld_feature(EMAIL_SUBJECT_LABEL)
+        add_label_ld_feature(EMAIL_ATTACHMENT_LABEL)
+        add_label_text_feature(EMAIL_TEXT_LABEL)
+        add_label_text_feature(EMAIL_HTML_LABEL)
+
+        return features
+
+    def get_incident_features(self):
+        def get_other_labels(labels_map):
+            return [(k, v) for (k, v) in labels_map.items() if k not in LABELS_BLACKLIST]
+
+        features = {}
+        features['incident_time_diff'] = Utils.batch_time_diff_seconds(
+            self.incident[TIME_FIELD], [c[TIME_FIELD] for c in self.candidates])
+        features['same_type'] = np.array([c['type'] == self.incident['type'] for c in self.candidates])
+        features['same_severity'] = np.array([c['severity'] == self.incident['severity'] for c in self.candidates])
+        features['custom_fields_jaccard'] = Utils.batch_jaccard_similarity(
+            self.incident.get('CustomFields', []), [c.get('CustomFields', []) for c in self.candidates])
+        features['labels_jaccard'] = Utils.batch_jaccard_similarity(
+            get_other_labels(self.labels_map), map(get_other_labels, self.candidates_labels_maps))
+
+        if INSTANCE_LABEL in self.labels_map:
+            instance = self.labels_map[INSTANCE_LABEL]
+            same_instance = np.array([value == instance for value in self.get_candidates_labels(INSTANCE_LABEL)])
+            features['same_instance'] = np.where(self.get_labels_mask(INSTANCE_LABEL), same_instance, np.nan)
+
+        for indicator_type in INDICATORS_FOR_JACCARD:
+            if indicator_type in self.indicators:
+                similarities = Utils.batch_jaccard_similarity(
+                    self.indicators[indicator_type],
+                    [indicators.get(indicator_type) for indicators in self.candidates_indicators])
+                missing = np.array([indicator_type not in indicators for indicators in self.candidates_indicators],
+                                   dtype=bool)
+                similarities[missing] = np.nan
+                features['indicator_%s_jaccard' % indicator_type] = similarities
+
+        return features
+
+    def calculate_features(self, expected_features=FEATURES):
+        features = {}  # type: dict
+        features.update(self.get_incident_features())
+        features.update(self.get_email_labels_features())
+
+        for key in set(expected_features).difference(set(features.keys())):
+            features[key] = np.full(len(self.candidates), np.nan)
+
+        features_df = pd.DataFrame(features, dtype=float)
+        features_df['id'] = [c['id'] for c in self.candidates]
+        return features_df
+
+
 ##################################################################################
 
 
@@ -614,7 +783,117 @@ def union_complete_missing_values(df1, df2, keys=None):
 
 
 def get_ml_model():
-    return RandomForestClassifier(max_depth=10, n_estimators=100, random_state=1)
+    return RandomForestClassifier(**ML_MODEL_PARAMS)
+
+
+def get_model_name(features_name, columns):
+    return '%s_%s' % (MODEL_NAME_PREFIX, hashlib.sha1('%s|%s' % (features_name, ','.join(columns))).hexdigest()[:12])
+
+
+def get_model_key(X, Y, features_name):
+    """
+    Returns a digest of the training data and the model parameters, so a cached model is used only if it was trained
+    on the same data, with the same parameters and sklearn version.
+    """
+    digest = hashlib.sha1()
+    digest.update('%s|%s|%s|%s' % (features_name, sklearn.__version__, ','.join(X.columns),
+                                   sorted(ML_MODEL_PARAMS.items())))
+    digest.update(np.ascontiguousarray(X.values, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(Y), dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def load_cached_model(model_name, model_key):
+    res = demisto.executeCommand('getMLModel', {'modelName': model_name})[0]
+    if is_error(res):
+        return None
+    try:
+        cached_model_key, model = pickle.loads(zlib.decompress(base64.b64decode(res['Contents']['modelData'])))
+    except Exception as e:
+        demisto.debug('Failed to load cached model %s: %s' % (model_name, str(e)))
+        return None
+    if cached_model_key != model_key:
+        return None
+    return model
+
+
+def store_cached_model(model_name, model_key, model):
+    model_data = base64.b64encode(zlib.compress(pickle.dumps((model_key, model), pickle.HIGHEST_PROTOCOL)))
+    res = demisto.executeCommand('createMLModel', {'modelData': model_data,
+                                                   'modelName': model_name,
+                                                   'modelLabels': ['duplicate', 'not duplicate'],
+                                                   'modelOverride': 'true'})
+    if is_error(res):
+        demisto.debug('Failed to store model %s: %s' % (model_name, get_error(res)))
+
+
+def get_trained_model(X, Y, features_name, use_cache):
+    """
+    Returns a model trained on X, Y. When use_cache is set the trained model is stored in the ML models store,
+    keyed by the training data and features, so next runs with the same training data skip the training.
+    """
+    if use_cache:
+        model_name = get_model_name(features_name, X.columns)
+        model_key = get_model_key(X, Y, features_name)
+        model = load_cached_model(model_name, model_key)
+        if model is not None:
+            return model
+
+    model = get_ml_model()
+    model.fit(X, Y)
+    if use_cache:
+        store_cached_model(model_name, model_key, model)
+    return model
+
+
+def get_incident_tokens(incident):
+    labels_map = Utils.get_incident_labels_map(incident['labels'])
+    tokens = set()
+    for indicator_type in INDICATORS_FOR_JACCARD:
+        tokens.update('%s:%s' % (indicator_type, value) for value in incident['indicators'].get(indicator_type, []))
+    tokens.update('%s:%s' % (k, v) for (k, v) in labels_map.items() if k not in LABELS_BLACKLIST)
+    if EMAIL_SENDER_ADDRESS_LABEL in labels_map:
+        tokens.add('%s:%s' % (EMAIL_SENDER_ADDRESS_LABEL, labels_map[EMAIL_SENDER_ADDRESS_LABEL]))
+    tokens.update('%s:%s' % (EMAIL_SUBJECT_LABEL, word) for word in labels_map.get(EMAIL_SUBJECT_LABEL, '').split())
+    return [token.encode('utf-8') if isinstance(token, unicode) else token for token in tokens]
+
+
+def get_minhash_signatures(tokens_list):
+    """
+    Calculates the MinHash signatures of all the tokens lists at once, empty lists get an all-max signature.
+    """
+    random_state = np.random.RandomState(1)
+    a = random_state.randint(1, 2 ** 31, size=(MINHASH_PERMUTATIONS, 1)).astype(np.uint64)
+    b = random_state.randint(0, 2 ** 31, size=(MINHASH_PERMUTATIONS, 1)).astype(np.uint64)
+
+    signatures = np.full((len(tokens_list), MINHASH_PERMUTATIONS), MINHASH_PRIME, dtype=np.uint64)
+    sizes = np.array([len(tokens) for tokens in tokens_list])
+    hashes = np.array([zlib.crc32(token) & 0xffffffff for tokens in tokens_list for token in tokens], dtype=np.uint64)
+    if len(hashes) == 0:
+        return signatures
+
+    permuted_hashes = (a * hashes + b) % MINHASH_PRIME
+    non_empty = sizes > 0
+    offsets = (np.cumsum(sizes) - sizes)[non_empty]
+    signatures[non_empty] = np.minimum.reduceat(permuted_hashes, offsets, axis=1).T
+    return signatures
+
+
+def filter_candidates_by_similarity(incident, candidates, threshold):
+    """
+    Keeps the candidates whose MinHash estimated jaccard similarity of indicators and labels to the incident is at
+    least threshold. Candidates with nothing to compare are kept.
+    """
+    if threshold <= 0 or len(candidates) == 0:
+        return candidates
+    tokens_list = map(get_incident_tokens, [incident] + candidates)
+    if len(tokens_list[0]) == 0:
+        return candidates
+
+    signatures = get_minhash_signatures(tokens_list)
+    similarities = (signatures[1:] == signatures[0]).mean(axis=1)
+    keep = (similarities >= threshold) | np.array([len(tokens) == 0 for tokens in tokens_list[1:]], dtype=bool)
+    return [candidate for candidate, keep_candidate in zip(candidates, keep) if keep_candidate]
 
 
 def get_result_record(incident, probabilty):
@@ -662,6 +941,7 @@ def main():
     global INDICATORS_FOR_JACCARD
     global MAX_CANDIDATES_IN_LIST
     global TIME_FIELD
+    global CANDIDATES_PREFILTER_THRESHOLD
     for email_label in demisto.args()['compareEmailLabels'].split(","):
         email_label = email_label.strip()
         if ":" in email_label:
@@ -687,6 +967,8 @@ def main():
     MAX_INDICATORS = MAX_INCIDENTS * 100
     THRESHOLD = float(demisto.args().get('threshold', 0.5))
     TIME_FIELD = demisto.args().get('timeField', 'created')
+    CANDIDATES_PREFILTER_THRESHOLD = float(demisto.args().get('candidatesPrefilterThreshold', 0))
+    USE_CACHED_MODEL = demisto.args().get('cacheModel', 'yes') == 'yes'
 
     incident = enrich_incidents_by_indicators(demisto.incidents(), MAX_INDICATORS).values()[0]
 
@@ -699,8 +981,10 @@ def main():
     use_features = set(FEATURES).union(email_features).union(indicators_features)
 
     if len(email_features) > 0:
+        features_name = 'phishing'
         features_df = load_compressed_features(FEATURES_PHISHING_STRING)
     else:
+        features_name = 'others'
         features_df = load_compressed_features(FEATURES_OTHERS_STRING)
 
     use_features = set(features_df.columns).intersection(use_features)
@@ -711,31 +995,25 @@ def main():
 
     X = filter_features(features_df, use_features)
     Y = features_df[DUPLICATE_COL]
-    model = get_ml_model()
-    model.fit(X, Y)
+    model = get_trained_model(X, Y, features_name, USE_CACHED_MODEL and USE_MY_DUPLICATES_X_DAYS_AGO <= 0)
     candidates = enrich_incidents_by_indicators(get_incidents_by_time_diff(incident.get('id'),
                                                                            incident[TIME_FIELD],
                                                                            IGNORE_CLOSED_INCIDENTS,
                                                                            MAX_INCIDENTS, TIME_DIFF_HOURS), MAX_INDICATORS)
     candidates.pop(incident['id'], None)
 
-    candidates_features_list = []
-    for candidate in candidates.values():
-        feature_dict = IncidentFeatures(incident, candidate).calculate_features()
-        feature_dict['id'] = candidate['id']
-        candidates_features_list.append(feature_dict)
-    if len(candidates_features_list) == 0:
+    candidates_list = filter_candidates_by_similarity(incident, candidates.values(), CANDIDATES_PREFILTER_THRESHOLD)
+    if len(candidates_list) == 0:
         demisto.results('Did not find any duplicate incidents candidates')
         return
 
-    candidates_features = pd.DataFrame.from_dict(candidates_features_list)
+    candidates_features = CandidatesFeatures(incident, candidates_list).calculate_features(FEATURES)
     candidates_features = candidates_features.dropna(axis=0, thresh=(len(use_features) * (1 - CANDIDATES_FEATURES_NA_RATIO)))
     candidates_features_x = filter_features(candidates_features, use_features)
     candidates_features_x = union_complete_missing_values(X, candidates_features_x, ['features', 'candidates']).loc['candidates']
-    predications_prob = model.predict_proba(candidates_features_x)
-    predications = model.predict(candidates_features_x)
+    predications_prob = model.predict_proba(candidates_features_x[X.columns])
     result = []
-    for i in range(0, len(predications)):
+    for i in range(0, len(predications_prob)):
         incident_id = candidates_features.iloc[i]['id']
         probability = predications_prob[i][1]
         if probability >= THRESHOLD:
@@ -42,3 +42,146 @@ def test_extract_domain_from_url():
     assert res == 'google.com'
     res = Utils.extract_domain_from_url("https://www.google.co.il")  # disable-secrets-detection
     assert res == 'google.co.il'
+
+
+def get_incident(incident_id, indicators, labels, incident_type='Phishing', created='2020-01-01T10:00:00Z'):
+    return {
+        'id': incident_id,
+        'type': incident_type,
+        'severity': 1,
+        'created': created,
+        'CustomFields': {'field': incident_id[-1]},
+        'indicators': indicators,
+        'labels': [{'type': k, 'value': v} for k, v in labels.items()]
+    }
+
+
+INCIDENT = get_incident('1', {'IP': ['1.1.1.1', '2.2.2.2'], 'Email': ['a@test.com']},
+                        {'Email/headers/From': 'a@test.com', 'Email/headers/Subject': 'invoice due today',
+                         'Email/text': 'please pay the invoice', 'Instance': 'mail', 'Team': 'red'})
+CANDIDATES = [
+    get_incident('2', {'IP': ['1.1.1.1', '2.2.2.2'], 'Email': ['a@test.com']},
+                 {'Email/headers/From': 'a@test.com', 'Email/headers/Subject': 'invoice due today',
+                  'Email/text': 'please pay the invoice now', 'Instance': 'mail', 'Team': 'red'}),
+    get_incident('3', {'IP': ['3.3.3.3']},
+                 {'Email/headers/From': 'b@other.com', 'Email/headers/Subject': 'lunch',
+                  'Instance': 'other', 'Team': 'blue'}, incident_type='Other', created='2020-01-05T10:00:00Z'),
+    get_incident('4', {'URL': ['http://test.com/a']}, {'Team': 'red'}, created='not a date'),
+    get_incident('5', {}, {}),
+]
+
+
+def test_candidates_features(mocker):
+    """
+    Given:
+        - An incident and duplicate, unrelated and partial candidates.
+    When:
+        - Calculating the features of all the candidates at once.
+    Then:
+        - Validate the features are the same as the ones calculated for each pair of incidents.
+    """
+    import copy
+    import numpy as np
+    import GetDuplicatesMlv2
+    from GetDuplicatesMlv2 import CandidatesFeatures, IncidentFeatures
+    mocker.patch.object(GetDuplicatesMlv2, 'INDICATORS_FOR_JACCARD', ['IP', 'Email', 'Domain', 'URL'])
+    expected_features = ['labels_jaccard', 'incident_time_diff', 'Email/headers/Date']
+
+    features_df = CandidatesFeatures(copy.deepcopy(INCIDENT),
+                                     copy.deepcopy(CANDIDATES)).calculate_features(expected_features)
+
+    assert list(features_df['id']) == ['2', '3', '4', '5']
+    for i, candidate in enumerate(CANDIDATES):
+        features = IncidentFeatures(copy.deepcopy(INCIDENT), copy.deepcopy(candidate)).calculate_features(
+            expected_features)
+        for key in set(features_df.columns).union(features).difference(['id']):
+            value = features.get(key)
+            if value is None:
+                assert np.isnan(features_df[key][i]), key
+            else:
+                assert features_df[key][i] == float(value), key
+    assert features_df['indicator_IP_jaccard'].tolist()[:2] == [1.0, 0.0]
+
+
+def test_filter_candidates_by_similarity(mocker):
+    """
+    Given:
+        - An incident and duplicate, unrelated and empty candidates.
+    When:
+        - Pre-filtering the candidates with MinHash similarity.
+    Then:
+        - Validate only the unrelated candidate is dropped, and nothing is dropped when the filter is disabled.
+    """
+    import GetDuplicatesMlv2
+    from GetDuplicatesMlv2 import filter_candidates_by_similarity
+    mocker.patch.object(GetDuplicatesMlv2, 'INDICATORS_FOR_JACCARD', ['IP', 'Email'])
+
+    candidates = filter_candidates_by_similarity(INCIDENT, CANDIDATES, 0.3)
+
+    assert [c['id'] for c in candidates] == ['2', '5']
+    assert filter_candidates_by_similarity(INCIDENT, CANDIDATES, 0) == CANDIDATES
+
+
+def mock_ml_models_store(mocker):
+    """
+    Mocks the getMLModel and createMLModel commands with an in-memory ML models store, and returns the store.
+    """
+    models = {}
+
+    def executeCommand(name, args=None):
+        if name == 'getMLModel':
+            if args['modelName'] not in models:
+                return [{'Type': entryTypes['error'], 'Contents': 'Model not found'}]
+            return [{'Type': entryTypes['note'], 'Contents': {'modelData': models[args['modelName']]}}]
+        elif name == 'createMLModel':
+            models[args['modelName']] = args['modelData']
+            return [{'Type': entryTypes['note'], 'Contents': 'done'}]
+        raise ValueError('Unimplemented command called: {}'.format(name))
+
+    mocker.patch.object(demisto, 'executeCommand', side_effect=executeCommand)
+    return models
+
+
+def test_get_trained_model_cache(mocker):
+    """
+    Given:
+        - Training data with no cached model in the ML models store.
+    When:
+        - Getting a trained model twice.
+    Then:
+        - Validate the model is trained and stored the first time and loaded from the store the second time.
+    """
+    import pandas as pd
+    from GetDuplicatesMlv2 import get_trained_model
+    models = mock_ml_models_store(mocker)
+    X = pd.DataFrame({'labels_jaccard': [0.0, 0.1, 0.9, 1.0], 'incident_time_diff': [100.0, 90.0, 2.0, 1.0]})
+    Y = pd.Series([0, 0, 1, 1])
+
+    model = get_trained_model(X, Y, 'others', True)
+    assert len(models) == 1
+    mocker.patch('GetDuplicatesMlv2.get_ml_model', side_effect=AssertionError('model was trained again'))
+    cached_model = get_trained_model(X, Y, 'others', True)
+
+    assert (cached_model.predict_proba(X) == model.predict_proba(X)).all()
+
+
+def test_get_trained_model_cache_data_changed(mocker):
+    """
+    Given:
+        - A model cached in the ML models store, trained on other data with the same features.
+    When:
+        - Getting a trained model.
+    Then:
+        - Validate the model is trained again and replaces the cached one.
+    """
+    import pandas as pd
+    from GetDuplicatesMlv2 import get_trained_model
+    models = mock_ml_models_store(mocker)
+    X = pd.DataFrame({'labels_jaccard': [0.0, 0.1, 0.9, 1.0], 'incident_time_diff': [100.0, 90.0, 2.0, 1.0]})
+    get_trained_model(X, pd.Series([0, 0, 1, 1]), 'others', True)
+    cached_model_data = list(models.values())[0]
+
+    get_trained_model(X, pd.Series([0, 1, 1, 1]), 'others', True)
+
+    assert len(models) == 1
+    assert list(models.values())[0] != cached_model_data
@@ -3,13 +3,16 @@ from CommonServerPython import *
 from CommonServerUserPython import *
 
 import re
+import gzip
+import gevent
+import hashlib
 from base64 import b64decode
 from multiprocessing import Process
 from gevent.pywsgi import WSGIServer
 from tempfile import NamedTemporaryFile
 from flask import Flask, Response, request
 from netaddr import IPAddress, IPSet
-from typing import Callable, List, Any, Dict, cast, Tuple
+from typing import Callable, List, Any, Dict, cast, Tuple, Optional
 from ssl import SSLContext, SSLError, PROTOCOL_TLSv1_2
 
 
@@ -39,6 +42,7 @@ EDL_COLLAPSE_ERR_MSG: str = 'The Collapse parameter can only get the following:
 EDL_MISSING_REFRESH_ERR_MSG: str = 'Refresh Rate must be "number date_range_unit", examples: (2 hours, 4 minutes, ' \
                                    '6 months, 1 day, etc.)'
 EDL_LOCAL_CACHE: dict = {}
+EDL_REFRESH_INTERVAL: int = 10  # seconds between checks for stale EDL outputs
 ''' REFORMATTING REGEXES '''
 _PROTOCOL_REMOVAL = re.compile('^(?:[a-z]+:)*//')
 _PORT_REMOVAL = re.compile(r'^((?:[a-z]+:)*//([a-z0-9\-\.]+)|([a-z0-9\-\.]+))(?:\:[0-9]+)*')
@@ -86,6 +90,46 @@ class RequestArguments:
 
         return False
 
+    def get_key(self) -> tuple:
+        """
+        Returns a key of the request arguments, which identifies the EDL output they produce
+        """
+        return (self.query, self.limit, self.offset, self.url_port_stripping, self.drop_invalids, self.collapse_ips)
+
+
+'''EDL Output Class'''
+
+
+class EDLOutput:
+    def __init__(self, request_args: RequestArguments, values: str, last_run: Optional[int]):
+        """
+        A rendered EDL, which is kept ready to be sent until it is refreshed.
+
+        Parameters:
+            request_args: The request arguments which produced the EDL
+            values: The EDL values
+            last_run: The last_run of the cache the values were taken from
+        """
+        self.request_args = request_args
+        self.body = values.encode('utf-8')
+        self.etag = hashlib.md5(self.body).hexdigest()  # nosec
+        self.last_run = last_run
+        # whether the output was requested since it was rendered
+        self.requested = False
+        self._gzip_body: Optional[bytes] = None
+
+    def get_gzip_body(self) -> bytes:
+        """
+        Returns the gzip compressed EDL values, which are compressed once per rendered output.
+        """
+        if self._gzip_body is None:
+            self._gzip_body = gzip.compress(self.body)
+        return self._gzip_body
+
+
+# the rendered EDL outputs by the key of their request arguments
+EDL_OUTPUTS: Dict[tuple, EDLOutput] = {}
+
 
 ''' HELPER FUNCTIONS '''
 
@@ -134,7 +178,12 @@ def refresh_edl_context(request_args: RequestArguments, save_integration_context
     now = datetime.now()
     # poll indicators into edl from demisto
     iocs = find_indicators_to_limit(request_args.query, request_args.limit, request_args.offset)
-    out_dict, actual_indicator_amount = create_values_for_returned_dict(iocs, request_args)
+    formatted_indicators: List[str] = []
+    ipv4_formatted_indicators: List[IPAddress] = []
+    ipv6_formatted_indicators: List[IPAddress] = []
+    format_indicators(iocs, request_args, formatted_indicators, ipv4_formatted_indicators, ipv6_formatted_indicators)
+    out_dict, actual_indicator_amount = build_returned_dict(iocs, request_args, formatted_indicators,
+                                                            ipv4_formatted_indicators, ipv6_formatted_indicators)
 
     while actual_indicator_amount < request_args.limit:
         # from where to start the new poll and how many results should be fetched
@@ -151,8 +200,11 @@ def refresh_edl_context(request_args: RequestArguments, save_integration_context
         # add the new results to the existing results
         iocs += new_iocs
 
-        # reformat the output
-        out_dict, actual_indicator_amount = create_values_for_returned_dict(iocs, request_args)
+        # format only the new results, and rebuild the output
+        format_indicators(new_iocs, request_args, formatted_indicators, ipv4_formatted_indicators,
+                          ipv6_formatted_indicators)
+        out_dict, actual_indicator_amount = build_returned_dict(iocs, request_args, formatted_indicators,
+                                                                ipv4_formatted_indicators, ipv6_formatted_indicators)
 
     out_dict["last_run"] = date_to_timestamp(now)
     out_dict["current_iocs"] = iocs
@@ -300,9 +352,20 @@ def create_values_for_returned_dict(iocs: list, request_args: RequestArguments)
     """
     Create a dictionary for output values
     """
-    formatted_indicators = []
-    ipv4_formatted_indicators = []
-    ipv6_formatted_indicators = []
+    formatted_indicators: List[str] = []
+    ipv4_formatted_indicators: List[IPAddress] = []
+    ipv6_formatted_indicators: List[IPAddress] = []
+    format_indicators(iocs, request_args, formatted_indicators, ipv4_formatted_indicators, ipv6_formatted_indicators)
+    return build_returned_dict(iocs, request_args, formatted_indicators, ipv4_formatted_indicators,
+                               ipv6_formatted_indicators)
+
+
+def format_indicators(iocs: list, request_args: RequestArguments, formatted_indicators: list,
+                      ipv4_formatted_indicators: list, ipv6_formatted_indicators: list):
+    """
+    Formats the iocs and appends them to the given lists, so that more iocs can be formatted into them later.
+    The IPs to collapse are appended to their own lists, and are collapsed by build_returned_dict.
+    """
     for ioc in iocs:
         indicator = ioc.get('value')
         if not indicator:
@@ -345,13 +408,18 @@ def create_values_for_returned_dict(iocs: list, request_args: RequestArguments)
         else:
             formatted_indicators.append(indicator)
 
+
+def build_returned_dict(iocs: list, request_args: RequestArguments, formatted_indicators: list,
+                        ipv4_formatted_indicators: list, ipv6_formatted_indicators: list) -> Tuple[dict, int]:
+    """
+    Create a dictionary for output values from the formatted indicators, collapsing the IPs if needed
+    """
+    formatted_indicators = list(formatted_indicators)
     if len(ipv4_formatted_indicators) > 0:
-        ipv4_formatted_indicators = ips_to_ranges(ipv4_formatted_indicators, request_args.collapse_ips)
-        formatted_indicators.extend(ipv4_formatted_indicators)
+        formatted_indicators.extend(ips_to_ranges(ipv4_formatted_indicators, request_args.collapse_ips))
 
     if len(ipv6_formatted_indicators) > 0:
-        ipv6_formatted_indicators = ips_to_ranges(ipv6_formatted_indicators, request_args.collapse_ips)
-        formatted_indicators.extend(ipv6_formatted_indicators)
+        formatted_indicators.extend(ips_to_ranges(ipv6_formatted_indicators, request_args.collapse_ips))
     out_dict = {
         EDL_VALUES_KEY: list_to_str(formatted_indicators, '\n'),
         "current_iocs": iocs,
@@ -440,6 +508,82 @@ def get_ioc_values_str_from_cache(edl_cache: dict,
     return returned_dict.get(EDL_VALUES_KEY, '')
 
 
+def get_edl_output(request_args: RequestArguments, on_demand: bool, cache_refresh_rate: str = None) -> EDLOutput:
+    """
+    Gets the rendered EDL output of the request arguments.
+    Only the first request of each request arguments renders the output, and it is kept up to date in the background
+    by refresh_edl_outputs afterwards.
+
+    Args:
+        request_args: the request arguments
+        on_demand: Whether on demand configuration is set to True or not
+        cache_refresh_rate: The cache_refresh_rate configuration value
+
+    Returns:
+        The EDL output
+    """
+    key = request_args.get_key()
+    output = EDL_OUTPUTS.get(key)
+    if not output:
+        output = render_edl_output(request_args, on_demand, cache_refresh_rate)
+        EDL_OUTPUTS[key] = output
+    output.requested = True
+    return output
+
+
+def render_edl_output(request_args: RequestArguments, on_demand: bool, cache_refresh_rate: str = None) -> EDLOutput:
+    """
+    Renders the EDL output of the request arguments
+    """
+    values = get_edl_ioc_values(on_demand=on_demand, request_args=request_args, cache_refresh_rate=cache_refresh_rate)
+    edl_cache = get_integration_context() if on_demand else EDL_LOCAL_CACHE
+    return EDLOutput(request_args, values, (edl_cache or {}).get('last_run'))
+
+
+def refresh_stale_edl_outputs(on_demand: bool, cache_refresh_rate: str = None):
+    """
+    Renders again the EDL outputs which are stale - on demand, when the EDL was updated since the output was rendered,
+    otherwise when the refresh rate has passed. Stale outputs which were not requested since they were rendered
+    are dropped, and are rendered again on their next request.
+
+    Args:
+        on_demand: Whether on demand configuration is set to True or not
+        cache_refresh_rate: The cache_refresh_rate configuration value
+    """
+    if not EDL_OUTPUTS:
+        return
+    if on_demand:
+        edl_last_run = (get_integration_context() or {}).get('last_run')
+    else:
+        cache_time, _ = parse_date_range(cache_refresh_rate, to_timestamp=True)
+
+    for key, output in list(EDL_OUTPUTS.items()):
+        if on_demand:
+            is_stale = output.last_run != edl_last_run
+        else:
+            is_stale = not output.last_run or output.last_run <= cache_time
+        if not is_stale:
+            continue
+        if not output.requested:
+            del EDL_OUTPUTS[key]
+            continue
+        EDL_OUTPUTS[key] = render_edl_output(output.request_args, on_demand, cache_refresh_rate)
+        # serve the pending requests between the renders
+        gevent.sleep(0)
+
+
+def refresh_edl_outputs(params: dict):
+    """
+    Keeps the EDL outputs up to date in the background, so that the requests are served from the rendered outputs
+    """
+    while True:
+        gevent.sleep(EDL_REFRESH_INTERVAL)
+        try:
+            refresh_stale_edl_outputs(params.get('on_demand'), params.get('cache_refresh_rate'))
+        except Exception as e:
+            demisto.error(f'Failed to refresh the EDL outputs: {str(e)}')
+
+
 def try_parse_integer(int_to_parse: Any, err_msg: str) -> int:
     """
     Tries to parse an integer, and if fails will throw DemistoException with given err_msg
@@ -494,14 +638,37 @@ def route_edl_values() -> Response:
             return Response(err_msg, status=401)
 
     request_args = get_request_args(request.args, params)
-    on_demand = params.get('on_demand')
-
-    values = get_edl_ioc_values(
-        on_demand=on_demand,
+    output = get_edl_output(
         request_args=request_args,
+        on_demand=params.get('on_demand'),
         cache_refresh_rate=params.get('cache_refresh_rate'),
     )
-    return Response(values, status=200, mimetype='text/plain')
+    return create_output_response(output)
+
+
+def create_output_response(output: EDLOutput) -> Response:
+    """
+    Creates the response of a rendered EDL. The values are gzip compressed when the client accepts it, a 304 is
+    returned for a matching If-None-Match header and a Range header gets a 206 with the requested part of the values.
+
+    Parameters:
+        output: The rendered EDL
+
+    Returns:
+        The flask response
+    """
+    if request.accept_encodings['gzip']:
+        body = output.get_gzip_body()
+        response = Response(body, status=200, mimetype='text/plain')
+        response.headers['Content-Encoding'] = 'gzip'
+        # every encoding of the values is a different representation, which must have its own strong ETag
+        response.set_etag(output.etag + '-gzip')
+    else:
+        body = output.body
+        response = Response(body, status=200, mimetype='text/plain')
+        response.set_etag(output.etag)
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
 
 
 def get_request_args(request_args: dict, params: dict) -> RequestArguments:
@@ -620,6 +787,7 @@ def run_long_running(params: Dict, is_test: bool = False):
             time.sleep(5)
             server_process.terminate()
         else:
+            gevent.spawn(refresh_edl_outputs, params)
             server.serve_forever()
     except SSLError as e:
         ssl_err_message = f'Failed to validate certificate and/or private key: {str(e)}'
@@ -3,6 +3,7 @@ import json
 import pytest
 import demistomock as demisto
 from netaddr import IPAddress
+from CommonServerPython import date_to_timestamp, datetime
 
 IOC_RES_LEN = 38
 
@@ -294,3 +295,124 @@ class TestHelperFunctions:
         assert "1.1.1.3" not in ip_range_list
         assert "2.2.2.2" in ip_range_list
         assert "25.24.23.22" in ip_range_list
+
+    @pytest.mark.route_edl_values
+    def test_route_edl_values_served_from_output(self, mocker):
+        """
+        Given
+        - An EDL which was requested once.
+
+        When
+        - Requesting it again, with and without the ETag of the first response.
+
+        Then
+        - Ensure the indicators are searched only once, and a 304 is returned for a matching ETag.
+        """
+        import EDL as edl
+        mocker.patch.object(edl, 'EDL_OUTPUTS', {})
+        mocker.patch.object(demisto, 'params', return_value={'indicators_query': 'type:IP', 'edl_size': 10,
+                                                             'cache_refresh_rate': '1 hour'})
+        mocker.patch.object(edl, 'find_indicators_to_limit', side_effect=[
+            [{'value': '1.1.1.1', 'indicator_type': 'IP'}, {'value': '2.2.2.2', 'indicator_type': 'IP'}], []])
+
+        with edl.APP.test_client() as client:
+            response = client.get('/')
+            assert response.status_code == 200
+            assert response.data == b'1.1.1.1\n2.2.2.2'
+            etag = response.headers['ETag']
+
+            response = client.get('/')
+            assert response.status_code == 200
+            assert response.data == b'1.1.1.1\n2.2.2.2'
+
+            response = client.get('/', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert not response.data
+
+        # a single render - the first page and the empty page which ends it
+        assert edl.find_indicators_to_limit.call_count == 2
+
+    @pytest.mark.route_edl_values
+    def test_route_edl_values_gzip_and_range(self, mocker):
+        """
+        Given
+        - A rendered EDL.
+
+        When
+        - Requesting it with gzip accepted, with the ETag of the compressed response, and with a Range header.
+
+        Then
+        - Ensure the values are compressed with their own ETag, a 304 is returned for it, and the range is served.
+        """
+        import gzip
+        import EDL as edl
+        output = edl.EDLOutput(edl.RequestArguments('type:IP'), '1.1.1.1\n2.2.2.2', None)
+        mocker.patch.object(demisto, 'params', return_value={})
+        mocker.patch.object(edl, 'get_edl_output', return_value=output)
+
+        with edl.APP.test_client() as client:
+            response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+            assert response.status_code == 200
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert 'Accept-Encoding' in response.headers['Vary']
+            assert gzip.decompress(response.data) == b'1.1.1.1\n2.2.2.2'
+            gzip_etag = response.headers['ETag']
+            assert gzip_etag == '"{}-gzip"'.format(output.etag)
+
+            response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+            assert response.status_code == 304
+
+            response = client.get('/', headers={'If-None-Match': gzip_etag})
+            assert response.status_code == 200
+            assert 'Content-Encoding' not in response.headers
+
+            response = client.get('/', headers={'Range': 'bytes=8-'})
+            assert response.status_code == 206
+            assert response.data == b'2.2.2.2'
+
+    @pytest.mark.refresh_stale_edl_outputs
+    def test_refresh_stale_edl_outputs(self, mocker):
+        """
+        Given
+        - Two stale EDL outputs, one of them was not requested since it was rendered, and a fresh output.
+
+        When
+        - Refreshing the stale outputs.
+
+        Then
+        - Ensure the requested stale output is rendered again, the other one is dropped, and the fresh one is kept.
+        """
+        import EDL as edl
+        now = date_to_timestamp(datetime.now())
+        requested = edl.EDLOutput(edl.RequestArguments('a'), 'old', now - 7200 * 1000)
+        requested.requested = True
+        not_requested = edl.EDLOutput(edl.RequestArguments('b'), 'old', now - 7200 * 1000)
+        fresh = edl.EDLOutput(edl.RequestArguments('c'), 'fresh', now)
+        mocker.patch.object(edl, 'EDL_OUTPUTS', {output.request_args.get_key(): output
+                                                 for output in (requested, not_requested, fresh)})
+        mocker.patch.object(edl, 'find_indicators_to_limit', side_effect=[[{'value': 'new', 'indicator_type': 'URL'}], []])
+
+        edl.refresh_stale_edl_outputs(on_demand=False, cache_refresh_rate='1 hour')
+
+        assert edl.EDL_OUTPUTS[requested.request_args.get_key()].body == b'new'
+        assert not_requested.request_args.get_key() not in edl.EDL_OUTPUTS
+        assert edl.EDL_OUTPUTS[fresh.request_args.get_key()] is fresh
+
+    def test_refresh_stale_edl_outputs_no_outputs(self, mocker):
+        """
+        Given
+        - On demand mode, and no rendered EDL outputs.
+
+        When
+        - Refreshing the stale outputs.
+
+        Then
+        - Ensure the integration context is not loaded.
+        """
+        import EDL as edl
+        mocker.patch.object(edl, 'EDL_OUTPUTS', {})
+        mocker.patch.object(edl, 'get_integration_context')
+
+        edl.refresh_stale_edl_outputs(on_demand=True)
+
+        assert edl.get_integration_context.call_count == 0
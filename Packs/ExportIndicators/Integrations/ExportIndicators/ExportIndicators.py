@@ -2,17 +2,22 @@ import demistomock as demisto
 from CommonServerPython import *
 from CommonServerUserPython import *
 
+import io
 import re
+import gzip
 import json
+import hashlib
 import traceback
+from abc import ABC, abstractmethod
 from base64 import b64decode
 from multiprocessing import Process
 from gevent.pywsgi import WSGIServer
 from tempfile import NamedTemporaryFile
 from flask import Flask, Response, request
+from werkzeug.wsgi import wrap_file
 from netaddr import IPAddress, IPSet
 from ssl import SSLContext, SSLError, PROTOCOL_TLSv1_2
-from typing import Callable, List, Any, cast, Dict, Tuple
+from typing import Callable, List, Any, cast, Dict, Tuple, Optional, Iterable
 
 
 class Handler:
@@ -28,6 +33,8 @@ DEMISTO_LOGGER: Handler = Handler()
 APP: Flask = Flask('demisto-export_iocs')
 CTX_VALUES_KEY: str = 'dmst_export_iocs_values'
 CTX_MIMETYPE_KEY: str = 'dmst_export_iocs_mimetype'
+# the gzip compressed values of the last compressed list, by the ETag of the list
+GZIP_VALUES: Dict[str, bytes] = {}
 
 FORMAT_CSV: str = 'csv'
 FORMAT_TEXT: str = 'text'
@@ -146,6 +153,368 @@ class RequestArguments:
 
         return False
 
+    def get_context_data(self) -> dict:
+        """
+        Returns the request arguments as they are saved with the list, to be compared by is_request_change
+        """
+        return {
+            'last_limit': self.limit,
+            'last_offset': self.offset,
+            'last_format': self.out_format,
+            'last_query': self.query,
+            'mwg_type': self.mwg_type,
+            'drop_invalids': self.drop_invalids,
+            'strip_port': self.strip_port,
+            'category_default': self.category_default,
+            'category_attribute': self.category_attribute,
+            'collapse_ips': self.collapse_ips,
+            'csv_text': self.csv_text,
+            'sort_field': self.sort_field,
+            'sort_order': self.sort_order,
+        }
+
+
+'''Spooled Output Class'''
+
+
+class SpooledOutput:
+    def __init__(self, request_args: RequestArguments, mimetype: str, last_run: int):
+        """
+        The values of a list, which are spooled to local files as they are formatted, and are streamed from the files
+        by the route. The values are spooled both as they are and gzip compressed.
+
+        Args:
+            request_args: The request arguments which produced the list
+            mimetype: The mimetype of the values
+            last_run: The time the list was refreshed
+        """
+        self.context_data = request_args.get_context_data()
+        self.mimetype = mimetype
+        self.last_run = last_run
+        self.size = 0
+        self.gzip_size = 0
+        self.etag = ''
+        self._md5 = hashlib.md5()  # nosec
+        self._file = NamedTemporaryFile(delete=False, prefix='export_iocs_')
+        self.path = self._file.name
+        self._gzip_file = NamedTemporaryFile(delete=False, prefix='export_iocs_', suffix='.gz')
+        self.gzip_path = self._gzip_file.name
+        self._gzip_writer = gzip.GzipFile(fileobj=self._gzip_file, mode='wb')
+
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._gzip_writer.write(data)
+        self._md5.update(data)
+        self.size += len(data)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        self._gzip_writer.close()
+        self.gzip_size = self._gzip_file.tell()
+        self._gzip_file.close()
+        self.etag = self._md5.hexdigest()
+
+    def remove(self):
+        for path in (self.path, self.gzip_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# the spooled output of the list, which is served when the list is not updated on demand
+SPOOLED_OUTPUT: Optional[SpooledOutput] = None
+
+
+'''Formatter Classes'''
+
+
+class IndicatorsFormatter(ABC):
+    def __init__(self, request_args: RequestArguments, out: Any):
+        """
+        Formats indicators to an output format, and writes the formatted values to a text stream as the indicators
+        are polled, instead of formatting the whole list of indicators at once.
+
+        Args:
+            request_args: The request arguments of the output
+            out: The text stream to write to, or None to only count the formatted values
+        """
+        self.request_args = request_args
+        self.out = out
+        # the number of lines which were written
+        self.lines = 0
+        self.started = False
+
+    def write(self, text: str):
+        if self.out is not None:
+            self.out.write(text)
+
+    def write_line(self, line: str):
+        if self.lines:
+            self.write('\n')
+        self.write(line)
+        self.lines += 1
+
+    def format(self, iocs: Iterable[dict]):
+        """
+        Formats a page of indicators.
+        """
+        for ioc in iocs:
+            if not self.started:
+                self.start(ioc)
+                self.started = True
+            self.format_indicator(ioc)
+
+    def close(self):
+        """
+        Writes the values which can only be formatted once all the indicators are polled.
+        """
+        if not self.started:
+            self.start(None)
+            self.started = True
+        self.end()
+
+    def get_count(self) -> int:
+        """
+        Returns the number of indicators in the output, which is checked in order to poll more indicators.
+        """
+        return self.lines
+
+    def start(self, first_ioc: Optional[dict]):
+        pass
+
+    @abstractmethod
+    def format_indicator(self, ioc: dict):
+        pass
+
+    def end(self):
+        pass
+
+
+class ValuesFormatter(IndicatorsFormatter):
+    """
+    Formats indicators to one line per indicator - text, csv, json-seq, XSOAR json-seq and XSOAR csv. IPs which are
+    collapsed are written after the rest of the indicators.
+    """
+    def __init__(self, request_args: RequestArguments, out: Any):
+        super().__init__(request_args, out)
+        self.collapse_ips = request_args.out_format in [FORMAT_TEXT, FORMAT_CSV] \
+            and request_args.collapse_ips != DONT_COLLAPSE
+        self.ipv4_indicators: List[IPAddress] = []
+        self.ipv6_indicators: List[IPAddress] = []
+        # the collapsed ranges of the IPs which were formatted so far, computed when they are first needed
+        self.collapsed_ips: Optional[list] = None
+
+    def start(self, first_ioc: Optional[dict]):
+        if first_ioc is None:
+            return
+
+        if self.request_args.out_format == FORMAT_XSOAR_CSV:  # add csv keys as first item
+            self.write_line(list_to_str(list(first_ioc.keys())))
+
+        elif self.request_args.out_format == FORMAT_CSV:
+            self.write_line('indicator')
+
+    def format_indicator(self, ioc: dict):
+        value = ioc.get('value')
+        if not value:
+            return
+
+        out_format = self.request_args.out_format
+        if out_format in [FORMAT_TEXT, FORMAT_CSV]:
+            type = ioc.get('indicator_type')
+            if type == 'IP' and self.collapse_ips:
+                self.ipv4_indicators.append(IPAddress(value))
+                self.collapsed_ips = None
+
+            elif type == 'IPv6' and self.collapse_ips:
+                self.ipv6_indicators.append(IPAddress(value))
+                self.collapsed_ips = None
+
+            else:
+                self.write_line(value)
+
+        elif out_format == FORMAT_XSOAR_JSON_SEQ:
+            self.write_line(json.dumps(ioc))
+
+        elif out_format == FORMAT_JSON_SEQ:
+            self.write_line(json.dumps(json_format_single_indicator(ioc)))
+
+        elif out_format == FORMAT_XSOAR_CSV:
+            # wrap csv values with " to escape them
+            self.write_line(list_to_str(list(ioc.values()), map_func=lambda val: f'"{val}"'))
+
+    def get_collapsed_ips(self) -> list:
+        if self.collapsed_ips is None:
+            self.collapsed_ips = []
+            for ips in (self.ipv4_indicators, self.ipv6_indicators):
+                if ips:
+                    self.collapsed_ips.extend(ips_to_ranges(ips, self.request_args.collapse_ips))
+        return self.collapsed_ips
+
+    def get_count(self) -> int:
+        if self.collapse_ips:
+            return self.lines + len(self.get_collapsed_ips())
+        return self.lines
+
+    def end(self):
+        for collapsed_ip in self.get_collapsed_ips():
+            self.write_line(collapsed_ip)
+
+
+class PanOSURLFormatter(IndicatorsFormatter):
+    """
+    Formats indicators to the PAN-OS URL format.
+    """
+    def format_indicator(self, ioc: dict):
+        indicator = ioc.get('value')
+        if not indicator:
+            return
+        if ioc.get('indicator_type') in ['URL', 'Domain', 'DomainGlob']:
+            indicator = indicator.lower()
+
+            # remove initial protocol - http/https/ftp/ftps etc
+            indicator = _PROTOCOL_REMOVAL.sub('', indicator)
+
+            indicator_with_port = indicator
+            # remove port from indicator - from demisto.com:369/rest/of/path -> demisto.com/rest/of/path
+            indicator = _PORT_REMOVAL.sub(r'\g<1>', indicator)
+            # check if removing the port changed something about the indicator
+            if indicator != indicator_with_port and not self.request_args.strip_port:
+                # if port was in the indicator and strip_port param not set - ignore the indicator
+                return
+
+            with_invalid_tokens_indicator = indicator
+            # remove invalid tokens from indicator
+            indicator = _INVALID_TOKEN_REMOVAL.sub('*', indicator)
+
+            # check if the indicator held invalid tokens
+            if with_invalid_tokens_indicator != indicator:
+                # invalid tokens in indicator- if drop_invalids is set - ignore the indicator
+                if self.request_args.drop_invalids:
+                    return
+
+                # check if after removing the tokens the indicator is too broad if so - ignore
+                # example of too broad terms: "*.paloalto", "*.*.paloalto", "*.paloalto:60"
+                hostname = indicator
+                if '/' in hostname:
+                    hostname, _ = hostname.split('/', 1)
+
+                if _BROAD_PATTERN.match(hostname) is not None:
+                    return
+
+            # for PAN-OS "*.domain.com" does not match "domain.com" - we should provide both
+            if indicator.startswith('*.'):
+                self.write_line(indicator[2:])
+
+        self.write_line(indicator)
+
+
+class ProxySGFormatter(IndicatorsFormatter):
+    """
+    Formats indicators to the Symantec ProxySG format. The indicators are grouped by their category, so they are
+    written once all the indicators are polled.
+    """
+    def __init__(self, request_args: RequestArguments, out: Any):
+        super().__init__(request_args, out)
+        self.category_dict: Dict[str, list] = {}
+        self.indicators = 0
+
+    def format_indicator(self, ioc: dict):
+        if ioc.get('indicator_type') in ['URL', 'Domain', 'DomainGlob'] and ioc.get('value'):
+            category_attribute = self.request_args.category_attribute
+            indicator_proxysg_category = ioc.get('proxysgcategory')
+            # if a ProxySG Category is set and it is in the category_attribute list or that the attribute list is empty
+            # than list add the indicator to it's category list
+            if indicator_proxysg_category is not None and \
+                    (indicator_proxysg_category in category_attribute or len(category_attribute) == 0):
+                add_indicator_to_category(ioc.get('value'), indicator_proxysg_category, self.category_dict)
+
+            else:
+                # if ProxySG Category is not set or does not exist in the category_attribute list
+                add_indicator_to_category(ioc.get('value'), self.request_args.category_default, self.category_dict)
+            self.indicators += 1
+
+    def get_count(self) -> int:
+        return self.indicators
+
+    def end(self):
+        if not self.category_dict:
+            raise Exception(CTX_NO_URLS_IN_PROXYSG_FORMAT)
+
+        for category, indicator_list in self.category_dict.items():
+            self.write(f"define category {category}\n")
+            self.write(list_to_str(indicator_list, '\n'))
+            self.write("\nend\n")
+
+
+class MWGFormatter(IndicatorsFormatter):
+    """
+    Formats indicators to the McAfee Web Gateway format.
+    """
+    def __init__(self, request_args: RequestArguments, out: Any):
+        super().__init__(request_args, out)
+        self.indicators = 0
+
+    def start(self, first_ioc: Optional[dict]):
+        mwg_type = self.request_args.mwg_type
+        if isinstance(mwg_type, list):
+            mwg_type = mwg_type[0]
+
+        self.write("type=" + mwg_type + "\n")
+
+    def format_indicator(self, ioc: dict):
+        self.indicators += 1
+        if not ioc.get('value'):
+            return
+        value = "\"" + ioc.get('value') + "\""
+        sources = ioc.get('sourceBrands')
+        if sources:
+            sources_string = "\"" + ','.join(sources) + "\""
+
+        else:
+            sources_string = "\"from CORTEX XSOAR\""
+
+        self.write_line(value + " " + sources_string)
+
+    def get_count(self) -> int:
+        return self.indicators
+
+
+class JSONFormatter(IndicatorsFormatter):
+    """
+    Formats indicators to a JSON list - json and XSOAR json.
+    """
+    def __init__(self, request_args: RequestArguments, out: Any):
+        super().__init__(request_args, out)
+        self.indicators = 0
+        self.items = 0
+
+    def start(self, first_ioc: Optional[dict]):
+        self.write('[')
+
+    def format_indicator(self, ioc: dict):
+        self.indicators += 1
+        if self.request_args.out_format == FORMAT_JSON:
+            if not ioc.get('value'):
+                return
+            ioc = json_format_single_indicator(ioc)
+
+        # the items are separated as json.dumps separates the items of a list
+        if self.items:
+            self.write(', ')
+        self.write(json.dumps(ioc))
+        self.items += 1
+
+    def get_count(self) -> int:
+        return self.indicators
+
+    def end(self):
+        self.write(']')
+
 
 ''' HELPER FUNCTIONS '''
 
@@ -201,25 +570,32 @@ def sort_iocs(request_args: RequestArguments, iocs: list) -> list:
     return iocs
 
 
-def refresh_outbound_context(request_args: RequestArguments) -> str:
+def write_outbound_values(request_args: RequestArguments, out: Any, keep_iocs: bool = True) -> list:
     """
-    Refresh the cache values and format using an indicator_query to call demisto.searchIndicators
-    Returns: List(IoCs in output format)
+    Polls the indicators of the query and writes them in the output format to a text stream. The indicators are
+    formatted as they are polled, or once they are all polled and sorted if a sort is requested.
+    Returns: List of the polled IoCs, if keep_iocs is set or the IoCs are sorted.
     """
-    now = datetime.now()
+    is_sorted = bool(request_args.sort_field) and request_args.sort_order in [SORT_ASCENDING, SORT_DESCENDING]
+    # sorted IoCs can only be written once they are all polled, until then they are only counted
+    formatter = get_indicators_formatter(request_args, None if is_sorted else out)
+    keep_iocs = keep_iocs or is_sorted
+
     # poll indicators into list from demisto
     iocs = find_indicators_with_limit(request_args.query, request_args.limit, request_args.offset)
-    iocs = sort_iocs(request_args, iocs)
-    out_dict, actual_indicator_amount = create_values_for_returned_dict(iocs, request_args)
+    formatter.format(iocs)
+    total_fetched = len(iocs)
+    if not keep_iocs:
+        iocs = []
 
     # if in CSV format - the "indicator" header
-    if request_args.out_format in [FORMAT_CSV, FORMAT_XSOAR_CSV]:
-        actual_indicator_amount = actual_indicator_amount - 1
+    header_lines = 1 if request_args.out_format in [FORMAT_CSV, FORMAT_XSOAR_CSV] else 0
+    actual_indicator_amount = formatter.get_count() - header_lines
 
     # re-polling in case formatting or ip collapse caused a lack in results
     while actual_indicator_amount < request_args.limit:
         # from where to start the new poll and how many results should be fetched
-        new_offset = len(iocs) + request_args.offset + actual_indicator_amount - 1
+        new_offset = total_fetched + request_args.offset + actual_indicator_amount - 1
         new_limit = request_args.limit - actual_indicator_amount
 
         # poll additional indicators into list from demisto
@@ -229,53 +605,99 @@ def refresh_outbound_context(request_args: RequestArguments) -> str:
         if len(new_iocs) == 0:
             break
 
-        # add the new results to the existing results
-        iocs += new_iocs
+        # format only the new results
+        formatter.format(new_iocs)
+        total_fetched += len(new_iocs)
+        if keep_iocs:
+            iocs += new_iocs
+
+        actual_indicator_amount = formatter.get_count() - header_lines
+
+    if is_sorted:
+        # the IoCs are sorted once, after all of them were polled
         iocs = sort_iocs(request_args, iocs)
+        formatter = get_indicators_formatter(request_args, out)
+        formatter.format(iocs)
 
-        # reformat the output
-        out_dict, actual_indicator_amount = create_values_for_returned_dict(iocs, request_args)
+    formatter.close()
+    return iocs
 
-        if request_args.out_format == FORMAT_CSV:
-            actual_indicator_amount = actual_indicator_amount - 1
 
+def get_request_mimetype(request_args: RequestArguments) -> str:
+    """Returns the mimetype of the output format"""
     if request_args.out_format == FORMAT_JSON:
-        out_dict[CTX_MIMETYPE_KEY] = MIMETYPE_JSON
+        return MIMETYPE_JSON
 
     elif request_args.out_format in [FORMAT_CSV, FORMAT_XSOAR_CSV]:
         if request_args.csv_text:
-            out_dict[CTX_MIMETYPE_KEY] = MIMETYPE_TEXT
+            return MIMETYPE_TEXT
 
-        else:
-            out_dict[CTX_MIMETYPE_KEY] = MIMETYPE_CSV
+        return MIMETYPE_CSV
 
     elif request_args.out_format in [FORMAT_JSON_SEQ, FORMAT_XSOAR_JSON_SEQ]:
-        out_dict[CTX_MIMETYPE_KEY] = MIMETYPE_JSON_SEQ
+        return MIMETYPE_JSON_SEQ
+
+    return MIMETYPE_TEXT
 
-    else:
-        out_dict[CTX_MIMETYPE_KEY] = MIMETYPE_TEXT
+
+def refresh_outbound_context(request_args: RequestArguments) -> str:
+    """
+    Refresh the cache values and format using an indicator_query to call demisto.searchIndicators
+    Returns: List(IoCs in output format)
+    """
+    now = datetime.now()
+    out = io.StringIO()
+    iocs = write_outbound_values(request_args, out)
+    out_dict = {
+        CTX_VALUES_KEY: out.getvalue(),
+        CTX_MIMETYPE_KEY: get_request_mimetype(request_args),
+    }
 
     set_integration_context({
         "last_output": out_dict,
         'last_run': date_to_timestamp(now),
-        'last_limit': request_args.limit,
-        'last_offset': request_args.offset,
-        'last_format': request_args.out_format,
-        'last_query': request_args.query,
         'current_iocs': iocs,
-        'mwg_type': request_args.mwg_type,
-        'drop_invalids': request_args.drop_invalids,
-        'strip_port': request_args.strip_port,
-        'category_default': request_args.category_default,
-        'category_attribute': request_args.category_attribute,
-        'collapse_ips': request_args.collapse_ips,
-        'csv_text': request_args.csv_text,
-        'sort_field': request_args.sort_field,
-        'sort_order': request_args.sort_order,
+        **request_args.get_context_data(),
     })
     return out_dict[CTX_VALUES_KEY]
 
 
+def refresh_spooled_output(request_args: RequestArguments) -> SpooledOutput:
+    """
+    Refresh the values of the list, which are spooled to local files instead of being kept in the integration context
+    Returns: The spooled output
+    """
+    output = SpooledOutput(request_args, get_request_mimetype(request_args), date_to_timestamp(datetime.now()))
+    try:
+        write_outbound_values(request_args, output, keep_iocs=False)
+        output.close()
+    except Exception:
+        output.close()
+        output.remove()
+        raise
+    return output
+
+
+def get_outbound_spooled_output(request_args: RequestArguments, cache_refresh_rate: str) -> SpooledOutput:
+    """
+    Get the spooled output of the list, which is refreshed if the refresh rate passed or the request arguments changed
+    """
+    global SPOOLED_OUTPUT
+    output = SPOOLED_OUTPUT
+    if output is not None:
+        # takes the cache_refresh_rate amount of time back since run time.
+        cache_time, _ = parse_date_range(cache_refresh_rate, to_timestamp=True)
+        if output.last_run > cache_time and not request_args.is_request_change(output.context_data) and \
+                request_args.query == output.context_data.get('last_query'):
+            return output
+
+    SPOOLED_OUTPUT = refresh_spooled_output(request_args)
+    if output is not None:
+        # responses which are still streamed from the previous output keep their open files
+        output.remove()
+    return SPOOLED_OUTPUT
+
+
 def find_indicators_with_limit(indicator_query: str, limit: int, offset: int) -> list:
     """
     Finds indicators using demisto.searchIndicators
@@ -380,71 +802,57 @@ def ips_to_ranges(ips: list, collapse_ips: str):
         return ip_groups_to_cidrs(cidrs)
 
 
-def panos_url_formatting(iocs: list, drop_invalids: bool, strip_port: bool):
-    formatted_indicators = []  # type:List
-    for indicator_data in iocs:
-        # only format URLs and Domains
-        indicator = indicator_data.get('value')
-        if not indicator:
-            continue
-        if indicator_data.get('indicator_type') in ['URL', 'Domain', 'DomainGlob']:
-            indicator = indicator.lower()
+def get_indicators_formatter(request_args: RequestArguments, out: Any) -> IndicatorsFormatter:
+    """
+    Returns the formatter of the selected format (json, json-seq, text, csv, McAfee Web Gateway, Symantec ProxySG,
+    panosurl)
+    """
+    if request_args.out_format == FORMAT_PANOSURL:
+        return PanOSURLFormatter(request_args, out)
 
-            # remove initial protocol - http/https/ftp/ftps etc
-            indicator = _PROTOCOL_REMOVAL.sub('', indicator)
+    if request_args.out_format == FORMAT_PROXYSG:
+        return ProxySGFormatter(request_args, out)
 
-            indicator_with_port = indicator
-            # remove port from indicator - from demisto.com:369/rest/of/path -> demisto.com/rest/of/path
-            indicator = _PORT_REMOVAL.sub(r'\g<1>', indicator)
-            # check if removing the port changed something about the indicator
-            if indicator != indicator_with_port and not strip_port:
-                # if port was in the indicator and strip_port param not set - ignore the indicator
-                continue
+    if request_args.out_format == FORMAT_MWG:
+        return MWGFormatter(request_args, out)
 
-            with_invalid_tokens_indicator = indicator
-            # remove invalid tokens from indicator
-            indicator = _INVALID_TOKEN_REMOVAL.sub('*', indicator)
+    if request_args.out_format in [FORMAT_JSON, FORMAT_XSOAR_JSON]:
+        return JSONFormatter(request_args, out)
 
-            # check if the indicator held invalid tokens
-            if with_invalid_tokens_indicator != indicator:
-                # invalid tokens in indicator- if drop_invalids is set - ignore the indicator
-                if drop_invalids:
-                    continue
+    return ValuesFormatter(request_args, out)
 
-                # check if after removing the tokens the indicator is too broad if so - ignore
-                # example of too broad terms: "*.paloalto", "*.*.paloalto", "*.paloalto:60"
-                hostname = indicator
-                if '/' in hostname:
-                    hostname, _ = hostname.split('/', 1)
 
-                if _BROAD_PATTERN.match(hostname) is not None:
-                    continue
+def format_indicators(iocs: list, request_args: RequestArguments) -> Tuple[str, int]:
+    """
+    Formats a list of indicators to the selected format.
 
-            # for PAN-OS "*.domain.com" does not match "domain.com" - we should provide both
-            if indicator.startswith('*.'):
-                formatted_indicators.append(indicator[2:])
+    Returns:
+        The formatted indicators and the number of indicators in the output
+    """
+    out = io.StringIO()
+    formatter = get_indicators_formatter(request_args, out)
+    formatter.format(iocs)
+    formatter.close()
+    return out.getvalue(), formatter.get_count()
 
-        formatted_indicators.append(indicator)
-    return {CTX_VALUES_KEY: list_to_str(formatted_indicators, '\n')}, len(formatted_indicators)
 
+def panos_url_formatting(iocs: list, drop_invalids: bool, strip_port: bool):
+    request_args = RequestArguments('', FORMAT_PANOSURL, drop_invalids=drop_invalids, strip_port=strip_port)
+    values, num_of_indicators = format_indicators(iocs, request_args)
+    return {CTX_VALUES_KEY: values}, num_of_indicators
 
-def create_json_out_format(iocs: list):
-    formatted_indicators = []  # type:List
-    for indicator_data in iocs:
-        if indicator_data.get("value"):
-            json_format_indicator = json_format_single_indicator(indicator_data)
-            formatted_indicators.append(json_format_indicator)
 
-    return {CTX_VALUES_KEY: json.dumps(formatted_indicators)}
+def create_json_out_format(iocs: list):
+    values, _ = format_indicators(iocs, RequestArguments('', FORMAT_JSON))
+    return {CTX_VALUES_KEY: values}
 
 
 def json_format_single_indicator(indicator: dict):
     json_format_indicator = {
         "indicator": indicator.get("value")
     }
-    indicator.pop("value", None)
-
-    json_format_indicator["value"] = indicator
+    # the indicator is not changed, as it may be formatted again once the indicators are sorted
+    json_format_indicator["value"] = {key: value for key, value in indicator.items() if key != "value"}
     return json_format_indicator
 
 
@@ -459,60 +867,15 @@ def add_indicator_to_category(indicator, category, category_dict):
 
 
 def create_proxysg_out_format(iocs: list, category_attribute: list, category_default: str = 'bc_category'):
-    formatted_indicators = ''
-    category_dict = {}  # type:Dict
-    num_of_returned_indicators = 0
-
-    for indicator in iocs:
-        if indicator.get('indicator_type') in ['URL', 'Domain', 'DomainGlob'] and indicator.get('value'):
-            indicator_proxysg_category = indicator.get('proxysgcategory')
-            # if a ProxySG Category is set and it is in the category_attribute list or that the attribute list is empty
-            # than list add the indicator to it's category list
-            if indicator_proxysg_category is not None and \
-                    (indicator_proxysg_category in category_attribute or len(category_attribute) == 0):
-                category_dict = add_indicator_to_category(indicator.get('value'), indicator_proxysg_category,
-                                                          category_dict)
-
-            else:
-                # if ProxySG Category is not set or does not exist in the category_attribute list
-                category_dict = add_indicator_to_category(indicator.get('value'), category_default, category_dict)
-
-    for category, indicator_list in category_dict.items():
-        sub_output_string = f"define category {category}\n"
-        sub_output_string += list_to_str(indicator_list, '\n')
-        sub_output_string += "\nend\n"
-        formatted_indicators += sub_output_string
-        num_of_returned_indicators = num_of_returned_indicators + len(indicator_list)
-
-    if len(formatted_indicators) == 0:
-        raise Exception(CTX_NO_URLS_IN_PROXYSG_FORMAT)
-
-    return {CTX_VALUES_KEY: formatted_indicators}, num_of_returned_indicators
+    request_args = RequestArguments('', FORMAT_PROXYSG, category_default=category_default)
+    request_args.category_attribute = category_attribute
+    values, num_of_returned_indicators = format_indicators(iocs, request_args)
+    return {CTX_VALUES_KEY: values}, num_of_returned_indicators
 
 
 def create_mwg_out_format(iocs: list, mwg_type: str) -> dict:
-    formatted_indicators = []  # type:List
-    for indicator in iocs:
-        if not indicator.get('value'):
-            continue
-        value = "\"" + indicator.get('value') + "\""
-        sources = indicator.get('sourceBrands')
-        if sources:
-            sources_string = "\"" + ','.join(sources) + "\""
-
-        else:
-            sources_string = "\"from CORTEX XSOAR\""
-
-        formatted_indicators.append(value + " " + sources_string)
-
-    string_formatted_indicators = list_to_str(formatted_indicators, '\n')
-
-    if isinstance(mwg_type, list):
-        mwg_type = mwg_type[0]
-
-    string_formatted_indicators = "type=" + mwg_type + "\n" + string_formatted_indicators
-
-    return {CTX_VALUES_KEY: string_formatted_indicators}
+    values, _ = format_indicators(iocs, RequestArguments('', FORMAT_MWG, mwg_type=mwg_type))
+    return {CTX_VALUES_KEY: values}
 
 
 def create_values_for_returned_dict(iocs: list, request_args: RequestArguments) -> Tuple[dict, int]:
@@ -520,68 +883,8 @@ def create_values_for_returned_dict(iocs: list, request_args: RequestArguments)
     Create a dictionary for output values using the selected format (json, json-seq, text, csv, McAfee Web Gateway,
     Symantec ProxySG, panosurl)
     """
-    if request_args.out_format == FORMAT_PANOSURL:
-        return panos_url_formatting(iocs, request_args.drop_invalids, request_args.strip_port)
-
-    if request_args.out_format == FORMAT_PROXYSG:
-        return create_proxysg_out_format(iocs, request_args.category_attribute, request_args.category_default)
-
-    if request_args.out_format == FORMAT_MWG:
-        return create_mwg_out_format(iocs, request_args.mwg_type), len(iocs)
-
-    if request_args.out_format == FORMAT_JSON:
-        return create_json_out_format(iocs), len(iocs)
-
-    if request_args.out_format == FORMAT_XSOAR_JSON:
-        iocs_list = [ioc for ioc in iocs]
-        return {CTX_VALUES_KEY: json.dumps(iocs_list)}, len(iocs)
-
-    else:
-        ipv4_formatted_indicators = []
-        ipv6_formatted_indicators = []
-        formatted_indicators = []
-        if request_args.out_format == FORMAT_XSOAR_CSV and len(iocs) > 0:  # add csv keys as first item
-            headers = list(iocs[0].keys())
-            formatted_indicators.append(list_to_str(headers))
-
-        elif request_args.out_format == FORMAT_CSV and len(iocs) > 0:
-            formatted_indicators.append('indicator')
-
-        for ioc in iocs:
-            value = ioc.get('value')
-            type = ioc.get('indicator_type')
-            if value:
-                if request_args.out_format in [FORMAT_TEXT, FORMAT_CSV]:
-                    if type == 'IP' and request_args.collapse_ips != DONT_COLLAPSE:
-                        ipv4_formatted_indicators.append(IPAddress(value))
-
-                    elif type == 'IPv6' and request_args.collapse_ips != DONT_COLLAPSE:
-                        ipv6_formatted_indicators.append(IPAddress(value))
-
-                    else:
-                        formatted_indicators.append(value)
-
-                elif request_args.out_format == FORMAT_XSOAR_JSON_SEQ:
-                    formatted_indicators.append(json.dumps(ioc))
-
-                elif request_args.out_format == FORMAT_JSON_SEQ:
-                    json_format_indicator = json_format_single_indicator(ioc)
-                    formatted_indicators.append(json.dumps(json_format_indicator))
-
-                elif request_args.out_format == FORMAT_XSOAR_CSV:
-                    # wrap csv values with " to escape them
-                    values = list(ioc.values())
-                    formatted_indicators.append(list_to_str(values, map_func=lambda val: f'"{val}"'))
-
-        if len(ipv4_formatted_indicators) > 0:
-            ipv4_formatted_indicators = ips_to_ranges(ipv4_formatted_indicators, request_args.collapse_ips)
-            formatted_indicators.extend(ipv4_formatted_indicators)
-
-        if len(ipv6_formatted_indicators) > 0:
-            ipv6_formatted_indicators = ips_to_ranges(ipv6_formatted_indicators, request_args.collapse_ips)
-            formatted_indicators.extend(ipv6_formatted_indicators)
-
-    return {CTX_VALUES_KEY: list_to_str(formatted_indicators, '\n')}, len(formatted_indicators)
+    values, num_of_indicators = format_indicators(iocs, request_args)
+    return {CTX_VALUES_KEY: values}, num_of_indicators
 
 
 def get_outbound_mimetype() -> str:
@@ -776,6 +1079,13 @@ def route_list_values() -> Response:
 
         request_args = get_request_args(params)
 
+        if not params.get('on_demand') and params.get('cache_refresh_rate'):
+            # the list is refreshed by the server itself, so it is spooled to local files instead of the context
+            output = get_outbound_spooled_output(request_args, params.get('cache_refresh_rate'))
+            if not output.size:
+                return create_values_response("No Results Found For the Query", output.mimetype)
+            return create_spooled_output_response(output)
+
         values = get_outbound_ioc_values(
             on_demand=params.get('on_demand'),
             last_update_data=get_integration_context(),
@@ -783,7 +1093,7 @@ def route_list_values() -> Response:
             request_args=request_args
         )
 
-        if not get_integration_context() and params.get('on_demand'):
+        if not get_integration_context():
             values = 'You are running in On-Demand mode - please run !eis-update command to initialize the ' \
                      'export process'
 
@@ -791,12 +1101,74 @@ def route_list_values() -> Response:
             values = "No Results Found For the Query"
 
         mimetype = get_outbound_mimetype()
-        return Response(values, status=200, mimetype=mimetype)
+        return create_values_response(values, mimetype)
 
     except Exception:
         return Response(traceback.format_exc(), status=400, mimetype='text/plain')
 
 
+def create_values_response(values: str, mimetype: str) -> Response:
+    """
+    Creates the response of the exported values, with an ETag of their digest. The values are gzip compressed when
+    the client accepts it, a 304 is returned for a matching If-None-Match header and a Range header gets a 206 with
+    the requested part of the values.
+
+    Args:
+        values: The exported values
+        mimetype: The mimetype of the values
+
+    Returns:
+        The flask response
+    """
+    body = values.encode('utf-8')
+    etag = hashlib.md5(body).hexdigest()  # nosec
+    if request.accept_encodings['gzip']:
+        if etag not in GZIP_VALUES:
+            # the list changed, so there is no use for the previous compressed values
+            GZIP_VALUES.clear()
+            GZIP_VALUES[etag] = gzip.compress(body)
+        body = GZIP_VALUES[etag]
+        response = Response(body, status=200, mimetype=mimetype)
+        return make_conditional_response(response, etag, len(body), is_gzip=True)
+
+    response = Response(body, status=200, mimetype=mimetype)
+    return make_conditional_response(response, etag, len(body))
+
+
+def create_spooled_output_response(output: SpooledOutput) -> Response:
+    """
+    Creates the response of a spooled output, which is streamed from its local file. Like the response of values
+    which are kept in memory, it is gzip compressed when the client accepts it and supports conditional and Range
+    requests.
+
+    Args:
+        output: The spooled output
+
+    Returns:
+        The flask response
+    """
+    is_gzip = bool(request.accept_encodings['gzip'])
+    path, size = (output.gzip_path, output.gzip_size) if is_gzip else (output.path, output.size)
+    response = Response(wrap_file(request.environ, open(path, 'rb')), status=200, mimetype=output.mimetype,
+                        direct_passthrough=True)
+    return make_conditional_response(response, output.etag, size, is_gzip=is_gzip)
+
+
+def make_conditional_response(response: Response, etag: str, size: int, is_gzip: bool = False) -> Response:
+    """
+    Sets the ETag and the encoding of a response, and makes it conditional - a 304 is returned for a matching
+    If-None-Match header and a Range header gets a 206 with the requested part of the values.
+    """
+    if is_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+        # every encoding of the values is a different representation, which must have its own strong ETag
+        response.set_etag(etag + '-gzip')
+    else:
+        response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+
 ''' COMMAND FUNCTIONS '''
 
 
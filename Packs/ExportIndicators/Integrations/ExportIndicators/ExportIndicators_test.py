@@ -615,3 +615,103 @@ class TestHelperFunctions:
             debug_list = [call[0][0] for call in demisto.debug.call_args_list]
             assert 'ExportIndicators - Could not sort IoCs, please verify that you entered the correct field name.\n' \
                    'Field used: invalid_field_name' in debug_list
+
+    def test_route_list_values_conditional_response(self, mocker):
+        """Test the list ETag, 304 for a matching If-None-Match, gzip content encoding and range requests"""
+        import gzip
+        import ExportIndicators as ei
+        mocker.patch.object(ei, 'GZIP_VALUES', {})
+        mocker.patch.object(demisto, 'params', return_value={'indicators_query': 'type:IP'})
+        mocker.patch.object(demisto, 'getIntegrationContext', return_value={ei.CTX_MIMETYPE_KEY: 'text/plain'})
+        mocker.patch.object(ei, 'get_outbound_ioc_values', return_value='1.1.1.1\n2.2.2.2')
+        with ei.APP.test_client() as client:
+            response = client.get('/')
+            assert response.status_code == 200
+            assert response.data == b'1.1.1.1\n2.2.2.2'
+            etag = response.headers['ETag']
+
+            response = client.get('/', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+
+            response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+            assert response.status_code == 200
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(response.data) == b'1.1.1.1\n2.2.2.2'
+            assert response.headers['ETag'] != etag
+
+            response = client.get('/', headers={'Range': 'bytes=8-'})
+            assert response.status_code == 206
+            assert response.data == b'2.2.2.2'
+
+    def test_route_list_values_spooled_output(self, mocker):
+        """Test the list is polled once to a spooled output, which is streamed with gzip and range support"""
+        import os
+        import gzip
+        import ExportIndicators as ei
+        iocs = [{'value': '1.1.1.1', 'indicator_type': 'IP'}, {'value': '2.2.2.2', 'indicator_type': 'IP'}]
+        mocker.patch.object(ei, 'SPOOLED_OUTPUT', None)
+        mocker.patch.object(demisto, 'params', return_value={'indicators_query': 'type:IP', 'list_size': 2,
+                                                             'cache_refresh_rate': '1 hour'})
+        mocker.patch.object(ei, 'find_indicators_with_limit', return_value=iocs)
+        with ei.APP.test_client() as client:
+            response = client.get('/')
+            assert response.status_code == 200
+            assert response.data == b'1.1.1.1\n2.2.2.2'
+            etag = response.headers['ETag']
+
+            response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+            assert response.status_code == 200
+            assert gzip.decompress(response.data) == b'1.1.1.1\n2.2.2.2'
+
+            response = client.get('/', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+
+            response = client.get('/', headers={'Range': 'bytes=8-'})
+            assert response.status_code == 206
+            assert response.data == b'2.2.2.2'
+            assert ei.find_indicators_with_limit.call_count == 1
+
+            # a change of the request arguments refreshes the output, and removes the previous one
+            output = ei.SPOOLED_OUTPUT
+            response = client.get('/?v=json-seq')
+            assert response.data == b'{"indicator": "1.1.1.1", "value": {"indicator_type": "IP"}}\n' \
+                                    b'{"indicator": "2.2.2.2", "value": {"indicator_type": "IP"}}'
+            assert not os.path.exists(output.path)
+            assert not os.path.exists(output.gzip_path)
+        ei.SPOOLED_OUTPUT.remove()
+
+    @pytest.mark.parametrize('out_format', ['text', 'csv', 'json', 'json-seq', 'XSOAR json', 'XSOAR json-seq',
+                                            'XSOAR csv', 'McAfee Web Gateway', 'Symantec ProxySG', 'PAN-OS URL'])
+    def test_write_outbound_values_sorted(self, mocker, out_format):
+        """Test sorted IoCs are formatted as the sorted list of all the polled pages"""
+        import io
+        import ExportIndicators as ei
+        with open('ExportIndicators_test/TestHelperFunctions/demisto_url_iocs.json', 'r') as iocs_json_f:
+            iocs_json = json.loads(iocs_json_f.read())
+        mocker.patch.object(ei, 'find_indicators_with_limit', side_effect=[iocs_json[:1], iocs_json[1:], []])
+        request_args = ei.RequestArguments(query='', out_format=out_format, limit=len(iocs_json) + 10,
+                                           sort_field='value', sort_order='desc')
+        out = io.StringIO()
+        ei.write_outbound_values(request_args, out)
+
+        sorted_iocs = sorted(iocs_json, key=lambda ioc: ioc['value'], reverse=True)
+        expected, _ = ei.create_values_for_returned_dict(sorted_iocs, request_args)
+        assert out.getvalue() == expected[ei.CTX_VALUES_KEY]
+
+    def test_values_formatter_collapsed_ips_count(self, mocker):
+        """Test the collapsed IPs are computed once for the count and the end of the output, unless IPs were added"""
+        import io
+        import ExportIndicators as ei
+        mocker.patch.object(ei, 'ips_to_ranges', wraps=ei.ips_to_ranges)
+        request_args = ei.RequestArguments(query='', out_format='text', collapse_ips=ei.COLLAPSE_TO_RANGES)
+        out = io.StringIO()
+        formatter = ei.ValuesFormatter(request_args, out)
+
+        formatter.format([{'value': '1.1.1.1', 'indicator_type': 'IP'}, {'value': 'example.com'}])
+        assert formatter.get_count() == 2
+        formatter.format([{'value': '1.1.1.2', 'indicator_type': 'IP'}])
+        assert formatter.get_count() == 2
+        formatter.close()
+
+        assert out.getvalue() == 'example.com\n1.1.1.1-1.1.1.2'
+        assert ei.ips_to_ranges.call_count == 2
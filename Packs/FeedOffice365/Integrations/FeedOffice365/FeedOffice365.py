@@ -1,5 +1,6 @@
 from typing import Dict, List, Tuple, Any, Callable, Optional
 
+import concurrent.futures
 import uuid
 import urllib3
 
@@ -8,6 +9,7 @@ from CommonServerPython import *
 # disable insecure warnings
 urllib3.disable_warnings()
 INTEGRATION_NAME = 'Office 365'
+MAX_WORKERS = 10  # max concurrent requests to the endpoints service
 
 
 def build_urls_dict(regions_list: list, services_list: list, unique_id) -> List[Dict[str, Any]]:
@@ -61,47 +63,62 @@ class Client:
 
     def build_iterator(self) -> List:
         """Retrieves all entries from the feed.
+        The services are requested concurrently, and their entries are returned in the order of the services.
 
         Returns:
             A list of objects, containing the indicators.
         """
         result = []
-        for feed_obj in self._urls_list:
-            feed_url = feed_obj.get('FeedURL', '')
-            region = feed_obj.get('Region')
-            service = feed_obj.get('Service')
-            try:
-                response = requests.get(
-                    url=feed_url,
-                    verify=self._verify,
-                    proxies=self._proxies,
-                )
-                response.raise_for_status()
-                data = response.json()
-                indicators = [i for i in data if 'ips' in i or 'urls' in i]  # filter empty entries and add metadata]
-                for i in indicators:  # add relevant fields of services
-                    i.update({
-                        'Region': region,
-                        'Service': service,
-                        'FeedURL': feed_url
-                    })
+        if not self._urls_list:
+            return result
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(self._urls_list), MAX_WORKERS)) as executor:
+            for indicators in executor.map(self.get_service_indicators, self._urls_list):
                 result.extend(indicators)
-            except requests.exceptions.SSLError as err:
-                demisto.debug(str(err))
-                raise Exception(f'Connection error in the API call to {INTEGRATION_NAME}.\n'
-                                f'Check your not secure parameter.\n\n{err}')
-            except requests.ConnectionError as err:
-                demisto.debug(str(err))
-                raise Exception(f'Connection error in the API call to {INTEGRATION_NAME}.\n'
-                                f'Check your Server URL parameter.\n\n{err}')
-            except requests.exceptions.HTTPError as err:
-                demisto.debug(str(err))
-                raise Exception(f'Connection error in the API call to {INTEGRATION_NAME}.\n')
-            except ValueError as err:
-                demisto.debug(str(err))
-                raise ValueError(f'Could not parse returned data to Json. \n\nError massage: {err}')
         return result
 
+    def get_service_indicators(self, feed_obj: dict) -> List:
+        """Retrieves the entries of a single service.
+
+        Args:
+            feed_obj: The feed URL, region and service of the service.
+
+        Returns:
+            A list of objects, containing the indicators.
+        """
+        feed_url = feed_obj.get('FeedURL', '')
+        region = feed_obj.get('Region')
+        service = feed_obj.get('Service')
+        try:
+            response = requests.get(
+                url=feed_url,
+                verify=self._verify,
+                proxies=self._proxies,
+            )
+            response.raise_for_status()
+            data = response.json()
+            indicators = [i for i in data if 'ips' in i or 'urls' in i]  # filter empty entries and add metadata]
+            for i in indicators:  # add relevant fields of services
+                i.update({
+                    'Region': region,
+                    'Service': service,
+                    'FeedURL': feed_url
+                })
+            return indicators
+        except requests.exceptions.SSLError as err:
+            demisto.debug(str(err))
+            raise Exception(f'Connection error in the API call to {INTEGRATION_NAME}.\n'
+                            f'Check your not secure parameter.\n\n{err}')
+        except requests.ConnectionError as err:
+            demisto.debug(str(err))
+            raise Exception(f'Connection error in the API call to {INTEGRATION_NAME}.\n'
+                            f'Check your Server URL parameter.\n\n{err}')
+        except requests.exceptions.HTTPError as err:
+            demisto.debug(str(err))
+            raise Exception(f'Connection error in the API call to {INTEGRATION_NAME}.\n')
+        except ValueError as err:
+            demisto.debug(str(err))
+            raise ValueError(f'Could not parse returned data to Json. \n\nError massage: {err}')
+
     @staticmethod
     def check_indicator_type(indicator):
         """Checks the indicator type.
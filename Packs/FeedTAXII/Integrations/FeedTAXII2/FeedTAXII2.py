@@ -2,7 +2,7 @@ import demistomock as demisto
 from CommonServerPython import *
 from CommonServerUserPython import *
 
-from typing import Any, Tuple
+from typing import Any, Iterator, Tuple
 
 """ CONSTANT VARIABLES """
 
@@ -66,6 +66,29 @@ def fetch_indicators_command(
     :param fetch_full_feed: when set to true, will ignore last run, and try to fetch the entire feed
     :return: indicators in cortex TIM format
     """
+    indicators: list = []
+    for fetched_iocs in iter_fetched_indicators(client, initial_interval, limit, last_run_ctx, fetch_full_feed):
+        indicators.extend(fetched_iocs)
+    return indicators, last_run_ctx
+
+
+def iter_fetched_indicators(
+    client,
+    initial_interval,
+    limit,
+    last_run_ctx,
+    fetch_full_feed: bool = False,
+) -> Iterator[list]:
+    """
+    Fetch indicators from TAXII 2 server, yielding them page by page as they arrive
+    :param client: Taxii2FeedClient
+    :param initial_interval: initial interval in parse_date_range format
+    :param limit: upper limit of indicators to fetch
+    :param last_run_ctx: last run dict with {collection_id: last_run_time string},
+        updated once the indicators of a collection were all yielded
+    :param fetch_full_feed: when set to true, will ignore last run, and try to fetch the entire feed
+    :return: generator of indicators lists in cortex TIM format
+    """
     if initial_interval:
         initial_interval, _ = parse_date_range(
             initial_interval, date_format=TAXII_TIME_FORMAT
@@ -84,29 +107,27 @@ def fetch_indicators_command(
         # fetch all collections
         if client.collections is None:
             raise DemistoException(ERR_NO_COLL)
-        indicators: list = []
         for collection in client.collections:
             client.collection_to_fetch = collection
             filter_args["added_after"] = get_added_after(
                 fetch_full_feed, initial_interval, last_run_ctx.get(collection.id)
             )
-            fetched_iocs = client.build_iterator(limit, **filter_args)
-            indicators.extend(fetched_iocs)
-            if limit >= 0:
-                limit -= len(fetched_iocs)
-                if limit <= 0:
-                    break
+            for fetched_iocs in client.iter_indicator_pages(limit, **filter_args):
+                yield fetched_iocs
+                if limit >= 0:
+                    limit -= len(fetched_iocs)
+            if limit == 0:
+                break
             last_run_ctx[collection.id] = client.last_fetched_indicator__modified
     else:
         # fetch from a single collection
         filter_args["added_after"] = get_added_after(fetch_full_feed, initial_interval, last_fetch_time)
-        indicators = client.build_iterator(limit, **filter_args)
+        yield from client.iter_indicator_pages(limit, **filter_args)
         last_run_ctx[client.collection_to_fetch.id] = (
             client.last_fetched_indicator__modified
             if client.last_fetched_indicator__modified
             else filter_args.get("added_after")
         )
-    return indicators, last_run_ctx
 
 
 def get_added_after(
@@ -262,13 +283,15 @@ def main():
             if fetch_full_feed:
                 limit = -1
             integration_ctx = demisto.getIntegrationContext() or {}
-            (indicators, integration_ctx) = fetch_indicators_command(
+            fetched_pages = iter_fetched_indicators(
                 client,
                 initial_interval,
                 limit,
                 integration_ctx,
                 fetch_full_feed,
             )
+            # create the indicators while the following pages are still being fetched
+            indicators = (indicator for page in fetched_pages for indicator in page)
             for iter_ in batch(indicators, batch_size=2000):
                 demisto.createIndicators(iter_)
 
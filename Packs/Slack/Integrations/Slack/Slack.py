@@ -1,5 +1,6 @@
 import asyncio
 import concurrent
+import heapq
 import json
 import os
 import ssl
@@ -55,6 +56,14 @@ OBJECTS_TO_KEYS = {
     'users': 'id'
 }
 SYNC_CONTEXT = True
+UNKNOWN_USER_TTL_MINUTES = 10
+MAX_CONCURRENT_POLLS = 10
+QUESTIONS_RELOAD_SECONDS = 5
+MIN_ANSWERS_CHECK_SECONDS = 1
+POLL_RETRY_SECONDS = 5
+MAX_POLL_RETRY_SECONDS = 60
+USER_PROFILE_FIELDS = ('email', 'real_name', 'real_name_normalized', 'display_name')
+SLACK_USER_ID_REGEX = re.compile(r'^[UW][A-Z0-9]{8,}$')
 
 ''' GLOBALS '''
 
@@ -76,6 +85,8 @@ BOT_NAME: str
 BOT_ICON_URL: str
 MAX_LIMIT_TIME: int
 PAGINATED_COUNT: int
+USER_DIRECTORY: 'UserDirectory'
+QUESTION_SCHEDULER: 'QuestionScheduler'
 
 ''' HELPER FUNCTIONS '''
 
@@ -121,6 +132,165 @@ def get_current_utc_time() -> datetime:
     return datetime.utcnow()
 
 
+class UserDirectory:
+    """
+    Indexes the Slack users by ID, name, email and real name.
+
+    The users saved in the integration context are re-indexed only when they change. In the long running
+    execution the whole workspace is also indexed by a periodic refresh from users.list, in which case a user
+    missing from the index is looked up directly instead of listing the workspace again. Users that were not found
+    are remembered for a while.
+    """
+
+    def __init__(self, refresh_minutes: int = 0):
+        self.refresh_minutes = refresh_minutes
+        self.lock = threading.Lock()
+        self.context_users_json: Optional[str] = None
+        self.context_users: Dict[str, dict] = {}
+        self.context_index: Dict[str, dict] = {}
+        self.workspace_users: Dict[str, dict] = {}
+        self.workspace_index: Dict[str, dict] = {}
+        self.refresh_time: Optional[datetime] = None
+        self.unknown_users: Dict[str, datetime] = {}
+
+    @staticmethod
+    def compact_user(user: dict) -> dict:
+        """
+        Keeps only the user fields the integration uses, to keep the integration context small.
+        """
+        compact = {key: user[key] for key in ('id', 'name', 'real_name') if key in user}
+        profile = user.get('profile', {})
+        compact['profile'] = {key: profile[key] for key in USER_PROFILE_FIELDS if key in profile}
+        return compact
+
+    @staticmethod
+    def index_users(users: List[dict]) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """
+        Indexes users by ID and by their lower case name, email and real name. When several users match the
+        same key, the first one in the list is kept, like a linear search over the list would find.
+        """
+        users_by_id: Dict[str, dict] = {}
+        index: Dict[str, dict] = {}
+        for user in users:
+            users_by_id.setdefault(user.get('id', ''), user)
+            for key in (user.get('name', ''), user.get('profile', {}).get('email', ''), user.get('real_name', '')):
+                if key:
+                    index.setdefault(key.lower(), user)
+        return users_by_id, index
+
+    def load(self, integration_context: dict) -> List[dict]:
+        """
+        Indexes the users saved in the integration context, if they changed since the last load.
+
+        Returns:
+            The users saved in the integration context.
+        """
+        users_json = integration_context.get('users') or '[]'
+        with self.lock:
+            if users_json != self.context_users_json:
+                users = json.loads(users_json)
+                self.context_users, self.context_index = self.index_users(users)
+                self.context_users_json = users_json
+            return list(self.context_users.values())
+
+    def is_complete(self) -> bool:
+        """
+        Whether the whole workspace was indexed recently enough to look up missing users directly.
+        """
+        if not self.refresh_time:
+            return False
+        return get_current_utc_time() - self.refresh_time < timedelta(minutes=2 * self.refresh_minutes)
+
+    def find(self, user_to_search: str) -> dict:
+        """
+        Finds a user by its lower case name, email or real name.
+        """
+        return self.context_index.get(user_to_search) or self.workspace_index.get(user_to_search) or {}
+
+    def get_by_id(self, user_id: str) -> dict:
+        return self.context_users.get(user_id) or self.workspace_users.get(user_id) or {}
+
+    def add_unknown(self, user_to_search: str):
+        self.unknown_users[user_to_search] = get_current_utc_time()
+
+    def is_unknown(self, user_to_search: str) -> bool:
+        unknown_time = self.unknown_users.get(user_to_search)
+        if not unknown_time:
+            return False
+        if get_current_utc_time() - unknown_time >= timedelta(minutes=UNKNOWN_USER_TTL_MINUTES):
+            del self.unknown_users[user_to_search]
+            return False
+        return True
+
+    def refresh(self):
+        """
+        Indexes all the workspace users from users.list.
+        """
+        refresh_time = get_current_utc_time()
+        users = [self.compact_user(user) for user in iter_workspace_users()]
+        users_by_id, index = self.index_users(users)
+        with self.lock:
+            self.workspace_users, self.workspace_index = users_by_id, index
+            self.refresh_time = refresh_time
+            self.unknown_users = {}
+        demisto.debug(f'Slack - indexed {len(users)} workspace users')
+
+
+def iter_workspace_users():
+    """
+    Iterates over the workspace users, page by page.
+
+    Yields:
+        Slack user objects
+    """
+    body = {
+        'limit': PAGINATED_COUNT
+    }
+    response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
+    while True:
+        workspace_users = response['members'] if response and response.get('members', []) else []
+        yield from workspace_users
+        cursor = response.get('response_metadata', {}).get('next_cursor')
+        if not cursor:
+            break
+        body = body.copy()
+        body.update({'cursor': cursor})
+        response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
+
+
+def add_users_to_context(users: List[dict]):
+    """
+    Saves users to the integration context, merged by ID with the users already saved.
+
+    Args:
+        users: The Slack user objects
+    """
+    set_to_integration_context_with_retries({'users': [UserDirectory.compact_user(user) for user in users]},
+                                            OBJECTS_TO_KEYS, SYNC_CONTEXT)
+
+
+def lookup_user(user_to_search: str) -> dict:
+    """
+    Looks up a single user by email or ID, for users which joined the workspace since the last directory refresh.
+
+    Args:
+        user_to_search: The user email or ID
+
+    Returns:
+        A slack user object, or an empty dict if the user was not found
+    """
+    if '@' in user_to_search:
+        method, body = 'users.lookupByEmail', {'email': user_to_search}
+    else:
+        method, body = 'users.info', {'user': user_to_search.upper()}
+    try:
+        return send_slack_request_sync(CLIENT, method, http_verb='GET', body=body).get('user', {})
+    except SlackApiError as e:
+        if 'not_found' not in str(e):
+            raise
+        return {}
+
+
 def get_user_by_name(user_to_search: str, add_to_context: bool = True) -> dict:
     """
     Gets a slack user by a user name
@@ -132,45 +302,32 @@ def get_user_by_name(user_to_search: str, add_to_context: bool = True) -> dict:
     Returns:
         A slack user object
     """
-
-    user: dict = {}
-    users: list = []
-    integration_context = get_integration_context(SYNC_CONTEXT)
-
+    original_user = user_to_search
     user_to_search = user_to_search.lower()
-    if integration_context.get('users'):
-        users = json.loads(integration_context['users'])
-        users_filter = list(filter(lambda u: u.get('name', '').lower() == user_to_search
-                                             or u.get('profile', {}).get('email', '').lower() == user_to_search
-                                             or u.get('real_name', '').lower() == user_to_search, users))
-        if users_filter:
-            user = users_filter[0]
-    if not user:
-        body = {
-            'limit': PAGINATED_COUNT
-        }
-        response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
-        while True:
-            workspace_users = response['members'] if response and response.get('members', []) else []
-            cursor = response.get('response_metadata', {}).get('next_cursor')
-            users_filter = list(filter(lambda u: u.get('name', '').lower() == user_to_search
-                                                 or u.get('profile', {}).get('email', '').lower() == user_to_search
-                                                 or u.get('real_name', '').lower() == user_to_search, workspace_users))
-            if users_filter:
-                break
-            if not cursor:
+    USER_DIRECTORY.load(get_integration_context(SYNC_CONTEXT))
+    user = USER_DIRECTORY.find(user_to_search)
+    if user:
+        return user
+    if USER_DIRECTORY.is_unknown(user_to_search):
+        return {}
+
+    if USER_DIRECTORY.is_complete() and ('@' in user_to_search or SLACK_USER_ID_REGEX.match(original_user)):
+        # The user may have joined since the last refresh, look it up directly instead of listing the workspace
+        user = lookup_user(user_to_search)
+    else:
+        # Names and real names can't be looked up directly, so the workspace users are listed
+        for workspace_user in iter_workspace_users():
+            if user_to_search in (workspace_user.get('name', '').lower(),
+                                  workspace_user.get('profile', {}).get('email', '').lower(),
+                                  workspace_user.get('real_name', '').lower()):
+                user = workspace_user
                 break
-            body = body.copy()
-            body.update({'cursor': cursor})
-            response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
-
-        if users_filter:
-            user = users_filter[0]
-            if add_to_context:
-                users.append(user)
-                set_to_integration_context_with_retries({'users': users}, OBJECTS_TO_KEYS, SYNC_CONTEXT)
-        else:
-            return {}
+
+    if not user:
+        USER_DIRECTORY.add_unknown(user_to_search)
+        return {}
+    if add_to_context:
+        add_users_to_context([user])
 
     return user
 
@@ -364,11 +521,8 @@ async def get_slack_name(slack_id: str, client) -> str:
                                                            body=body)).get('channel', {})
         slack_name = conversation.get('name', '')
     elif prefix == 'U':
-        user: dict = {}
-        if integration_context.get('users'):
-            users = list(filter(lambda u: u['id'] == slack_id, json.loads(integration_context['users'])))
-            if users:
-                user = users[0]
+        USER_DIRECTORY.load(integration_context)
+        user = USER_DIRECTORY.get_by_id(slack_id)
         if not user:
             body = {
                 'user': slack_id
@@ -599,13 +753,12 @@ def mirror_investigation():
 
 def long_running_loop():
     """
-    Runs in a long running container - checking for newly mirrored investigations and answered questions.
+    Runs in a long running container - checking for newly mirrored investigations.
     """
     while True:
         error = ''
         try:
             check_for_mirrors()
-            check_for_answers()
         except requests.exceptions.ConnectionError as e:
             error = f'Could not connect to the Slack endpoint: {str(e)}'
         except Exception as e:
@@ -617,23 +770,208 @@ def long_running_loop():
             time.sleep(5)
 
 
-def check_for_answers():
+async def answers_loop():
+    """
+    Runs in a long running container - checking for answered questions when they are due to be polled.
+    Each check reads the integration context, so the checks are at least MIN_ANSWERS_CHECK_SECONDS apart.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        error = ''
+        try:
+            await loop.run_in_executor(None, check_for_answers)
+        except requests.exceptions.ConnectionError as e:
+            error = f'Could not connect to the Slack endpoint: {str(e)}'
+        except Exception as e:
+            error = f'An error occurred: {str(e)}'
+        finally:
+            if error:
+                demisto.error(error)
+                demisto.updateModuleHealth(error)
+        await asyncio.sleep(max(QUESTION_SCHEDULER.seconds_until_due(get_current_utc_time()),
+                                MIN_ANSWERS_CHECK_SECONDS))
+
+
+def user_directory_refresh_loop():
     """
-    Checks for answered questions
+    Runs in a long running container - periodically indexing all the workspace users.
     """
+    while True:
+        try:
+            USER_DIRECTORY.refresh()
+        except Exception as e:
+            demisto.error(f'Slack - failed refreshing the users directory: {str(e)}')
+        time.sleep(USER_DIRECTORY.refresh_minutes * 60)
+
+
+class QuestionScheduler:
+    """
+    Keeps the pending questions in a priority queue ordered by the time they are due to be polled or to expire.
+
+    The questions saved in the integration context are re-parsed only when they change, and only the questions
+    that were polled or answered are written back, through a store which is kept for the whole long running
+    execution so its write metrics are reported along with the poll metrics. Questions whose poll failed are
+    retried with an exponential backoff.
+    """
+
+    def __init__(self):
+        self.questions_json: Optional[str] = None
+        self.questions: Dict[str, dict] = {}
+        self.due_times: Dict[str, datetime] = {}
+        self.queue: List[Tuple[datetime, str]] = []
+        self.poll_failures: Dict[str, int] = {}
+        self.retry_times: Dict[str, datetime] = {}
+        self.polls = 0
+        self.total_poll_seconds = 0.0
+        self.max_poll_seconds = 0.0
+        self.context_store = IntegrationContextStore(OBJECTS_TO_KEYS, SYNC_CONTEXT)
+
+    @staticmethod
+    def get_due_time(question: dict) -> datetime:
+        """
+        Gets the earliest time the question may need to be polled or expired. The polling interval only grows
+        with the time since the question was sent, so the interval at the last poll time is a lower bound.
+        """
+        last_poll_time = question.get('last_poll_time')
+        if not last_poll_time:
+            return datetime.min
+        last_poll = datetime.strptime(last_poll_time, DATE_FORMAT)
+        due_time = last_poll + timedelta(minutes=get_poll_minutes(last_poll, question.get('sent')))
+        if question.get('expiry'):
+            due_time = min(due_time, datetime.strptime(question['expiry'], DATE_FORMAT))
+        return due_time
+
+    def load(self, integration_context: dict):
+        """
+        Queues the questions saved in the integration context, if they changed since the last load.
+        """
+        questions_json = integration_context.get('questions') or '[]'
+        if questions_json == self.questions_json:
+            return
+        questions = json.loads(questions_json)
+        self.questions = {question.get('entitlement', ''): question for question in questions}
+        self.retry_times = {entitlement: retry_time for entitlement, retry_time in self.retry_times.items()
+                            if entitlement in self.questions}
+        self.poll_failures = {entitlement: failures for entitlement, failures in self.poll_failures.items()
+                              if entitlement in self.retry_times}
+        self.due_times = {entitlement: max(self.get_due_time(question), self.retry_times.get(entitlement, datetime.min))
+                          for entitlement, question in self.questions.items()}
+        self.queue = [(due_time, entitlement) for entitlement, due_time in self.due_times.items()]
+        heapq.heapify(self.queue)
+        self.questions_json = questions_json
+
+    def schedule(self, entitlement: str, due_time: datetime):
+        self.due_times[entitlement] = due_time
+        heapq.heappush(self.queue, (due_time, entitlement))
+
+    def schedule_retry(self, entitlement: str, now: datetime):
+        """
+        Schedules a question whose poll failed, doubling the backoff on each consecutive failure.
+        """
+        failures = self.poll_failures.get(entitlement, 0)
+        self.poll_failures[entitlement] = failures + 1
+        retry_time = now + timedelta(seconds=min(POLL_RETRY_SECONDS * 2 ** failures, MAX_POLL_RETRY_SECONDS))
+        self.retry_times[entitlement] = retry_time
+        self.schedule(entitlement, retry_time)
+
+    def record_success(self, entitlement: str):
+        self.poll_failures.pop(entitlement, None)
+        self.retry_times.pop(entitlement, None)
+
+    def pop_due(self, now: datetime) -> List[dict]:
+        """
+        Removes the questions which are due from the queue. Entries replaced by a later schedule are skipped.
+
+        Returns:
+            The due questions.
+        """
+        due_questions = []
+        while self.queue and self.queue[0][0] <= now:
+            due_time, entitlement = heapq.heappop(self.queue)
+            if self.due_times.get(entitlement) == due_time:
+                del self.due_times[entitlement]
+                due_questions.append(self.questions[entitlement])
+        return due_questions
+
+    def seconds_until_due(self, now: datetime) -> float:
+        """
+        Gets the time to wait before the next check, which is at most QUESTIONS_RELOAD_SECONDS so new questions
+        are picked up.
+        """
+        if not self.queue:
+            return QUESTIONS_RELOAD_SECONDS
+        return min(max((self.queue[0][0] - now).total_seconds(), 0), QUESTIONS_RELOAD_SECONDS)
+
+    def save(self, updated_questions: List[dict], new_users: List[dict]):
+        """
+        Writes the updated questions and the users who answered them to the integration context with a single write,
+        merged by entitlement and by ID with the saved ones.
+        """
+        self.context_store.update({'questions': updated_questions})
+        if new_users:
+            self.context_store.update({'users': new_users})
+        self.context_store.flush()
+        questions = merge_lists(list(self.questions.values()), updated_questions, 'entitlement')
+        self.questions = {question.get('entitlement', ''): question for question in questions}
+        # This is what the context holds unless it was changed meanwhile, so the next load does not re-parse it
+        self.questions_json = json.dumps(questions)
+
+    def record_poll(self, poll_seconds: float):
+        self.polls += 1
+        self.total_poll_seconds += poll_seconds
+        self.max_poll_seconds = max(self.max_poll_seconds, poll_seconds)
+
+    def get_metrics(self) -> dict:
+        return {
+            'queue_depth': len(self.due_times),
+            'polls': self.polls,
+            'average_poll_seconds': round(self.total_poll_seconds / self.polls, 3) if self.polls else 0,
+            'max_poll_seconds': round(self.max_poll_seconds, 3),
+            'context': self.context_store.get_metrics()
+        }
+
 
+def poll_question(question: dict) -> Tuple[requests.Response, float]:
+    """
+    Polls the Slack endpoint for an answer to a question.
+
+    Args:
+        question: The question to poll for.
+
+    Returns:
+        The endpoint response and the time the request took in seconds.
+    """
+    entitlement = question.get('entitlement', '')
+    demisto.info(f'Slack - polling for an answer for entitlement {entitlement}')
+    headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+    add_info_headers(headers, question.get('expiry'))
+
+    body = {
+        'entitlement': entitlement
+    }
+    start_time = time.time()
+    res = requests.post(ENDPOINT_URL, data=json.dumps(body), headers=headers, proxies=PROXIES, verify=VERIFY_CERT,
+                        timeout=30)
+    return res, time.time() - start_time
+
+
+def check_for_answers():
+    """
+    Checks for answered questions. Only the questions which are due are polled, concurrently, and only the
+    questions which were polled or answered are written back to the integration context. The integration context
+    is still read in full on each check.
+    """
     integration_context = get_integration_context(SYNC_CONTEXT)
-    questions = integration_context.get('questions', [])
-    users = integration_context.get('users', [])
-    if questions:
-        questions = json.loads(questions)
-    if users:
-        users = json.loads(users)
+    QUESTION_SCHEDULER.load(integration_context)
+    USER_DIRECTORY.load(integration_context)
     now = get_current_utc_time()
     now_string = datetime.strftime(now, DATE_FORMAT)
     updated_questions = []
+    questions_to_poll = []
+    new_users = []
 
-    for question in questions:
+    for question in QUESTION_SCHEDULER.pop_due(now):
+        entitlement = question.get('entitlement', '')
         if question.get('last_poll_time'):
             if question.get('expiry'):
                 # Check if the question expired - if it did, answer it with the default response and remove it
@@ -643,7 +981,7 @@ def check_for_answers():
                     updated_questions.append(question)
                     continue
             # Check if it has been enough time(determined by the POLL_INTERVAL_MINUTES parameter)
-            # since the last polling time. if not, continue to the next question until it has.
+            # since the last polling time. if not, schedule the question for when it has.
             last_poll_time = datetime.strptime(question['last_poll_time'], DATE_FORMAT)
             delta = now - last_poll_time
             minutes = delta.total_seconds() / 60
@@ -651,53 +989,79 @@ def check_for_answers():
             poll_time_minutes = get_poll_minutes(now, sent)
 
             if minutes < poll_time_minutes:
+                QUESTION_SCHEDULER.schedule(entitlement, last_poll_time + timedelta(minutes=poll_time_minutes))
                 continue
+        questions_to_poll.append(question)
+
+    futures: List[concurrent.futures.Future] = []
+    if questions_to_poll:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(questions_to_poll),
+                                                                   MAX_CONCURRENT_POLLS)) as executor:
+            futures = [executor.submit(poll_question, question) for question in questions_to_poll]
+
+    poll_error: Optional[Exception] = None
+    for question, future in zip(questions_to_poll, futures):
         entitlement = question.get('entitlement', '')
-        demisto.info(f'Slack - polling for an answer for entitlement {entitlement}')
+        try:
+            res, poll_seconds = future.result()
+        except Exception as e:
+            QUESTION_SCHEDULER.schedule_retry(entitlement, now)
+            poll_error = poll_error or e
+            continue
+        QUESTION_SCHEDULER.record_success(entitlement)
+        QUESTION_SCHEDULER.record_poll(poll_seconds)
         question['last_poll_time'] = now_string
         updated_questions.append(question)
+        handle_poll_response(question, res, new_users)
+        if not question.get('remove'):
+            QUESTION_SCHEDULER.schedule(entitlement, QUESTION_SCHEDULER.get_due_time(question))
 
-        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
-        add_info_headers(headers, question.get('expiry'))
+    if updated_questions:
+        QUESTION_SCHEDULER.save(updated_questions, new_users)
+    if questions_to_poll:
+        demisto.debug(f'Slack - polled {len(questions_to_poll)} questions: {QUESTION_SCHEDULER.get_metrics()}')
+    if poll_error:
+        raise poll_error
 
-        body = {
-            'entitlement': entitlement
-        }
-        res = requests.post(ENDPOINT_URL, data=json.dumps(body), headers=headers, proxies=PROXIES, verify=VERIFY_CERT,
-                            timeout=30)
-        if res.status_code != 200:
-            demisto.error(f'Slack - failed to poll for answers: {res.content!r}, status code: {res.status_code!r}')
-            continue
-        answer: dict = {}
-        try:
-            answer = res.json()
-        except Exception:
-            demisto.info(f'Slack - Could not parse response for entitlement {entitlement!r}: {res.content!r}')
-        if not answer:
-            continue
-        payload_json: str = answer.get('payload', '')
-        if not payload_json:
-            continue
-        payload = json.loads(payload_json)
-
-        actions = payload.get('actions', [])
-        if actions:
-            demisto.info(f'Slack - received answer from user for entitlement {entitlement}.')
-            user_id = payload.get('user', {}).get('id')
-            user_filter = list(filter(lambda u: u['id'] == user_id, users))
-            if user_filter:
-                user = user_filter[0]
-            else:
-                body = {
-                    'user': user_id
-                }
-                user = send_slack_request_sync(CLIENT, 'users.info', http_verb='GET', body=body).get('user', {})
-                users.append(user)
 
-            answer_question(actions[0].get('text', {}).get('text'), question, user.get('profile', {}).get('email'))
+def handle_poll_response(question: dict, res: requests.Response, new_users: List[dict]):
+    """
+    Answers a question if the poll response has an answer to it.
 
-    if updated_questions:
-        set_to_integration_context_with_retries({'users': users, 'questions': questions}, OBJECTS_TO_KEYS, SYNC_CONTEXT)
+    Args:
+        question: The polled question.
+        res: The endpoint response.
+        new_users: Users which were not in the integration context, to add the answering user to.
+    """
+    entitlement = question.get('entitlement', '')
+    if res.status_code != 200:
+        demisto.error(f'Slack - failed to poll for answers: {res.content!r}, status code: {res.status_code!r}')
+        return
+    answer: dict = {}
+    try:
+        answer = res.json()
+    except Exception:
+        demisto.info(f'Slack - Could not parse response for entitlement {entitlement!r}: {res.content!r}')
+    if not answer:
+        return
+    payload_json: str = answer.get('payload', '')
+    if not payload_json:
+        return
+    payload = json.loads(payload_json)
+
+    actions = payload.get('actions', [])
+    if actions:
+        demisto.info(f'Slack - received answer from user for entitlement {entitlement}.')
+        user_id = payload.get('user', {}).get('id')
+        user = USER_DIRECTORY.get_by_id(user_id)
+        if not user:
+            body = {
+                'user': user_id
+            }
+            user = send_slack_request_sync(CLIENT, 'users.info', http_verb='GET', body=body).get('user', {})
+            new_users.append(UserDirectory.compact_user(user))
+
+        answer_question(actions[0].get('text', {}).get('text'), question, user.get('profile', {}).get('email'))
 
 
 def get_poll_minutes(current_time: datetime, sent: Optional[str]) -> float:
@@ -788,7 +1152,7 @@ def check_for_mirrors():
         if updated_mirrors:
             context = {'mirrors': updated_mirrors}
             if updated_users:
-                context['users'] = updated_users
+                context['users'] = [UserDirectory.compact_user(user) for user in updated_users]
 
             set_to_integration_context_with_retries(context, OBJECTS_TO_KEYS, SYNC_CONTEXT)
 
@@ -901,12 +1265,18 @@ async def handle_listen_error(error: str):
 
 async def start_listening():
     """
-    Starts a Slack RTM client and checks for mirrored incidents.
+    Starts a Slack RTM client and checks for mirrored incidents and answered questions.
     """
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
     loop = asyncio.get_running_loop()
     loop.run_in_executor(executor, long_running_loop)
-    await slack_loop()
+    if USER_DIRECTORY.refresh_minutes > 0:
+        loop.run_in_executor(executor, user_directory_refresh_loop)
+    answers_task = loop.create_task(answers_loop())
+    try:
+        await slack_loop()
+    finally:
+        answers_task.cancel()
 
 
 async def handle_dm(user: dict, text: str, client: slack.WebClient):
@@ -1155,21 +1525,15 @@ async def get_user_by_id_async(client: slack.WebClient, user_id: str) -> dict:
     Returns:
         The slack user.
     """
-    user: dict = {}
-    users: list = []
-    integration_context = get_integration_context(SYNC_CONTEXT)
-    if integration_context.get('users'):
-        users = json.loads(integration_context['users'])
-        user_filter = list(filter(lambda u: u['id'] == user_id, users))
-        if user_filter:
-            user = user_filter[0]
+    USER_DIRECTORY.load(get_integration_context(SYNC_CONTEXT))
+    user = USER_DIRECTORY.get_by_id(user_id)
     if not user:
         body = {
             'user': user_id
         }
         user = (await send_slack_request_async(client, 'users.info', http_verb='GET', body=body)).get('user', {})
-        users.append(user)
-        set_to_integration_context_with_retries({'users': users}, OBJECTS_TO_KEYS, SYNC_CONTEXT)
+        if user:
+            add_users_to_context([user])
 
     return user
 
@@ -1885,6 +2249,7 @@ def get_user():
     slack_user = get_user_by_name(user)
     if not slack_user:
         return_error('User not found')
+    # A user found in the users directory keeps only the fields below, which is all the outputs need
 
     profile = slack_user.get('profile', {})
     result_user = {
@@ -1918,7 +2283,7 @@ def init_globals(command_name: str = ''):
     """
     global BOT_TOKEN, ACCESS_TOKEN, PROXY_URL, PROXIES, DEDICATED_CHANNEL, CLIENT, CHANNEL_CLIENT
     global SEVERITY_THRESHOLD, ALLOW_INCIDENTS, NOTIFY_INCIDENTS, INCIDENT_TYPE, VERIFY_CERT
-    global BOT_NAME, BOT_ICON_URL, MAX_LIMIT_TIME, PAGINATED_COUNT, SSL_CONTEXT
+    global BOT_NAME, BOT_ICON_URL, MAX_LIMIT_TIME, PAGINATED_COUNT, SSL_CONTEXT, USER_DIRECTORY, QUESTION_SCHEDULER
 
     VERIFY_CERT = not demisto.params().get('unsecure', False)
     if not VERIFY_CERT:
@@ -1951,6 +2316,8 @@ def init_globals(command_name: str = ''):
     BOT_ICON_URL = demisto.params().get('bot_icon')  # Bot default icon url defined by the slack plugin (3-rd party)
     MAX_LIMIT_TIME = int(demisto.params().get('max_limit_time', '60'))
     PAGINATED_COUNT = int(demisto.params().get('paginated_count', '200'))
+    USER_DIRECTORY = UserDirectory(int(demisto.params().get('users_refresh_minutes', '60')))
+    QUESTION_SCHEDULER = QuestionScheduler()
 
 
 def print_thread_dump():
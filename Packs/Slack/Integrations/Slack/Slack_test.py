@@ -685,6 +685,140 @@ def test_get_user_by_name_paging(mocker):
     assert slack.WebClient.api_call.call_count == 2
 
 
+def test_get_user_by_name_unknown_user_cached(mocker):
+    """
+    Given:
+        - A user which is not in the integration context nor in the workspace.
+    When:
+        - Searching for the user twice.
+    Then:
+        - Validate the workspace users are listed only for the first search.
+    """
+    from Slack import get_user_by_name
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call', return_value={'members': js.loads(USERS)})
+
+    assert get_user_by_name('alexios') == {}
+    assert get_user_by_name('Alexios') == {}
+    assert slack.WebClient.api_call.call_count == 1
+
+
+def test_get_user_by_name_saves_compact_user(mocker):
+    """
+    Given:
+        - A workspace user which is not in the integration context.
+    When:
+        - Searching for the user.
+    Then:
+        - Validate the user is saved to the integration context with only the fields the integration uses.
+    """
+    from Slack import get_user_by_name
+    new_user = {
+        'id': 'U012B3CUI',
+        'name': 'perikles',
+        'color': '9f69e7',
+        'tz': 'Europe/Athens',
+        'profile': {
+            'email': 'perikles@acropoli.com',
+            'real_name': 'Perikles',
+            'image_512': 'https://example.com/perikles.png'
+        }
+    }
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call', return_value={'members': js.loads(USERS) + [new_user]})
+
+    user = get_user_by_name('perikles@acropoli.com')
+
+    assert user == new_user
+    saved_users = js.loads(demisto.setIntegrationContext.call_args[0][0]['users'])
+    assert {'id': 'U012B3CUI', 'name': 'perikles',
+            'profile': {'email': 'perikles@acropoli.com', 'real_name': 'Perikles'}} in saved_users
+    assert get_user_by_name('perikles') == saved_users[-1]
+    assert slack.WebClient.api_call.call_count == 1
+
+
+def test_user_directory_refresh(mocker):
+    """
+    Given:
+        - A workspace with users over two pages, none of them in the integration context.
+    When:
+        - Refreshing the users directory, then searching for users.
+    Then:
+        - Validate users are found by ID, name, email and real name without more API calls.
+        - Validate a missing user ID is looked up directly, without listing the workspace users again.
+        - Validate a missing user name is searched for in the workspace users, since it can't be looked up directly.
+    """
+    import Slack
+    from Slack import UserDirectory, get_user_by_name
+    from slack.errors import SlackApiError
+
+    def api_call(method: str, http_verb: str = 'POST', file: str = None, params=None, json=None, data=None):
+        if method == 'users.info':
+            err_response = SlackResponse(api_url='', client=None, http_verb='GET', req_args={},
+                                         data={'ok': False, 'error': 'user_not_found'}, status_code=200, headers={})
+            raise SlackApiError('The request to the Slack API failed.', err_response)
+        if 'cursor' not in params:
+            return {'members': js.loads(USERS), 'response_metadata': {'next_cursor': 'dGVhbTpDQ0M3UENUTks='}}
+        return {'members': [{'id': 'U248918AB', 'name': 'alexios', 'real_name': 'Alexios Komnenos'}],
+                'response_metadata': {'next_cursor': ''}}
+
+    set_integration_context({})
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call', side_effect=api_call)
+    mocker.patch.object(Slack, 'USER_DIRECTORY', UserDirectory(60))
+
+    Slack.USER_DIRECTORY.refresh()
+
+    assert slack.WebClient.api_call.call_count == 2
+    assert get_user_by_name('alexios komnenos')['id'] == 'U248918AB'
+    assert get_user_by_name('spengler@ghostbusters.example.com')['id'] == 'U012A3CDE'
+    assert Slack.USER_DIRECTORY.get_by_id('U248918AB')['name'] == 'alexios'
+    assert get_user_by_name('W0123ABCDE') == {}
+    assert get_user_by_name('W0123ABCDE') == {}
+    assert slack.WebClient.api_call.call_count == 3
+    assert slack.WebClient.api_call.call_args[0][0] == 'users.info'
+    assert get_user_by_name('dorothy') == {}
+    assert get_user_by_name('dorothy') == {}
+    assert slack.WebClient.api_call.call_count == 5
+    assert slack.WebClient.api_call.call_args[0][0] == 'users.list'
+
+
+def test_user_directory_lookup_new_user(mocker):
+    """
+    Given:
+        - A users directory refreshed from the workspace users, and a user who joined the workspace since.
+    When:
+        - Searching for the new user by email.
+    Then:
+        - Validate the user is looked up by email and saved to the integration context.
+    """
+    import Slack
+    from Slack import UserDirectory, get_user_by_name
+    new_user = {'id': 'U012B3CUI', 'name': 'perikles', 'profile': {'email': 'perikles@acropoli.com'}}
+
+    def api_call(method: str, http_verb: str = 'POST', file: str = None, params=None, json=None, data=None):
+        if method == 'users.lookupByEmail':
+            return {'user': new_user} if params['email'] == 'perikles@acropoli.com' else {}
+        return {'members': js.loads(USERS)}
+
+    set_integration_context({})
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call', side_effect=api_call)
+    mocker.patch.object(Slack, 'USER_DIRECTORY', UserDirectory(60))
+
+    Slack.USER_DIRECTORY.refresh()
+
+    assert get_user_by_name('Perikles@acropoli.com') == new_user
+    assert get_user_by_name('perikles')['id'] == 'U012B3CUI'
+    assert slack.WebClient.api_call.call_count == 2
+
+
 def test_mirror_investigation_new_mirror(mocker):
     from Slack import mirror_investigation
 
@@ -2144,13 +2278,18 @@ def test_check_for_answers_continue(mocker, requests_mock):
     mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
     mocker.patch.object(Slack, 'add_info_headers')
     mocker.patch.object(Slack, 'get_current_utc_time', return_value=datetime.datetime(2019, 9, 26, 18, 38, 25))
-    requests_mock.post(
-        'https://oproxy.demisto.ninja/slack-poll',
-        [{'json': {}, 'status_code': 200},
-         {'json': 'error', 'status_code': 401},
-         {'json': {'payload': PAYLOAD_JSON}, 'status_code': 200}]
-
-    )
+    # The questions are polled concurrently, so each entitlement gets its own response
+    responses = {
+        '4404dae8-2d45-46bd-85fa-64779c12abe8@30|44': {'json': {}, 'status_code': 200},
+        '4404dae8-2d45-46bd-85fa-64779c12abe7@30|44': {'json': 'error', 'status_code': 401},
+        'e95cb5a1-e394-4bc5-8ce0-508973aaf298@22|43': {'json': {'payload': PAYLOAD_JSON}, 'status_code': 200}
+    }
+    for entitlement, response in responses.items():
+        requests_mock.post(
+            'https://oproxy.demisto.ninja/slack-poll',
+            additional_matcher=lambda request, entitlement=entitlement: request.json()['entitlement'] == entitlement,
+            **response
+        )
 
     integration_context = get_integration_context()
     integration_context['questions'] = js.dumps([{
@@ -2512,6 +2651,130 @@ def test_check_for_answers_handle_entitlement_error(mocker, requests_mock):
     assert demisto.getIntegrationContext()['questions'] == js.dumps([])
 
 
+def test_check_for_answers_writes_only_polled_questions(mocker, requests_mock):
+    import Slack
+
+    # Set
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(Slack, 'add_info_headers')
+    mocker.patch.object(Slack, 'get_current_utc_time', return_value=datetime.datetime(2019, 9, 26, 18, 38, 25))
+    mocker.spy(Slack.QUESTION_SCHEDULER.context_store, 'update')
+    requests_mock.post('https://oproxy.demisto.ninja/slack-poll', json={})
+
+    due_question = {
+        'thread': 'cool',
+        'entitlement': 'e95cb5a1-e394-4bc5-8ce0-508973aaf298@22|43',
+        'expiry': '3000-09-26 18:38:25',
+        'sent': '2019-09-26 18:30:25',
+        'default_response': 'NoResponse',
+        'last_poll_time': '2019-09-26 18:36:25'
+    }
+    waiting_question = {
+        'thread': 'notcool',
+        'entitlement': '4404dae8-2d45-46bd-85fa-64779c12abe8@30|44',
+        'expiry': '3000-09-26 18:38:25',
+        'sent': '2019-09-26 18:30:25',
+        'default_response': 'NoResponse',
+        'last_poll_time': '2019-09-26 18:38:00'
+    }
+    integration_context = get_integration_context()
+    integration_context['questions'] = js.dumps([due_question, waiting_question])
+    set_integration_context(integration_context)
+
+    # Arrange
+    Slack.check_for_answers()
+    context = Slack.QUESTION_SCHEDULER.context_store.update.call_args[0][0]
+
+    # Assert
+    assert requests_mock.call_count == 1
+    assert requests_mock.last_request.json() == {'entitlement': 'e95cb5a1-e394-4bc5-8ce0-508973aaf298@22|43'}
+    assert context == {'questions': [dict(due_question, last_poll_time='2019-09-26 18:38:25')]}
+    assert Slack.QUESTION_SCHEDULER.get_metrics()['queue_depth'] == 2
+    assert Slack.QUESTION_SCHEDULER.get_metrics()['polls'] == 1
+    assert Slack.QUESTION_SCHEDULER.get_metrics()['context']['writes'] == 1
+    assert len(js.loads(demisto.getIntegrationContext()['questions'])) == 2
+
+
+def test_check_for_answers_poll_failure_backoff(mocker, requests_mock):
+    """
+    Given:
+        - A question whose poll fails to connect to the Slack endpoint.
+    When:
+        - Checking for answers repeatedly.
+    Then:
+        - Validate the question is not polled again before the backoff passes, and the backoff doubles.
+    """
+    import Slack
+
+    # Set
+    now = datetime.datetime(2019, 9, 26, 18, 38, 25)
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(Slack, 'add_info_headers')
+    mocker.patch.object(Slack, 'get_current_utc_time', return_value=now)
+    requests_mock.post('https://oproxy.demisto.ninja/slack-poll', exc=requests.exceptions.ConnectionError)
+
+    integration_context = get_integration_context()
+    integration_context['questions'] = js.dumps([{
+        'thread': 'cool',
+        'entitlement': 'e95cb5a1-e394-4bc5-8ce0-508973aaf298@22|43',
+        'expiry': '3000-09-26 18:38:25',
+        'default_response': 'NoResponse'
+    }])
+    set_integration_context(integration_context)
+
+    # Arrange
+    with pytest.raises(requests.exceptions.ConnectionError):
+        Slack.check_for_answers()
+    Slack.check_for_answers()
+    first_retry_seconds = Slack.QUESTION_SCHEDULER.seconds_until_due(now)
+    Slack.get_current_utc_time.return_value = now + datetime.timedelta(seconds=5)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        Slack.check_for_answers()
+
+    # Assert
+    assert requests_mock.call_count == 2
+    assert first_retry_seconds == 5
+    assert Slack.QUESTION_SCHEDULER.queue[0][0] == now + datetime.timedelta(seconds=15)
+
+
+def test_question_scheduler():
+    from Slack import QuestionScheduler
+
+    # Set
+    now = datetime.datetime(2019, 9, 26, 18, 38, 25)
+    questions = [{
+        'entitlement': 'new',
+        'sent': '2019-09-26 18:38:20'
+    }, {
+        'entitlement': 'expiring',
+        'sent': '2019-09-26 17:00:25',
+        'expiry': '2019-09-26 18:39:00',
+        'last_poll_time': '2019-09-26 18:38:00'
+    }, {
+        'entitlement': 'polled',
+        'sent': '2019-09-26 18:30:25',
+        'last_poll_time': '2019-09-26 18:38:00'
+    }]
+    scheduler = QuestionScheduler()
+
+    # Arrange
+    scheduler.load({'questions': js.dumps(questions)})
+    first_due = [question['entitlement'] for question in scheduler.pop_due(now)]
+    next_due_seconds = scheduler.seconds_until_due(now)
+    later_due = [question['entitlement'] for question in scheduler.pop_due(now + datetime.timedelta(seconds=35))]
+    scheduler.load({'questions': js.dumps(questions)})
+
+    # Assert
+    assert first_due == ['new']
+    assert next_due_seconds == 5
+    assert later_due == ['expiring', 'polled']
+    # The questions did not change, so they are not queued again
+    assert scheduler.pop_due(now) == []
+    assert scheduler.get_metrics()['queue_depth'] == 0
+
+
 @pytest.mark.asyncio
 async def test_check_entitlement(mocker):
     from Slack import check_and_handle_entitlement
@@ -4005,6 +4268,7 @@ def test_get_user(mocker):
     mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
     mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
     mocker.patch.object(demisto, 'results')
+    mocker.patch.object(slack.WebClient, 'api_call')
 
     # Arrange
 
@@ -4018,6 +4282,8 @@ def test_get_user(mocker):
         'DisplayName': 'spengler',
         'Email': 'spengler@ghostbusters.example.com',
     }}
+    assert user_results[0]['Contents']['id'] == 'U012A3CDE'
+    assert slack.WebClient.api_call.call_count == 0
 
 
 def test_get_user_by_name_paging_rate_limit(mocker):
@@ -3,11 +3,13 @@ from CommonServerPython import *
 from flask import Flask, request, make_response, Response, stream_with_context
 from gevent.pywsgi import WSGIServer
 from urllib.parse import urlparse, ParseResult
+import tempfile
 from tempfile import NamedTemporaryFile
 from base64 import b64decode
-from typing import Callable, List, Generator
+from typing import Callable, List, Generator, Dict, Iterable, Iterator, Optional
 from ssl import SSLContext, SSLError, PROTOCOL_TLSv1_2
 from multiprocessing import Process
+from collections import OrderedDict
 
 from libtaxii.messages_11 import (
     TAXIIMessage,
@@ -17,6 +19,7 @@ from libtaxii.messages_11 import (
     CollectionInformation,
     CollectionInformationResponse,
     PollRequest,
+    PollFulfillmentRequest,
     PollingServiceInstance,
     ServiceInstance,
     ContentBlock,
@@ -26,6 +29,7 @@ from libtaxii.constants import (
     MSG_COLLECTION_INFORMATION_REQUEST,
     MSG_DISCOVERY_REQUEST,
     MSG_POLL_REQUEST,
+    MSG_POLL_FULFILLMENT_REQUEST,
     SVC_DISCOVERY,
     SVC_COLLECTION_MANAGEMENT,
     SVC_POLL,
@@ -48,6 +52,7 @@ import mixbox.idgen
 import mixbox.namespaces
 import netaddr
 import uuid
+import sqlite3
 import werkzeug.urls
 import pytz
 
@@ -58,6 +63,12 @@ PAGE_SIZE = 200
 APP: Flask = Flask('demisto-taxii')
 NAMESPACE_URI = 'https://www.paloaltonetworks.com/cortex'
 NAMESPACE = 'cortex'
+# the number of seconds a multi-part poll result is kept since one of its parts was last fetched
+POLL_RESULT_TTL = 3600
+# the default number of rendered content blocks which are kept in memory
+CONTENT_BLOCK_CACHE_SIZE = 50000
+# the default number of evicted content blocks which are kept on disk
+CONTENT_BLOCK_DISK_CACHE_SIZE = 10 * CONTENT_BLOCK_CACHE_SIZE
 
 
 ''' Log Handler '''
@@ -75,12 +86,167 @@ class Handler:
         demisto.info(message)
 
 
+''' Content Block Cache '''
+
+
+class ContentBlockCache:
+    def __init__(self, max_size: int = CONTENT_BLOCK_CACHE_SIZE, db_path: Optional[str] = None,
+                 max_disk_size: int = CONTENT_BLOCK_DISK_CACHE_SIZE):
+        """
+        A cache of the STIX content blocks of indicators, so unchanged indicators are not converted to STIX on every
+        poll. The content blocks are kept by the indicator ID, along with the version of the indicator they were
+        rendered from. The least recently used content blocks are evicted from memory, to a local SQLite database if
+        one is given. The database is emptied on start, and the least recently evicted content blocks are deleted
+        from it once it holds more than max_disk_size of them.
+        Args:
+            max_size: The maximal number of content blocks to keep in memory.
+            db_path: The path of a local SQLite database to keep the evicted content blocks in.
+            max_disk_size: The maximal number of content blocks to keep in the database.
+        """
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self._cache: OrderedDict = OrderedDict()
+        self._db = None
+        self._db_size = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            with self._db:
+                self._db.execute('DROP TABLE IF EXISTS content_blocks')
+                self._db.execute('CREATE TABLE content_blocks (indicator_id TEXT PRIMARY KEY, version TEXT, '
+                                 'content_block TEXT, last_access REAL)')
+                self._db.execute('CREATE INDEX content_blocks_last_access ON content_blocks (last_access)')
+
+    @staticmethod
+    def get_version(indicator: dict) -> str:
+        """
+        Gets the version of an indicator, which changes whenever the indicator is modified.
+        """
+        return f'{indicator.get("modified")}|{indicator.get("version")}|{indicator.get("sourceTimeStamp")}'
+
+    def get(self, indicator: dict) -> Optional[str]:
+        """
+        Gets the content block of an indicator, if it was rendered from the current version of the indicator.
+        """
+        indicator_id = indicator.get('id')
+        if not indicator_id:
+            return None
+
+        version = self.get_version(indicator)
+        cached = self._cache.get(indicator_id)
+        if cached is not None:
+            self._cache.move_to_end(indicator_id)
+        elif self._db is not None:
+            row = self._db.execute('SELECT version, content_block FROM content_blocks WHERE indicator_id = ?',
+                                   (indicator_id,)).fetchone()
+            if row:
+                cached = tuple(row)
+                self._set(indicator_id, cached)
+
+        if cached is None or cached[0] != version:
+            return None
+        return cached[1]
+
+    def set(self, indicator: dict, content_block: str):
+        """
+        Sets the content block of an indicator.
+        """
+        indicator_id = indicator.get('id')
+        if indicator_id:
+            self._set(indicator_id, (self.get_version(indicator), content_block))
+
+    def _set(self, indicator_id: str, cached: tuple):
+        self._cache[indicator_id] = cached
+        self._cache.move_to_end(indicator_id)
+        evicted = []
+        while len(self._cache) > self.max_size:
+            evicted.append(self._cache.popitem(last=False))
+        if evicted and self._db is not None:
+            last_access = time.time()
+            with self._db:
+                self._db.executemany('INSERT OR REPLACE INTO content_blocks VALUES (?, ?, ?, ?)',
+                                     [(evicted_id, version, content_block, last_access)
+                                      for evicted_id, (version, content_block) in evicted])
+            # replaced rows are counted too, so the actual size is only counted when the cap may be exceeded
+            self._db_size += len(evicted)
+            if self._db_size > self.max_disk_size:
+                self._prune()
+
+    def _prune(self):
+        """
+        Deletes the least recently evicted content blocks from the database, down to max_disk_size of them.
+        """
+        with self._db:  # type: ignore[union-attr]
+            self._db_size = self._db.execute('SELECT COUNT(*) FROM content_blocks').fetchone()[0]  # type: ignore
+            excess = self._db_size - self.max_disk_size
+            if excess > 0:
+                self._db.execute('DELETE FROM content_blocks WHERE indicator_id IN '  # type: ignore[union-attr]
+                                 '(SELECT indicator_id FROM content_blocks ORDER BY last_access LIMIT ?)', (excess,))
+                self._db_size -= excess
+
+    def __len__(self):
+        return len(self._cache)
+
+
+''' Poll Result '''
+
+
+class PollResult:
+    def __init__(self, collection_name: str, pages: Iterator[list], exclusive_begin_time: Optional[datetime],
+                 inclusive_end_time: datetime):
+        """
+        The result of a poll request, which is returned in parts. Each part holds the next page of the indicator
+        search, which is only searched once the previous part is fetched.
+        Args:
+            collection_name: The name of the polled collection.
+            pages: The pages of the indicator search.
+            exclusive_begin_time: The query exclusive begin time.
+            inclusive_end_time: The query inclusive end time.
+        """
+        self.result_id = str(uuid.uuid4())
+        self.collection_name = collection_name
+        self.exclusive_begin_time = exclusive_begin_time
+        self.inclusive_end_time = inclusive_end_time
+        self.part_number = 0
+        self.part: list = []
+        self.last_access = time.time()
+        self._pages = pages
+        # the next part is searched in advance, in order to tell whether there are more parts
+        self._next_part: Optional[list] = next(self._pages, None)
+
+    @property
+    def more(self) -> bool:
+        return self._next_part is not None
+
+    def get_part(self, part_number: int) -> list:
+        """
+        Gets the indicators of a part of the result. The parts are fetched in order, and the last fetched part can be
+        fetched again (e.g. when its response was lost).
+        Args:
+            part_number: The result part number, starting from 1.
+
+        Returns:
+            The indicators of the part.
+        """
+        self.last_access = time.time()
+        if part_number == self.part_number:
+            return self.part
+
+        if part_number != self.part_number + 1 or (part_number > 1 and not self.more):
+            raise ValueError(f'Invalid result part number {part_number} of result {self.result_id}, the next part '
+                             f'number is {self.part_number + 1}')
+
+        self.part = self._next_part or []
+        self.part_number = part_number
+        self._next_part = next(self._pages, None)
+        return self.part
+
+
 ''' TAXII Server '''
 
 
 class TAXIIServer:
     def __init__(self, host: str, port: int, collections: dict, certificate: str, private_key: str,
-                 http_server: bool, credentials: dict):
+                 http_server: bool, credentials: dict, result_part_size: int = 0):
         """
         Class for a TAXII Server configuration.
         Args:
@@ -91,6 +257,7 @@ class TAXIIServer:
             private_key: The private key for SSL.
             http_server: Whether to use HTTP server (not SSL).
             credentials: The user credentials.
+            result_part_size: The number of indicators in each part of a poll response, 0 for a single part.
         """
         self.host = host
         self.port = port
@@ -101,6 +268,9 @@ class TAXIIServer:
         self.auth = None
         if credentials:
             self.auth = (credentials.get('identifier', ''), credentials.get('password', ''))
+        self.result_part_size = result_part_size
+        # the multi-part poll results which have more parts to fetch, by their result ID
+        self.poll_results: Dict[str, PollResult] = {}
 
         self.service_instances = [
             {
@@ -209,6 +379,28 @@ class TAXIIServer:
         return self.stream_stix_data_feed(taxii_feeds, taxii_message.message_id, collection_name,
                                           exclusive_begin_time, inclusive_end_time)
 
+    def get_poll_fulfillment_response(self, taxii_message: PollFulfillmentRequest) -> Response:
+        """
+        Handle poll fulfillment request, which fetches a part of a multi-part poll result.
+        Args:
+            taxii_message: The poll fulfillment request message.
+
+        Returns:
+            The poll response of the requested part.
+        """
+        if taxii_message.message_type != MSG_POLL_FULFILLMENT_REQUEST:
+            raise ValueError('Invalid message, invalid Message Type')
+
+        poll_result = self.poll_results.get(taxii_message.result_id)
+        if not poll_result or poll_result.collection_name != taxii_message.collection_name:
+            raise ValueError(f'Invalid message, unknown result ID {taxii_message.result_id}')
+
+        indicators = poll_result.get_part(int(taxii_message.result_part_number))
+        return self.stream_poll_response(taxii_message.message_id, poll_result.collection_name, indicators,
+                                         poll_result.exclusive_begin_time, poll_result.inclusive_end_time,
+                                         more=poll_result.more, result_id=poll_result.result_id,
+                                         result_part_number=poll_result.part_number)
+
     def stream_stix_data_feed(self, taxii_feeds: list, message_id: str, collection_name: str,
                               exclusive_begin_time: datetime, inclusive_end_time: datetime) -> Response:
         """
@@ -229,6 +421,57 @@ class TAXIIServer:
         if not inclusive_end_time:
             inclusive_end_time = datetime.utcnow().replace(tzinfo=pytz.utc)
 
+        indicator_query = self.collections[str(collection_name)]
+        if not self.result_part_size:
+            pages = iterate_indicators_by_time_frame(indicator_query, exclusive_begin_time, inclusive_end_time,
+                                                     PAGE_SIZE)
+            indicators = (indicator for page in pages for indicator in page)
+            return self.stream_poll_response(message_id, collection_name, indicators, exclusive_begin_time,
+                                             inclusive_end_time)
+
+        self.remove_expired_poll_results()
+        # the poll result searches the next part in advance by itself
+        pages = iterate_indicators_by_time_frame(indicator_query, exclusive_begin_time, inclusive_end_time,
+                                                 self.result_part_size)
+        poll_result = PollResult(collection_name, pages, exclusive_begin_time, inclusive_end_time)
+        indicators = poll_result.get_part(1)
+        if not poll_result.more:
+            return self.stream_poll_response(message_id, collection_name, indicators, exclusive_begin_time,
+                                             inclusive_end_time)
+
+        self.poll_results[poll_result.result_id] = poll_result
+        return self.stream_poll_response(message_id, collection_name, indicators, exclusive_begin_time,
+                                         inclusive_end_time, more=True, result_id=poll_result.result_id)
+
+    def remove_expired_poll_results(self):
+        """
+        Removes the multi-part poll results which were not fetched for POLL_RESULT_TTL seconds.
+        """
+        expiration_time = time.time() - POLL_RESULT_TTL
+        for result_id, poll_result in list(self.poll_results.items()):
+            if poll_result.last_access < expiration_time:
+                del self.poll_results[result_id]
+
+    @staticmethod
+    def stream_poll_response(message_id: str, collection_name: str, indicators: Iterable[dict],
+                             exclusive_begin_time: Optional[datetime], inclusive_end_time: datetime,
+                             more: bool = False, result_id: Optional[str] = None,
+                             result_part_number: int = 1) -> Response:
+        """
+        Stream a poll response of indicators in STIX data feed format.
+        Args:
+            message_id: The taxii message ID.
+            collection_name: The polled collection name.
+            indicators: The indicators of the response, which are converted to STIX as they are streamed.
+            exclusive_begin_time: The query exclusive begin time.
+            inclusive_end_time: The query inclusive end time.
+            more: Whether the poll result has more parts.
+            result_id: The ID of a multi-part poll result.
+            result_part_number: The part number of the response in the poll result.
+
+        Returns:
+            Stream of STIX indicator data feed.
+        """
         def yield_response() -> Generator:
             """
 
@@ -236,12 +479,14 @@ class TAXIIServer:
 
             """
             # yield the opening tag of the Poll Response
+            result_id_attribute = f' result_id="{result_id}"' if result_id else ''
             response = '<taxii_11:Poll_Response xmlns:taxii="http://taxii.mitre.org/messages/taxii_xml_binding-1"' \
                        ' xmlns:taxii_11="http://taxii.mitre.org/messages/taxii_xml_binding-1.1" ' \
                        'xmlns:tdq="http://taxii.mitre.org/query/taxii_default_query-1"' \
                        f' message_id="{generate_message_id()}"' \
                        f' in_response_to="{message_id}"' \
-                       f' collection_name="{collection_name}" more="false" result_part_number="1"> ' \
+                       f' collection_name="{collection_name}" more="{str(more).lower()}"{result_id_attribute}' \
+                       f' result_part_number="{result_part_number}"> ' \
                        f'<taxii_11:Inclusive_End_Timestamp>{inclusive_end_time.isoformat()}' \
                        '</taxii_11:Inclusive_End_Timestamp>'
 
@@ -252,18 +497,9 @@ class TAXIIServer:
             yield response
 
             # yield the content blocks
-            indicator_query = self.collections[str(collection_name)]
-
-            for indicator in find_indicators_by_time_frame(indicator_query, exclusive_begin_time, inclusive_end_time):
+            for indicator in indicators:
                 try:
-                    stix_xml_indicator = get_stix_indicator(indicator).to_xml(ns_dict={NAMESPACE_URI: NAMESPACE})
-                    content_block = ContentBlock(
-                        content_binding=CB_STIX_XML_11,
-                        content=stix_xml_indicator
-                    )
-
-                    content_xml = content_block.to_xml().decode('utf-8')
-                    yield f'{content_xml}\n'
+                    yield f'{get_content_block_xml(indicator)}\n'
                 except Exception as e:
                     handle_long_running_error(f'Failed parsing indicator to STIX: {e}')
 
@@ -294,6 +530,7 @@ class TAXIIServer:
 
 SERVER: TAXIIServer
 DEMISTO_LOGGER: Handler = Handler()
+CONTENT_BLOCK_CACHE: ContentBlockCache = ContentBlockCache()
 
 ''' STIX MAPPING '''
 
@@ -719,16 +956,16 @@ def get_collections(params: dict = demisto.params()) -> dict:
     return collections
 
 
-def find_indicators_by_time_frame(indicator_query: str, begin_time: datetime, end_time: datetime) -> list:
+def get_time_frame_query(indicator_query: str, begin_time: Optional[datetime], end_time: Optional[datetime]) -> str:
     """
-    Find indicators according to a query and begin time/end time.
+    Adds a begin time/end time to an indicator query.
     Args:
         indicator_query: The indicator query.
         begin_time: The exclusive begin time.
         end_time: The inclusive end time.
 
     Returns:
-        Indicator query results from Demisto.
+        The indicator query of the time frame.
     """
 
     if indicator_query:
@@ -746,7 +983,42 @@ def find_indicators_by_time_frame(indicator_query: str, begin_time: datetime, en
         indicator_query += f'sourcetimestamp:<="{tz_end_time}"'
     demisto.info(f'Querying indicators by: {indicator_query}')
 
-    return find_indicators_loop(indicator_query)
+    return indicator_query
+
+
+def find_indicators_by_time_frame(indicator_query: str, begin_time: datetime, end_time: datetime) -> list:
+    """
+    Find indicators according to a query and begin time/end time.
+    Args:
+        indicator_query: The indicator query.
+        begin_time: The exclusive begin time.
+        end_time: The inclusive end time.
+
+    Returns:
+        Indicator query results from Demisto.
+    """
+    return find_indicators_loop(get_time_frame_query(indicator_query, begin_time, end_time))
+
+
+def iterate_indicators_by_time_frame(indicator_query: str, begin_time: Optional[datetime], end_time: datetime,
+                                     page_size: int) -> Iterator[list]:
+    """
+    Iterate the pages of the indicators of a query and begin time/end time, without holding all of them at once.
+    Args:
+        indicator_query: The indicator query.
+        begin_time: The exclusive begin time.
+        end_time: The inclusive end time.
+        page_size: The number of indicators in each page.
+
+    Returns:
+        Iterator of the non empty pages of indicator query results from Demisto.
+    """
+    search_indicators = IndicatorsSearcher(query=get_time_frame_query(indicator_query, begin_time, end_time),
+                                           size=page_size)
+    for ioc_res in search_indicators:
+        iocs = ioc_res.get('iocs')
+        if iocs:
+            yield iocs
 
 
 def find_indicators_loop(indicator_query: str):
@@ -759,18 +1031,36 @@ def find_indicators_loop(indicator_query: str):
         Indicator query results from Demisto.
     """
     iocs: List[dict] = []
-    total_fetched = 0
-    next_page = 0
-    last_found_len = PAGE_SIZE
-    while last_found_len == PAGE_SIZE:
-        fetched_iocs = demisto.searchIndicators(query=indicator_query, page=next_page, size=PAGE_SIZE).get('iocs')
-        iocs.extend(fetched_iocs)
-        last_found_len = len(fetched_iocs)
-        total_fetched += last_found_len
-        next_page += 1
+    for ioc_res in IndicatorsSearcher(query=indicator_query, size=PAGE_SIZE):
+        iocs.extend(ioc_res.get('iocs'))
     return iocs
 
 
+def get_content_block_xml(indicator: dict) -> str:
+    """
+    Converts an indicator to a STIX content block, which is taken from the content block cache if the indicator was
+    not modified since it was last converted.
+    Args:
+        indicator: The indicator.
+
+    Returns:
+        The XML of the content block.
+    """
+    content_xml = CONTENT_BLOCK_CACHE.get(indicator)
+    if content_xml is not None:
+        return content_xml
+
+    stix_xml_indicator = get_stix_indicator(indicator).to_xml(ns_dict={NAMESPACE_URI: NAMESPACE})
+    content_block = ContentBlock(
+        content_binding=CB_STIX_XML_11,
+        content=stix_xml_indicator
+    )
+
+    content_xml = content_block.to_xml().decode('utf-8')
+    CONTENT_BLOCK_CACHE.set(indicator, content_xml)
+    return content_xml
+
+
 def taxii_make_response(taxii_message: TAXIIMessage):
     """
     Create an HTTP taxii response from a taxii message.
@@ -843,6 +1133,10 @@ def taxii_poll_service() -> Response:
             taxii_message = get_message_from_xml(request.data)
         else:
             raise ValueError('Invalid message')
+
+        # the parts of a multi-part poll result are fetched from the poll service
+        if taxii_message.message_type == MSG_POLL_FULFILLMENT_REQUEST:
+            return SERVER.get_poll_fulfillment_response(taxii_message)
     except Exception as e:
         error = f'Could not perform the polling request: {str(e)}'
         handle_long_running_error(error)
@@ -928,15 +1222,31 @@ def main():
     elif certificate and private_key:
         http_server = False
 
-    global SERVER
+    global SERVER, CONTENT_BLOCK_CACHE
     scheme = 'http'
     host_name = server_link_parts.hostname
     if not http_server:
         scheme = 'https'
         host_name = get_https_hostname(host_name)
 
+    try:
+        result_part_size = int(params.get('result_part_size') or 0)
+    except ValueError:
+        raise ValueError('The Poll Result Part Size must be a number.')
+
     SERVER = TAXIIServer(f'{scheme}://{host_name}', port, collections,
-                         certificate, private_key, http_server, credentials)
+                         certificate, private_key, http_server, credentials, result_part_size)
+
+    try:
+        content_block_cache_size = int(params.get('content_block_cache_size') or CONTENT_BLOCK_CACHE_SIZE)
+    except ValueError:
+        raise ValueError('The Content Block Cache Size must be a number.')
+
+    content_block_cache_path = None
+    if params.get('content_block_cache_disk') and command == 'long-running-execution':
+        content_block_cache_path = os.path.join(tempfile.gettempdir(), 'taxii_server_content_blocks.db')
+    CONTENT_BLOCK_CACHE = ContentBlockCache(content_block_cache_size, content_block_cache_path,
+                                            max_disk_size=10 * content_block_cache_size)
 
     demisto.debug(f'Command being called is {command}')
     commands = {
@@ -435,3 +435,126 @@ def test_validate_indicators(indicator):
 
     # Assert
     assert sdv.validate_xml(tree)
+
+
+def test_multi_part_poll(mocker):
+    """
+    Given
+    - A server with a poll result part size of 1, and a collection of 2 indicators.
+
+    When
+    - Polling the collection, and fetching the parts of the result with poll fulfillment requests.
+
+    Then
+    - Ensure each part holds the next indicator, with the result ID, the part number and the more flag.
+    - Ensure the indicators of a part are searched only when it is fetched, and the last part can be fetched again.
+    """
+    import TAXIIServer
+    from libtaxii.messages_11 import PollRequest, PollFulfillmentRequest, get_message_from_xml
+    indicators = json.loads(IP_INDICATORS)['iocs'] + json.loads(CIDR_INDICATORS)['iocs']
+
+    def search_indicators(page, size, **kwargs):
+        return {'iocs': indicators[page * size:(page + 1) * size]}
+
+    mocker.patch.object(demisto, 'searchIndicators', side_effect=search_indicators)
+    mocker.patch.object(demisto, 'info')
+    mocker.patch.object(TAXIIServer, 'SERVER', TAXIIServer.TAXIIServer('http://localhost', 9000, {'IPs': 'type:IP'},
+                                                                       '', '', True, {}, result_part_size=1),
+                        create=True)
+    headers = {
+        'X-TAXII-Content-Type': 'urn:taxii.mitre.org:message:xml:1.1',
+        'X-TAXII-Protocol': 'urn:taxii.mitre.org:protocol:http:1.0',
+        'X-TAXII-Services': 'urn:taxii.mitre.org:services:1.1'
+    }
+    poll_request = PollRequest('1', collection_name='IPs',
+                               poll_parameters=PollRequest.PollParameters())
+
+    with TAXIIServer.APP.test_client() as client:
+        response = client.post('/taxii-poll-service', data=poll_request.to_xml(), headers=headers)
+        response = get_message_from_xml(response.data)
+        assert response.more
+        assert response.result_part_number == 1
+        assert len(response.content_blocks) == 1
+        assert b'52.218.100.20' in response.content_blocks[0].content
+        # the first part and the search of the next one
+        assert demisto.searchIndicators.call_count == 2
+
+        result_id = response.result_id
+        for _ in range(2):
+            fulfillment_request = PollFulfillmentRequest('2', collection_name='IPs', result_id=result_id,
+                                                         result_part_number=2)
+            response = client.post('/taxii-poll-service', data=fulfillment_request.to_xml(), headers=headers)
+            response = get_message_from_xml(response.data)
+            assert not response.more
+            assert response.result_part_number == 2
+            assert len(response.content_blocks) == 1
+            assert demisto.searchIndicators.call_count == 3
+
+        fulfillment_request = PollFulfillmentRequest('3', collection_name='IPs', result_id=result_id,
+                                                     result_part_number=3)
+        response = client.post('/taxii-poll-service', data=fulfillment_request.to_xml(), headers=headers)
+        assert response.status_code == 400
+
+
+@pytest.mark.parametrize('on_disk', [False, True])
+def test_content_block_cache(mocker, tmp_path, on_disk):
+    """
+    Given
+    - A content block cache which holds a single content block in memory.
+
+    When
+    - Converting indicators to content blocks, before and after they are modified.
+
+    Then
+    - Ensure unchanged indicators are converted to STIX once, and modified indicators are converted again.
+    - Ensure content blocks which were evicted from memory are taken from the disk, if it is used.
+    """
+    import TAXIIServer
+    db_path = str(tmp_path / 'content_blocks.db') if on_disk else None
+    mocker.patch.object(TAXIIServer, 'CONTENT_BLOCK_CACHE', TAXIIServer.ContentBlockCache(1, db_path))
+    mocker.patch.object(TAXIIServer, 'get_stix_indicator', wraps=TAXIIServer.get_stix_indicator)
+    ip_indicator = json.loads(IP_INDICATORS)['iocs'][0]
+    cidr_indicator = json.loads(CIDR_INDICATORS)['iocs'][0]
+
+    content_block = TAXIIServer.get_content_block_xml(ip_indicator)
+    assert TAXIIServer.get_content_block_xml(ip_indicator) == content_block
+    assert TAXIIServer.get_stix_indicator.call_count == 1
+
+    # evicts the IP indicator from memory
+    TAXIIServer.get_content_block_xml(cidr_indicator)
+    assert len(TAXIIServer.CONTENT_BLOCK_CACHE) == 1
+    # a content block which is converted again gets new STIX IDs
+    assert (TAXIIServer.get_content_block_xml(ip_indicator) == content_block) == on_disk
+    assert TAXIIServer.get_stix_indicator.call_count == (2 if on_disk else 3)
+
+    ip_indicator['sourceTimeStamp'] = '2021-01-01T00:00:00Z'
+    assert TAXIIServer.get_content_block_xml(ip_indicator) != content_block
+
+
+def test_content_block_cache_disk_size(mocker, tmp_path):
+    """
+    Given
+    - A content block cache which holds a single content block in memory and two on disk.
+
+    When
+    - Setting the content blocks of several indicators, and creating a new cache on the same database.
+
+    Then
+    - Ensure the least recently evicted content blocks are deleted from the disk.
+    - Ensure the database is emptied when the cache is created.
+    """
+    import TAXIIServer
+    mocker.patch.object(TAXIIServer.time, 'time', side_effect=range(100))
+    db_path = str(tmp_path / 'content_blocks.db')
+    cache = TAXIIServer.ContentBlockCache(1, db_path, max_disk_size=2)
+    indicators = [{'id': str(i), 'modified': '2021-01-01T00:00:00Z'} for i in range(5)]
+    for indicator in indicators:
+        cache.set(indicator, f'block {indicator["id"]}')
+
+    rows = cache._db.execute('SELECT indicator_id FROM content_blocks ORDER BY indicator_id').fetchall()
+    assert [row[0] for row in rows] == ['2', '3']
+    assert cache.get(indicators[0]) is None
+    assert cache.get(indicators[3]) == 'block 3'
+
+    cache = TAXIIServer.ContentBlockCache(1, db_path, max_disk_size=2)
+    assert cache._db.execute('SELECT COUNT(*) FROM content_blocks').fetchone()[0] == 0
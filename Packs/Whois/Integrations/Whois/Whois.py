@@ -7,8 +7,19 @@ import sys
 from codecs import encode, decode
 import socks
 import errno
+import time
+import threading
+from contextlib import contextmanager
 
 SHOULD_ERROR = demisto.params().get('with_error', False)
+DEFAULT_CACHE_TTL_HOURS = 24
+DEFAULT_CACHE_SIZE = 200
+CACHE_CONTEXT_KEY = 'whois_cache'
+DEFAULT_MAX_CONCURRENT_LOOKUPS = 10
+DEFAULT_SERVER_CONCURRENCY = 2
+DEFAULT_SERVER_QUERY_INTERVAL = 0.2
+# RDAP lookups of the ip command are bootstrapped through ARIN
+RDAP_THROTTLE_KEY = 'rdap.arin.net'
 
 # flake8: noqa
 
@@ -7125,37 +7136,42 @@ dble_ext_str = "chirurgiens-dentistes.fr,in-addr.arpa,uk.net,za.org,mod.uk,org.z
 dble_ext = dble_ext_str.split(",")
 
 
+# Sometimes IANA simply won't give us the right root WHOIS server
+root_server_exceptions = {
+    ".ac.uk": "whois.ja.net",
+    ".ps": "whois.pnina.ps",
+    ".buzz": "whois.nic.buzz",
+    ".moe": "whois.nic.moe",
+    # The following is a bit hacky, but IANA won't return the right answer for example.com because it's a direct
+    # registration.
+    "example.com": "whois.verisign-grs.com"
+}
+
+
+def encode_domain(domain):
+    if sys.version_info < (3, 0):
+        return encode(domain if type(domain) is unicode else decode(domain, "utf8"), "idna")
+    return encode(domain, "idna").decode("ascii")
+
+
+def get_root_query_server(domain):
+    for exception, exc_serv in root_server_exceptions.items():
+        if domain.endswith(exception):
+            return exc_serv
+    return get_root_server(domain)
+
+
 def get_whois_raw(domain, server="", previous=None, rfc3490=True, never_cut=False, with_server_list=False,
                   server_list=None):
     previous = previous or []
     server_list = server_list or []
-    # Sometimes IANA simply won't give us the right root WHOIS server
-    exceptions = {
-        ".ac.uk": "whois.ja.net",
-        ".ps": "whois.pnina.ps",
-        ".buzz": "whois.nic.buzz",
-        ".moe": "whois.nic.moe",
-        # The following is a bit hacky, but IANA won't return the right answer for example.com because it's a direct
-        # registration.
-        "example.com": "whois.verisign-grs.com"
-    }
 
     if rfc3490:
-        if sys.version_info < (3, 0):
-            domain = encode(domain if type(domain) is unicode else decode(domain, "utf8"), "idna")
-        else:
-            domain = encode(domain, "idna").decode("ascii")
+        domain = encode_domain(domain)
 
     if len(previous) == 0 and server == "":
         # Root query
-        is_exception = False
-        for exception, exc_serv in exceptions.items():
-            if domain.endswith(exception):
-                is_exception = True
-                target_server = exc_serv
-                break
-        if not is_exception:
-            target_server = get_root_server(domain)
+        target_server = get_root_query_server(domain)
     else:
         target_server = server
     if target_server == "whois.jprs.jp":
@@ -7216,32 +7232,27 @@ def get_whois_raw(domain, server="", previous=None, rfc3490=True, never_cut=Fals
         return new_list
 
 
+# Root WHOIS server of every extension looked up so far
+root_servers = {}  # type: dict
+
+
 def get_root_server(domain):
     ext = domain.split(".")[-1]
     for dble in dble_ext:
         if domain.endswith(dble):
             ext = dble
 
+    if ext in root_servers:
+        return root_servers[ext]
+
     if ext in tlds.keys():
         entry = tlds[ext]
         try:
             host = entry["host"]
         except KeyError:
-            context = ({
-                outputPaths['domain']: {
-                    'Name': domain,
-                    'Whois': {
-                        'QueryStatus': 'Failed'
-                    }
-                },
-            })
-            if SHOULD_ERROR:
-                return_error('The domain - {} - is not supported by the Whois service'.format(domain),
-                             outputs=context)
-            else:
-                return_warning('The domain - {} - is not supported by the Whois service'.format(domain),
-                               exit=True, outputs=context)
+            raise WhoisQueryFailure('The domain - {} - is not supported by the Whois service'.format(domain), domain)
 
+        root_servers[ext] = host
         return host
 
     else:
@@ -7249,24 +7260,16 @@ def get_root_server(domain):
 
 
 def whois_request(domain, server, port=43):
+    with SERVER_THROTTLE.query(server):
+        return whois_socket_request(domain, server, port)
+
+
+def whois_socket_request(domain, server, port=43):
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         sock.connect((server, port))
     except Exception as msg:
-        context = ({
-            outputPaths['domain']: {
-                'Name': domain,
-                'Whois': {
-                    'QueryStatus': 'Failed'
-                }
-            },
-        })
-
-        if SHOULD_ERROR:
-            return_error("Whois returned - Couldn't connect with the socket-server: {}".format(msg), outputs=context)
-        else:
-            return_warning("Whois returned - Couldn't connect with the socket-server: {}".format(msg),
-                           exit=True, outputs=context)
+        raise WhoisQueryFailure("Whois returned - Couldn't connect with the socket-server: {}".format(msg), domain)
 
     else:
         sock.send(("%s\r\n" % domain).encode("utf-8"))
@@ -7298,10 +7301,205 @@ class WhoisException(Exception):
     pass
 
 
+class WhoisQueryFailure(WhoisException):
+    """
+    A domain which couldn't be queried, reported as a failed query of the domain
+    """
+
+    def __init__(self, message, domain):
+        super(WhoisQueryFailure, self).__init__(message)
+        self.domain = domain
+
+    @property
+    def context(self):
+        return {
+            outputPaths['domain']: {
+                'Name': self.domain,
+                'Whois': {
+                    'QueryStatus': 'Failed'
+                }
+            },
+        }
+
+    def to_entry(self):
+        return {
+            'Type': entryTypes['error'] if SHOULD_ERROR else entryTypes['warning'],
+            'ContentsFormat': formats['text'],
+            'Contents': str(self),
+            'EntryContext': self.context
+        }
+
+
+class ServerThrottle(object):
+    """
+    Limits the concurrent queries to each WHOIS server, and spaces the queries sent to it
+    """
+
+    def __init__(self, concurrency=DEFAULT_SERVER_CONCURRENCY, interval=DEFAULT_SERVER_QUERY_INTERVAL):
+        """
+        :type concurrency: ``int``
+        :param concurrency: Max amount of concurrent queries to a server.
+
+        :type interval: ``float``
+        :param interval: Min seconds between the start of two queries to a server.
+        """
+        self.concurrency = concurrency
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._semaphores = {}  # type: dict
+        self._next_query_time = {}  # type: dict
+
+    @contextmanager
+    def query(self, server):
+        with self._lock:
+            semaphore = self._semaphores.get(server)
+            if semaphore is None:
+                semaphore = self._semaphores[server] = threading.BoundedSemaphore(max(self.concurrency, 1))
+        with semaphore:
+            with self._lock:
+                now = time.time()
+                query_time = max(now, self._next_query_time.get(server, 0))
+                self._next_query_time[server] = query_time + self.interval
+            if query_time > now:
+                time.sleep(query_time - now)
+            yield
+
+
+SERVER_THROTTLE = ServerThrottle()
+
+
+def run_lookups(items, lookup, get_server=None, max_workers=DEFAULT_MAX_CONCURRENT_LOOKUPS):
+    """
+    Runs the lookup of each item concurrently. The lookups are interleaved across their target servers,
+    so a single busy server doesn't hold all the workers.
+
+    :type items: ``list``
+    :param items: The items to look up.
+
+    :type lookup: ``function``
+    :param lookup: Function which looks up a single item.
+
+    :type get_server: ``function``
+    :param get_server: Function which returns the server an item is looked up in.
+
+    :type max_workers: ``int``
+    :param max_workers: Max amount of concurrent lookups.
+
+    :return: (result, exception) of each item, in the order of the items.
+    :rtype: ``list``
+    """
+    groups = {}  # type: dict
+    for index, item in enumerate(items):
+        groups.setdefault(get_server(item) if get_server else None, []).append(index)
+    queued_groups = list(groups.values())
+    order = []
+    for position in range(max([len(group) for group in queued_groups] or [0])):
+        order.extend(group[position] for group in queued_groups if position < len(group))
+
+    results = [(None, None)] * len(items)
+    order_iter = iter(order)
+    order_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with order_lock:
+                index = next(order_iter, None)
+            if index is None:
+                return
+            try:
+                results[index] = (lookup(items[index]), None)
+            except Exception as e:
+                results[index] = (None, e)
+
+    workers = [threading.Thread(target=worker) for _ in range(max(min(max_workers, len(items)), 1))]
+    for thread in workers:
+        thread.daemon = True
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results
+
+
 def precompile_regexes(source, flags=0):
     return [re.compile(regex, flags) for regex in source]
 
 
+def get_required_literal(pattern):
+    """
+    Returns a literal which every match of the regex pattern contains (the literal prefix of the pattern),
+    or an empty string when there isn't one.
+    """
+    # a top level alternation has no common prefix
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 1
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return ""
+        i += 1
+
+    literal = []
+    i = 1 if pattern.startswith("^") else 0
+    while i < len(pattern):
+        char = pattern[i]
+        size = 1
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if escaped.isalnum():
+                # character classes (\s, \d, ...), anchors and back references aren't literals
+                char = {"n": "\n", "t": "\t"}.get(escaped)
+                if char is None:
+                    break
+            elif not escaped:
+                break
+            else:
+                char = escaped
+            size = 2
+        elif char in ".^$*+?{}[]()|":
+            break
+        quantifier = pattern[i + size:i + size + 1]
+        if quantifier and quantifier in "?*{":
+            # an optional character isn't required
+            break
+        literal.append(char)
+        i += size
+        if quantifier == "+":
+            break
+    return "".join(literal)
+
+
+def index_regexes(regexes):
+    """
+    Pairs precompiled regexes with the literal each of their matches contains (lowercase for case insensitive regexes),
+    so a regex is only run over text which contains its literal.
+    """
+    indexed = []
+    for regex in regexes:
+        literal = get_required_literal(regex.pattern)
+        indexed.append((regex, literal.lower() if regex.flags & re.IGNORECASE else literal))
+    return indexed
+
+
+def indexed_search(regex, literal, text):
+    """
+    Searches an indexed case sensitive regex in the text, skipping the search when the text doesn't contain its literal
+    """
+    if literal not in text:
+        return None
+    return regex.search(text)
+
+
 def preprocess_regex(regex):
     # Fix for #2; prevents a ridiculous amount of varying size permutations.
     regex = re.sub(r"\\s\*\(\?P<([^>]+)>\.\+\)", r"\s*(?P<\1>\S.*)", regex)
@@ -7649,6 +7847,16 @@ nic_contact_references["tech"] = precompile_regexes(nic_contact_references["tech
 nic_contact_references["admin"] = precompile_regexes(nic_contact_references["admin"])
 nic_contact_references["billing"] = precompile_regexes(nic_contact_references["billing"])
 
+# The regexes used while parsing, paired with their literals (see index_regexes)
+grammar_rules = [(rule_key, index_regexes(rule_regexes)) for rule_key, rule_regexes in grammar["_data"].items()]  # type: ignore
+indexed_registrant_regexes = index_regexes(registrant_regexes)
+indexed_tech_contact_regexes = index_regexes(tech_contact_regexes)
+indexed_admin_contact_regexes = index_regexes(admin_contact_regexes)
+indexed_billing_contact_regexes = index_regexes(billing_contact_regexes)
+indexed_nic_contact_regexes = index_regexes(nic_contact_regexes)
+indexed_nic_contact_references = [(category, index_regexes(regexes))
+                                  for category, regexes in nic_contact_references.items()]
+
 if sys.version_info < (3, 0):
     def is_string(data):
         """Test for string with support for python 2."""
@@ -7666,19 +7874,23 @@ def parse_raw_whois(raw_data, normalized=None, never_query_handles=True, handle_
     raw_data = [segment.replace("\r", "") for segment in raw_data]  # Carriage returns are the devil
 
     for segment in raw_data:
-        for rule_key, rule_regexes in grammar['_data'].items():  # type: ignore
-            if (rule_key in data) == False:
-                for line in segment.splitlines():
-                    for regex in rule_regexes:
-                        result = re.search(regex, line)
-
+        # A single pass over the lines, running only the regexes whose literal is in the line (all are case insensitive).
+        # Each rule is collected from the first segment which has a value for it.
+        pending_rules = [(rule_key, rule_regexes) for rule_key, rule_regexes in grammar_rules if rule_key not in data]
+        rule_values = dict((rule_key, []) for rule_key, _ in pending_rules)  # type: dict
+        for line in segment.splitlines():
+            lowered_line = line.lower()
+            for rule_key, rule_regexes in pending_rules:
+                for regex, literal in rule_regexes:
+                    if literal in lowered_line:
+                        result = regex.search(line)
                         if result is not None:
                             val = result.group("val").strip()
                             if val != "":
-                                try:
-                                    data[rule_key].append(val)
-                                except KeyError as e:
-                                    data[rule_key] = [val]
+                                rule_values[rule_key].append(val)
+        for rule_key, _ in pending_rules:
+            if rule_values[rule_key]:
+                data[rule_key] = rule_values[rule_key]
 
         # Whois.com is a bit special... Fabulous.com also seems to use this format. As do some others.
         match = re.search("^\s?Name\s?[Ss]ervers:?\s*\n((?:\s*.+\n)+?\s?)\n", segment, re.MULTILINE)
@@ -8083,29 +8295,29 @@ def parse_registrants(data, never_query_handles=True, handle_server=""):
     admin_contact = None
 
     for segment in data:
-        for regex in registrant_regexes:
-            match = re.search(regex, segment)
+        for regex, literal in indexed_registrant_regexes:
+            match = indexed_search(regex, literal, segment)
             if match is not None:
                 registrant = match.groupdict()
                 break
 
     for segment in data:
-        for regex in tech_contact_regexes:
-            match = re.search(regex, segment)
+        for regex, literal in indexed_tech_contact_regexes:
+            match = indexed_search(regex, literal, segment)
             if match is not None:
                 tech_contact = match.groupdict()
                 break
 
     for segment in data:
-        for regex in admin_contact_regexes:
-            match = re.search(regex, segment)
+        for regex, literal in indexed_admin_contact_regexes:
+            match = indexed_search(regex, literal, segment)
             if match is not None:
                 admin_contact = match.groupdict()
                 break
 
     for segment in data:
-        for regex in billing_contact_regexes:
-            match = re.search(regex, segment)
+        for regex, literal in indexed_billing_contact_regexes:
+            match = indexed_search(regex, literal, segment)
             if match is not None:
                 billing_contact = match.groupdict()
                 break
@@ -8115,10 +8327,10 @@ def parse_registrants(data, never_query_handles=True, handle_server=""):
 
     # Find NIC handle references and process them
     missing_handle_contacts = []  # type: list
-    for category in nic_contact_references:
-        for regex in nic_contact_references[category]:
+    for category, regexes in indexed_nic_contact_references:
+        for regex, literal in regexes:
             for segment in data:
-                match = re.search(regex, segment)
+                match = indexed_search(regex, literal, segment)
                 if match is not None:
                     data_reference = match.groupdict()
                     if data_reference["handle"] == "-" or re.match("https?:\/\/", data_reference["handle"]) is not None:
@@ -8236,21 +8448,134 @@ def fetch_nic_contact(handle, lookup_server):
 
 def parse_nic_contact(data):
     handle_contacts = []
-    for regex in nic_contact_regexes:
+    for regex, literal in indexed_nic_contact_regexes:
         for segment in data:
-            matches = re.finditer(regex, segment)
+            if literal not in segment:
+                continue
+            matches = regex.finditer(segment)
             for match in matches:
                 handle_contacts.append(match.groupdict())
 
     return handle_contacts
 
 
+class WhoisCache(object):
+    """
+    TTL bounded cache of WHOIS lookups, keyed by the normalized domain.
+    The raw responses and the servers which were queried (following the referrals) are kept in the integration context,
+    so they are shared between commands. The parsed results are kept in process memory.
+    """
+
+    def __init__(self, ttl=0, max_size=DEFAULT_CACHE_SIZE):
+        """
+        :type ttl: ``int``
+        :param ttl: Seconds a lookup stays cached. 0 disables the cache.
+
+        :type max_size: ``int``
+        :param max_size: Max amount of domains kept in the cache, the oldest lookups are dropped first.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = {}  # type: dict
+        self.parsed = {}  # type: dict
+        self.hits = 0
+        self.misses = 0
+        self.modified = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_size > 0
+
+    @staticmethod
+    def normalize_domain(domain):
+        return domain.strip().rstrip('.').lower()
+
+    def is_expired(self, entry):
+        return entry.get('time', 0) + self.ttl < time.time()
+
+    def load(self):
+        """
+        Loads the cached lookups from the integration context
+        """
+        if not self.enabled:
+            return
+        cached_entries = (demisto.getIntegrationContext() or {}).get(CACHE_CONTEXT_KEY) or {}
+        self.entries = {domain: entry for domain, entry in cached_entries.items() if not self.is_expired(entry)}
+        self.modified = len(self.entries) != len(cached_entries)
+
+    def save(self):
+        """
+        Stores the cached lookups in the integration context, keeping the `max_size` latest lookups
+        """
+        if not self.enabled or not self.modified:
+            return
+        if len(self.entries) > self.max_size:
+            latest = sorted(self.entries, key=lambda domain: self.entries[domain]['time'], reverse=True)
+            self.entries = {domain: self.entries[domain] for domain in latest[:self.max_size]}
+        integration_context = demisto.getIntegrationContext() or {}
+        integration_context[CACHE_CONTEXT_KEY] = self.entries
+        demisto.setIntegrationContext(integration_context)
+        self.modified = False
+
+    def get(self, domain):
+        """
+        :return: The (raw responses, queried servers) of the domain lookup, or None if it isn't cached
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self.entries.get(self.normalize_domain(domain))
+            if entry is None or self.is_expired(entry):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry['raw'], entry['servers']
+
+    def set(self, domain, raw_data, server_list):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.entries[self.normalize_domain(domain)] = {'raw': raw_data, 'servers': server_list,
+                                                           'time': time.time()}
+            self.modified = True
+
+    def log_stats(self):
+        if self.enabled:
+            demisto.debug('Whois cache: {} hits, {} misses, {} cached domains'.format(
+                self.hits, self.misses, len(self.entries)))
+
+
+WHOIS_CACHE = WhoisCache()
+
+
 def get_whois(domain, normalized=None):
+    use_parsed_cache = WHOIS_CACHE.enabled and not normalized
+    cache_key = WHOIS_CACHE.normalize_domain(domain)
+    cached = WHOIS_CACHE.get(domain)
+    if cached is not None:
+        if use_parsed_cache and cache_key in WHOIS_CACHE.parsed:
+            return WHOIS_CACHE.parsed[cache_key]
+        raw_data, server_list = cached
+    else:
+        raw_data, server_list = get_whois_raw(domain, with_server_list=True)
+        WHOIS_CACHE.set(domain, raw_data, server_list)
+
     if normalized is None:
         normalized = []
-    raw_data, server_list = get_whois_raw(domain, with_server_list=True)
-    return parse_raw_whois(raw_data, normalized=normalized, never_query_handles=False,
-                           handle_server=server_list[-1])
+    whois_result = parse_raw_whois(raw_data, normalized=normalized, never_query_handles=False,
+                                   handle_server=server_list[-1])
+    if use_parsed_cache:
+        WHOIS_CACHE.parsed[cache_key] = whois_result
+    return whois_result
+
+
+def get_domain_lookup_server(domain):
+    """ The root WHOIS server queried for the domain, or None if it can't be determined """
+    try:
+        return get_root_query_server(encode_domain(domain))
+    except Exception:
+        return None
 
 
 # Drops the mic disable-secrets-detection-end
@@ -8375,10 +8700,26 @@ def create_outputs(whois_result, domain, reliability, query=None):
 '''COMMANDS'''
 
 
-def domain_command(reliability):
-    domains = demisto.args().get('domain', [])
-    for domain in argToList(domains):
-        whois_result = get_whois(domain)
+def domain_command(reliability, max_workers=DEFAULT_MAX_CONCURRENT_LOOKUPS):
+    domains = argToList(demisto.args().get('domain', []))
+    # a domain which is given more than once is looked up once, so its copies don't all miss the cache concurrently
+    unique_domains = {}  # type: dict
+    for domain in domains:
+        unique_domains.setdefault(WhoisCache.normalize_domain(domain), domain)
+    unique_lookups = dict(zip(unique_domains, run_lookups(list(unique_domains.values()), get_whois,
+                                                          get_domain_lookup_server, max_workers)))
+    lookups = [unique_lookups[WhoisCache.normalize_domain(domain)] for domain in domains]
+    for domain, (whois_result, error) in zip(domains, lookups):
+        if isinstance(error, WhoisQueryFailure):
+            demisto.results(error.to_entry())
+            continue
+        if error is not None:
+            demisto.results({
+                'Type': entryTypes['error'],
+                'ContentsFormat': formats['text'],
+                'Contents': 'Failed to get the Whois results for {}: {}'.format(domain, error)
+            })
+            continue
         md, standard_ec, dbot_score = create_outputs(whois_result, domain, reliability)
         demisto.results({
             'Type': entryTypes['note'],
@@ -8405,13 +8746,21 @@ def get_whois_ip(ip):
     else:
         ip_obj = IPWhois(ip)
 
-    return ip_obj.lookup_rdap(depth=1)
+    with SERVER_THROTTLE.query(RDAP_THROTTLE_KEY):
+        return ip_obj.lookup_rdap(depth=1)
 
 
-def ip_command(ips, reliability):
-    results = []
-    for ip in argToList(ips):
-        response = get_whois_ip(ip)
+def ip_command(ips, reliability, max_workers=DEFAULT_MAX_CONCURRENT_LOOKUPS):
+    results = []  # type: list
+    ips = argToList(ips)
+    for ip, (response, error) in zip(ips, run_lookups(ips, get_whois_ip, max_workers=max_workers)):
+        if error is not None:
+            results.append({
+                'Type': entryTypes['error'],
+                'ContentsFormat': formats['text'],
+                'Contents': 'Failed to get the Whois results for {}: {}'.format(ip, error)
+            })
+            continue
 
         dbot_score = Common.DBotScore(
             indicator=ip,
@@ -8504,6 +8853,44 @@ def setup_proxy():
     socks.set_default_proxy(proxy_type[0], host, port, proxy_type[1])
     socket.socket = socks.socksocket  # type: ignore
 
+def setup_cache():
+    params = demisto.params()
+    cache_ttl = arg_to_number(params.get('cache_ttl'), 'Cache TTL (hours)')
+    cache_size = arg_to_number(params.get('cache_size'), 'Cache Size')
+    WHOIS_CACHE.ttl = int((DEFAULT_CACHE_TTL_HOURS if cache_ttl is None else cache_ttl) * 3600)
+    WHOIS_CACHE.max_size = DEFAULT_CACHE_SIZE if cache_size is None else cache_size
+    WHOIS_CACHE.load()
+
+
+def setup_concurrency():
+    params = demisto.params()
+    max_workers = arg_to_number(params.get('max_concurrent_lookups'), 'Max Concurrent Lookups')
+    server_concurrency = arg_to_number(params.get('server_concurrency'), 'Max Concurrent Queries Per Server')
+    SERVER_THROTTLE.concurrency = server_concurrency or DEFAULT_SERVER_CONCURRENCY
+    SERVER_THROTTLE.interval = get_server_query_interval(params.get('server_query_interval'))
+    return max_workers or DEFAULT_MAX_CONCURRENT_LOOKUPS
+
+
+def get_server_query_interval(server_query_interval):
+    """
+    :type server_query_interval: ``str``
+    :param server_query_interval: The Server Query Interval (seconds) parameter.
+
+    :return: The min seconds between two queries sent to a single WHOIS server.
+    :rtype: ``float``
+    """
+    if server_query_interval in (None, ''):
+        return DEFAULT_SERVER_QUERY_INTERVAL
+    try:
+        interval = float(server_query_interval)
+    except (TypeError, ValueError):
+        interval = -1
+    if not interval >= 0:
+        raise DemistoException('Invalid Server Query Interval (seconds): "{}". It must be a non-negative number of '
+                               'seconds.'.format(server_query_interval))
+    return interval
+
+
 ''' EXECUTION CODE '''
 
 
@@ -8521,16 +8908,25 @@ def main():
 
     try:
         if command == 'ip':
-            return_results(ip_command(demisto.args().get('ip'), reliability))
+            for result in ip_command(demisto.args().get('ip'), reliability, setup_concurrency()):
+                return_results(result)
         else:
             org_socket = socket.socket
             setup_proxy()
+            max_workers = setup_concurrency()
             if command == 'test-module':
                 test_command()
-            elif command == 'whois':
-                whois_command(reliability)
-            elif command == 'domain':
-                domain_command(reliability)
+            elif command in ('whois', 'domain'):
+                setup_cache()
+                if command == 'whois':
+                    whois_command(reliability)
+                else:
+                    domain_command(reliability, max_workers)
+    except WhoisQueryFailure as e:
+        if SHOULD_ERROR:
+            return_error(str(e), outputs=e.context)
+        else:
+            return_warning(str(e), exit=True, outputs=e.context)
     except Exception as e:
         LOG(e)
         return_error(str(e))
@@ -8538,6 +8934,9 @@ def main():
         if command != 'ip':
             socks.set_default_proxy()  # clear proxy settings
             socket.socket = org_socket  # type: ignore
+        if command in ('whois', 'domain'):
+            WHOIS_CACHE.log_stats()
+            WHOIS_CACHE.save()
 
 
 # python2 uses __builtin__ python3 uses builtins
@@ -194,3 +194,176 @@ def test_ip_command(mocker):
              'Indicator': '4.4.4.4',
              'Score': 0,
              'Type': 'ip'}}
+
+
+def test_whois_cache(mocker):
+    """
+    Given:
+        - The Whois cache is enabled, and a domain lookup was cached by a previous command
+
+    When:
+        - Running the domain command on the same domain several times, and on another domain
+
+    Then:
+        - Verify the cached domain is not queried again, and the other domain is queried once
+        - Verify a domain which is given several times is looked up in the cache once
+        - Verify both lookups are stored in the integration context
+    """
+    raw_data = ['Domain Name: EXAMPLE.COM\nName Server: A.IANA-SERVERS.NET\n']
+    integration_context = {Whois.CACHE_CONTEXT_KEY: {
+        'example.com': {'raw': raw_data, 'servers': ['whois.verisign-grs.com'], 'time': time.time()},
+        'expired.com': {'raw': raw_data, 'servers': ['whois.verisign-grs.com'], 'time': time.time() - 7200},
+    }}
+    mocker.patch.object(demisto, 'params', return_value={'cache_ttl': '1', 'cache_size': '10'})
+    mocker.patch.object(demisto, 'command', return_value='domain')
+    mocker.patch.object(demisto, 'args', return_value={'domain': 'example.com,Example.com.,google.com,google.com'})
+    mocker.patch.object(demisto, 'results')
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value=integration_context)
+    set_context = mocker.patch.object(demisto, 'setIntegrationContext')
+    get_whois_raw = mocker.patch.object(Whois, 'get_whois_raw', return_value=(raw_data, ['whois.verisign-grs.com']))
+    mocker.patch.object(Whois, 'WHOIS_CACHE', Whois.WhoisCache())
+
+    Whois.main()
+
+    assert demisto.results.call_count == 4
+    get_whois_raw.assert_called_once()
+    assert get_whois_raw.call_args[0][0] == 'google.com'
+    assert Whois.WHOIS_CACHE.hits == 1
+    assert Whois.WHOIS_CACHE.misses == 1
+    assert set(set_context.call_args[0][0][Whois.CACHE_CONTEXT_KEY]) == {'example.com', 'google.com'}
+
+
+def test_run_lookups():
+    """
+    Given:
+        - Items looked up in several servers, one of them fails
+
+    When:
+        - Running the lookups concurrently
+
+    Then:
+        - Verify the results and errors are returned in the order of the items
+        - Verify no more than the allowed concurrent queries are sent to each server
+    """
+    throttle = Whois.ServerThrottle(concurrency=2, interval=0)
+    active = {}
+    max_active = {}
+
+    def lookup(item):
+        server = item.split('.')[-1]
+        with throttle.query(server):
+            active[server] = active.get(server, 0) + 1
+            max_active[server] = max(max_active.get(server, 0), active[server])
+            time.sleep(0.01)
+            active[server] -= 1
+        if item == 'fail.com':
+            raise Whois.WhoisException('failed')
+        return item.upper()
+
+    items = ['a{}.com'.format(i) for i in range(10)] + ['fail.com'] + ['b{}.net'.format(i) for i in range(5)]
+    results = Whois.run_lookups(items, lookup, get_server=lambda item: item.split('.')[-1], max_workers=8)
+
+    assert [result for result, _ in results] == [None if item == 'fail.com' else item.upper() for item in items]
+    assert isinstance(results[10][1], Whois.WhoisException)
+    assert max_active == {'com': 2, 'net': 2}
+
+
+def test_domain_command_query_failure(mocker):
+    """
+    Given:
+        - Several domains, one of them isn't supported by the Whois service
+
+    When:
+        - Running the domain command
+
+    Then:
+        - Verify a failed query entry is returned for the unsupported domain, and results for the others
+    """
+    mocker.patch.object(demisto, 'args', return_value={'domain': 'google.com,test.unsupportedtld,paloalto.com'})
+    mocker.patch.object(demisto, 'results')
+
+    def get_whois(domain):
+        if domain.endswith('unsupportedtld'):
+            raise Whois.WhoisQueryFailure('The domain - {} - is not supported'.format(domain), domain)
+        return {'raw': 'Domain Name: {}'.format(domain)}
+
+    mocker.patch.object(Whois, 'get_whois', side_effect=get_whois)
+
+    Whois.domain_command(DBotScoreReliability.B)
+
+    entries = [call[0][0] for call in demisto.results.call_args_list]
+    assert [entry['Type'] for entry in entries] == [1, 11, 1]
+    assert entries[1]['EntryContext'][Whois.outputPaths['domain']]['Whois']['QueryStatus'] == 'Failed'
+    assert 'paloalto.com' in entries[2]['HumanReadable']
+
+
+def test_domain_command_duplicate_domains(mocker):
+    """
+    Given:
+        - The same domain given several times, in different cases
+
+    When:
+        - Running the domain command
+
+    Then:
+        - Verify the domain is looked up once, and a result is returned for each of the given domains in their order
+    """
+    mocker.patch.object(demisto, 'args', return_value={'domain': 'google.com,paloalto.com,GOOGLE.com.,google.com'})
+    mocker.patch.object(demisto, 'results')
+    get_whois = mocker.patch.object(Whois, 'get_whois',
+                                    side_effect=lambda domain: {'raw': 'Domain Name: {}'.format(domain)})
+
+    Whois.domain_command(DBotScoreReliability.B)
+
+    assert sorted(call[0][0] for call in get_whois.call_args_list) == ['google.com', 'paloalto.com']
+    entries = [call[0][0] for call in demisto.results.call_args_list]
+    assert [entry['HumanReadable'].splitlines()[0] for entry in entries] == [
+        '### Whois results for google.com', '### Whois results for paloalto.com',
+        '### Whois results for GOOGLE.com.', '### Whois results for google.com']
+
+
+def test_parse_raw_whois_corpus():
+    """
+    Given:
+        - Raw WHOIS responses of several registries and registrars
+
+    When:
+        - Parsing the raw responses
+
+    Then:
+        - Verify the parse results are the ones recorded for the responses
+    """
+    corpus = load_test_data('./test_data/raw_whois_corpus.json')
+    expected = load_test_data('./test_data/raw_whois_parsed.json')
+    for entry in corpus:
+        whois_result = Whois.parse_raw_whois(entry['raw'], normalized=[], never_query_handles=True)
+        assert whois_result.pop('raw') == entry['raw']
+        assert json.loads(json.dumps(whois_result, default=str)) == expected[entry['domain']]
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    (r'Domain ID:[ ]*(?P<val>.+)', 'Domain ID:'),
+    (r'\[Status\]\s*(?P<val>.+)', '[Status]'),
+    (r'^state:\s*(?P<val>.+)', 'state:'),
+    (r'Created on\s?[.]*:\s?(?P<val>.+)\.', 'Created on'),
+    (r'Exp(?:iry)? Date\s?[.]*:\s?(?P<val>.+)', 'Exp'),
+    (r'(C|c)hanged:\s*(?P<val>.+)', ''),
+    (r'NS [0-9]+\s*:\s*(?P<val>.+)', 'NS '),
+    (r'Registrant:\n  (?P<name>.+)\n', 'Registrant:\n  '),
+    (r'registrant:|owner:', ''),
+    (r'a+b', 'a'),
+])
+def test_get_required_literal(pattern, expected):
+    assert Whois.get_required_literal(pattern) == expected
+
+
+@pytest.mark.parametrize('server_query_interval, expected', [(None, 0.2), ('', 0.2), ('0', 0.0), ('1.5', 1.5)])
+def test_get_server_query_interval(server_query_interval, expected):
+    assert Whois.get_server_query_interval(server_query_interval) == expected
+
+
+@pytest.mark.parametrize('server_query_interval', ['fast', '-1', 'nan'])
+def test_get_server_query_interval_invalid(server_query_interval):
+    from CommonServerPython import DemistoException
+    with pytest.raises(DemistoException, match='Invalid Server Query Interval'):
+        Whois.get_server_query_interval(server_query_interval)